@@ -0,0 +1,196 @@
+from typing import List, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+##########################################################################
+########################    VECTORIZED BACKTEST   ########################
+##########################################################################
+# Every function works on arrays of shape (..., T, N): T periods, N tickers and any
+# number of leading axes for signal variants. A parameter sweep is one call on a
+# (K, T, N) array instead of K loops over a DataFrame.
+# positions[..., t, n] is held over period t and earns forward_returns[t, n], the return
+# from t to t + 1 (the 'target' column of the notebooks).
+
+
+def to_matrix(values: pd.Series, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Pivot a series indexed by (time, ticker) into a (time x ticker) matrix.
+
+    Parameters:
+    values (pd.Series): Signal or return series with a two-level (time, ticker) index.
+    tickers (List[str]): Column order of the matrix (default is sorted tickers).
+
+    Returns:
+    pd.DataFrame: Matrix indexed by time with one column per ticker, NaN where missing.
+    """
+    matrix = values.unstack(level=-1).sort_index()
+    if tickers is not None:
+        matrix = matrix.reindex(columns=tickers)
+    return matrix
+
+
+def threshold_signals(scores: np.ndarray, thresholds: Sequence[float]) -> np.ndarray:
+    """
+    Batch of signals keeping only the scores whose magnitude reaches each threshold.
+
+    Parameters:
+    scores (np.ndarray): (T, N) model scores, e.g. predict_proba(X).dot([-1, 1]) in [-1, 1].
+    thresholds (Sequence[float]): K minimum absolute scores.
+
+    Returns:
+    np.ndarray: (K, T, N) signals, 0 where |score| < threshold.
+    """
+    scores = np.asarray(scores, dtype='float64')
+    thresholds = np.asarray(thresholds, dtype='float64').reshape(-1, *([1] * scores.ndim))
+    return np.where(np.abs(scores) >= thresholds, scores, 0.0)
+
+
+def apply_position_limits(
+    signals: np.ndarray,
+    max_position: Optional[float] = None,
+    max_gross: Optional[float] = None
+) -> np.ndarray:
+    """
+    Clip positions per ticker, then scale every period down to a maximum gross exposure.
+
+    Parameters:
+    signals (np.ndarray): (..., T, N) target positions.
+    max_position (float): Maximum absolute position per ticker.
+    max_gross (float): Maximum sum of absolute positions per period.
+
+    Returns:
+    np.ndarray: (..., T, N) positions within the limits.
+    """
+    positions = np.nan_to_num(np.asarray(signals, dtype='float64'))
+    if max_position is not None:
+        positions = np.clip(positions, -max_position, max_position)
+    if max_gross is not None:
+        gross = np.abs(positions).sum(axis=-1, keepdims=True)
+        scale = np.minimum(1.0, max_gross / np.where(gross > 0, gross, 1.0))
+        positions = positions * scale
+    return positions
+
+
+def drawdown(equity: np.ndarray, initial: float = 1.0) -> np.ndarray:
+    """
+    Relative drawdown from the running peak of an (..., T) equity curve starting at initial.
+    """
+    return equity / np.maximum(np.maximum.accumulate(equity, axis=-1), initial) - 1.0
+
+
+def sharpe_ratio(pnl: np.ndarray, periods_per_year: int = 365) -> np.ndarray:
+    """
+    Annualised Sharpe ratio of (..., T) period returns, NaN when the volatility is 0.
+    """
+    mean = pnl.mean(axis=-1)
+    std = pnl.std(axis=-1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+
+
+def run_backtest(
+    signals: np.ndarray,
+    forward_returns: np.ndarray,
+    fee_rate: float = 0.001,
+    max_position: Optional[float] = None,
+    max_gross: Optional[float] = None,
+    periods_per_year: int = 365
+) -> Dict[str, np.ndarray]:
+    """
+    Backtest a batch of signal matrices against one forward returns matrix.
+
+    A ticker without a return in a period (not listed yet, delisted) holds no position.
+    Trading costs are fee_rate times the traded notional, starting from a flat book.
+
+    Parameters:
+    signals (np.ndarray): (..., T, N) target positions, broadcast against forward_returns.
+    forward_returns (np.ndarray): (T, N) returns earned from t to t + 1.
+    fee_rate (float): Fee per unit of traded notional (0.001 is 10 bps).
+    max_position (float): Maximum absolute position per ticker.
+    max_gross (float): Maximum gross exposure per period.
+    periods_per_year (int): Periods per year used to annualise the Sharpe ratio (365 for daily crypto).
+
+    Returns:
+    Dict[str, np.ndarray]: 'positions' (..., T, N); 'gross_pnl', 'fees', 'pnl', 'turnover',
+    'equity', 'drawdown' (..., T); 'total_return', 'sharpe', 'max_drawdown', 'mean_turnover' (...).
+    """
+    forward_returns = np.asarray(forward_returns, dtype='float64')
+    tradable = ~np.isnan(forward_returns)
+    positions = np.where(tradable, np.nan_to_num(np.asarray(signals, dtype='float64')), 0.0)
+    positions = apply_position_limits(positions, max_position, max_gross)
+
+    gross_pnl = (positions * np.where(tradable, forward_returns, 0.0)).sum(axis=-1)
+    previous = np.concatenate([np.zeros_like(positions[..., :1, :]), positions[..., :-1, :]], axis=-2)
+    turnover = np.abs(positions - previous).sum(axis=-1)
+    fees = fee_rate * turnover
+    pnl = gross_pnl - fees
+
+    equity = np.cumprod(1.0 + pnl, axis=-1)
+    drawdowns = drawdown(equity)
+    return {
+        'positions': positions,
+        'gross_pnl': gross_pnl,
+        'fees': fees,
+        'pnl': pnl,
+        'turnover': turnover,
+        'equity': equity,
+        'drawdown': drawdowns,
+        'total_return': equity[..., -1] - 1.0,
+        'sharpe': sharpe_ratio(pnl, periods_per_year),
+        'max_drawdown': drawdowns.min(axis=-1),
+        'mean_turnover': turnover.mean(axis=-1),
+    }
+
+
+def summarize_backtest(result: Dict[str, np.ndarray], variants: Optional[pd.Index] = None) -> pd.DataFrame:
+    """
+    One row of summary statistics per signal variant.
+
+    Parameters:
+    result (Dict[str, np.ndarray]): Output of run_backtest.
+    variants (pd.Index): Labels of the flattened leading axes, e.g. the thresholds of a sweep.
+
+    Returns:
+    pd.DataFrame: total_return, sharpe, max_drawdown, mean_turnover and total_fees per variant.
+    """
+    summary = pd.DataFrame({
+        'total_return': np.ravel(result['total_return']),
+        'sharpe': np.ravel(result['sharpe']),
+        'max_drawdown': np.ravel(result['max_drawdown']),
+        'mean_turnover': np.ravel(result['mean_turnover']),
+        'total_fees': np.ravel(result['fees'].sum(axis=-1)),
+    })
+    if variants is not None:
+        summary.index = variants
+    return summary
+
+
+def sweep_thresholds(
+    scores: pd.DataFrame,
+    forward_returns: pd.DataFrame,
+    thresholds: Sequence[float],
+    fee_rate: float = 0.001,
+    max_position: Optional[float] = None,
+    max_gross: Optional[float] = None,
+    periods_per_year: int = 365
+) -> pd.DataFrame:
+    """
+    Summary statistics of a threshold sweep, evaluated as one (K, T, N) backtest.
+
+    Parameters:
+    scores (pd.DataFrame): (time x ticker) model scores.
+    forward_returns (pd.DataFrame): (time x ticker) forward returns, aligned on scores.
+    thresholds (Sequence[float]): Minimum absolute scores to trade.
+    fee_rate (float): Fee per unit of traded notional.
+    max_position (float): Maximum absolute position per ticker.
+    max_gross (float): Maximum gross exposure per period.
+    periods_per_year (int): Periods per year used to annualise the Sharpe ratio.
+
+    Returns:
+    pd.DataFrame: One row per threshold.
+    """
+    forward_returns = forward_returns.reindex(index=scores.index, columns=scores.columns)
+    signals = threshold_signals(scores.to_numpy(dtype='float64'), thresholds)
+    result = run_backtest(signals, forward_returns.to_numpy(dtype='float64'), fee_rate, max_position, max_gross, periods_per_year)
+    return summarize_backtest(result, pd.Index(thresholds, name='threshold'))
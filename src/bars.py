@@ -0,0 +1,314 @@
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.kline_cache import interval_to_timedelta
+
+# Default paths do not depend on the working directory the module is run from
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = REPO_ROOT / 'data'
+
+##########################################################################
+########################    BAR RESAMPLING   #############################
+##########################################################################
+# Klines are fetched once at a fine base interval with every column (see
+# fetch_all_candlestick_data(full=True)) and coarser bars are aggregated from them.
+# Buckets start at multiples of the interval since the epoch, which puts 4h and 1d bars
+# on the Binance boundaries (00:00 UTC); weekly bars start on Monday 00:00 UTC like
+# Binance '1w' klines.
+BASE_INTERVAL = '1h'
+BAR_INTERVALS = ['4h', '1d', '1w']
+AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'closeTime': 'last',
+    'quoteAssetVolume': 'sum',
+    'numberOfTrades': 'sum',
+    'takerBuyBaseVol': 'sum',
+    'takerBuyQuoteVol': 'sum',
+}
+# The epoch was a Thursday, weekly buckets are shifted to start on Monday 1970-01-05
+WEEK_OFFSET_NS = 4 * 24 * 3600 * 10**9
+
+
+def _to_epoch_ns(times: pd.Series) -> np.ndarray:
+    """
+    Nanoseconds since the epoch of naive UTC datetimes or of int64 epoch milliseconds
+    (the compact layout of compact_candlestick_data).
+    """
+    if pd.api.types.is_integer_dtype(times):
+        return times.to_numpy(dtype='int64') * 10**6
+    return pd.to_datetime(times).dt.as_unit('ns').to_numpy().astype('int64')
+
+
+def bucket_start(open_times: np.ndarray, interval: str) -> np.ndarray:
+    """
+    Open time of the bar of `interval` holding every base bar.
+
+    Parameters:
+    open_times (np.ndarray): Base bar open times in nanoseconds since the epoch.
+    interval (str): Target interval, e.g. '4h', '1d' or '1w'.
+
+    Returns:
+    np.ndarray: Bucket open times in nanoseconds since the epoch.
+    """
+    step = int(pd.Timedelta(interval_to_timedelta(interval)).value)
+    offset = WEEK_OFFSET_NS if interval.endswith('w') else 0
+    return (open_times - offset) // step * step + offset
+
+
+def resample_bars(
+    bars: pd.DataFrame,
+    intervals: List[str] = BAR_INTERVALS,
+    base_interval: str = BASE_INTERVAL
+) -> Dict[str, pd.DataFrame]:
+    """
+    Aggregate base bars of every symbol into coarser bars, all symbols at once.
+
+    The rows are sorted by (ticker, open time) once. Every interval is then a single pass
+    of NumPy reductions over the contiguous (ticker, bucket) runs, no per-group Python.
+
+    Parameters:
+    bars (pd.DataFrame): Long base bars with 'dateTime', 'ticker' and any AGGREGATIONS
+        columns, e.g. fetch_all_candlestick_data(interval='1h', full=True).
+    intervals (List[str]): Target intervals, multiples of base_interval.
+    base_interval (str): Interval of the input bars.
+
+    Returns:
+    Dict[str, pd.DataFrame]: Interval to bars with 'dateTime' (bucket open time), 'ticker',
+    the aggregated columns, 'n_bars' (base bars in the bucket) and 'complete' (all the
+    base bars of the bucket are present; the last bucket of a symbol usually is not).
+    """
+    base_step = interval_to_timedelta(base_interval)
+    columns = [col for col in AGGREGATIONS if col in bars.columns]
+    tickers = pd.Categorical(bars['ticker'].astype(str))
+    codes = tickers.codes
+    times = _to_epoch_ns(bars['dateTime'])
+    order = np.lexsort((times, codes))
+    codes, times = codes[order], times[order]
+    values = {col: bars[col].to_numpy()[order] for col in columns}
+
+    resampled = {}
+    for interval in intervals:
+        step = interval_to_timedelta(interval)
+        if step % base_step:
+            raise ValueError(f"Interval {interval} is not a multiple of the base interval {base_interval}")
+        buckets = bucket_start(times, interval)
+        new_group = np.ones(len(times), dtype=bool)
+        new_group[1:] = (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])
+        starts = np.flatnonzero(new_group)
+        ends = np.append(starts[1:], len(times)) - 1
+
+        frame = {
+            'dateTime': pd.to_datetime(buckets[starts], unit='ns'),
+            'ticker': pd.Categorical.from_codes(codes[starts], tickers.categories),
+        }
+        for col in columns:
+            column = values[col]
+            how = AGGREGATIONS[col]
+            if how == 'first':
+                frame[col] = column[starts]
+            elif how == 'last':
+                frame[col] = column[ends]
+            elif how == 'max':
+                frame[col] = np.maximum.reduceat(column, starts) if len(starts) else column[:0]
+            elif how == 'min':
+                frame[col] = np.minimum.reduceat(column, starts) if len(starts) else column[:0]
+            else:
+                frame[col] = np.add.reduceat(column, starts) if len(starts) else column[:0]
+        frame['n_bars'] = ends - starts + 1
+        frame['complete'] = frame['n_bars'] == step // base_step
+        resampled[interval] = pd.DataFrame(frame)
+    return resampled
+
+
+def bar_matrix(bars: pd.DataFrame, field: str = 'close') -> pd.DataFrame:
+    """
+    (time x ticker) matrix of one field of long bars, the input of FeatureEngine.
+    """
+    return bars.pivot(index='dateTime', columns='ticker', values=field).rename_axis(columns=None)
+
+
+##########################################################################
+##########################    BAR CACHE   ################################
+##########################################################################
+# Layout of the cache:
+#   {cache_dir}/interval={interval}/bars.parquet   aggregated bars of every ticker
+#   {cache_dir}/_manifest.json                     base interval and last folded base bar per ticker
+# An update only re-aggregates, per ticker, the buckets from the one holding its first
+# new base bar onward, the older buckets are read back from the cache.
+MANIFEST_FILE = '_manifest.json'
+INT64_MIN, INT64_MAX = np.iinfo('int64').min, np.iinfo('int64').max
+
+
+def _ticker_values(tickers: pd.Series, values: pd.Series, default: int) -> np.ndarray:
+    """
+    int64 value of the ticker of every row, default for the tickers missing from values.
+    """
+    lookup = np.append(values.to_numpy(dtype='int64'), np.int64(default))
+    # get_indexer returns -1 for missing tickers, which picks the trailing default
+    return lookup[pd.Index(values.index).get_indexer(tickers)]
+
+
+def read_bar_manifest(cache_dir: str) -> Dict:
+    """
+    Manifest of the bar cache, empty if the cache does not exist yet.
+    """
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def bar_cache_path(cache_dir: str, interval: str) -> str:
+    return os.path.join(cache_dir, f"interval={interval}", 'bars.parquet')
+
+
+def read_bars(
+    cache_dir: str,
+    interval: str,
+    tickers: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    complete_only: bool = False
+) -> pd.DataFrame:
+    """
+    Read cached bars without any API call.
+
+    Parameters:
+    cache_dir (str): Root directory of the bar cache.
+    interval (str): Bar interval, one of the intervals of update_bar_cache.
+    tickers (List[str]): Tickers to read, all of them if None.
+    start (str): First bar open time to read.
+    complete_only (bool): Drop the buckets still missing base bars.
+
+    Returns:
+    pd.DataFrame: Bars sorted by ticker and open time.
+    """
+    path = bar_cache_path(cache_dir, interval)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {interval} bars in {cache_dir}, run update_bar_cache first")
+    filters = []
+    if tickers is not None:
+        filters.append(('ticker', 'in', list(tickers)))
+    if start is not None:
+        filters.append(('dateTime', '>=', pd.Timestamp(start)))
+    bars = pd.read_parquet(path, filters=filters or None)
+    if complete_only:
+        bars = bars[bars['complete']]
+    return bars.reset_index(drop=True)
+
+
+def update_bar_cache(
+    cache_dir: str,
+    base_bars: pd.DataFrame,
+    base_interval: str = BASE_INTERVAL,
+    intervals: List[str] = BAR_INTERVALS
+) -> Dict[str, int]:
+    """
+    Fold new base bars into the cached bars of every interval.
+
+    Parameters:
+    cache_dir (str): Root directory of the bar cache.
+    base_bars (pd.DataFrame): Base bars of every ticker, e.g. the history returned by
+        fetch_all_candlestick_data(interval=base_interval, cache_dir=..., full=True). The base
+        bars of a partially cached bucket must be included, the full history always is.
+    base_interval (str): Interval of base_bars.
+    intervals (List[str]): Intervals to maintain.
+
+    Returns:
+    Dict[str, int]: Number of bars recomputed per interval.
+    """
+    manifest = read_bar_manifest(cache_dir)
+    if manifest and manifest['base_interval'] != base_interval:
+        raise ValueError(f"{cache_dir} aggregates {manifest['base_interval']} bars, not {base_interval}")
+    last_open = manifest.get('last_open_ms', {})
+
+    tickers = base_bars['ticker'].astype(str)
+    times = _to_epoch_ns(base_bars['dateTime'])
+    folded = _ticker_values(tickers, pd.Series(last_open, dtype='int64') * 10**6, INT64_MIN)
+    is_new = times > folded
+    if not is_new.any():
+        return {interval: 0 for interval in intervals}
+    first_new = pd.Series(times[is_new]).groupby(tickers[is_new].to_numpy()).min()
+
+    recomputed = {}
+    for interval in intervals:
+        # Per ticker, the bucket holding the first new base bar and every later one are rebuilt
+        cutoff = pd.Series(bucket_start(first_new.to_numpy(), interval), index=first_new.index)
+        fresh = resample_bars(
+            base_bars[times >= _ticker_values(tickers, cutoff, INT64_MAX)], [interval], base_interval
+        )[interval]
+
+        path = bar_cache_path(cache_dir, interval)
+        if os.path.exists(path):
+            cached = pd.read_parquet(path)
+            cached_cutoff = _ticker_values(cached['ticker'].astype(str), cutoff, INT64_MAX)
+            cached = cached[_to_epoch_ns(cached['dateTime']) < cached_cutoff]
+            frames = [cached.astype({'ticker': str}), fresh.astype({'ticker': str})]
+            fresh_all = pd.concat([frame for frame in frames if len(frame)], ignore_index=True)
+        else:
+            fresh_all = fresh.astype({'ticker': str})
+        fresh_all = fresh_all.sort_values(['ticker', 'dateTime']).reset_index(drop=True)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fresh_all.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        recomputed[interval] = len(fresh)
+
+    # The manifest is written last, an interrupted update is redone from the old state
+    last_times = pd.Series(times).groupby(tickers.to_numpy()).max()
+    last_open.update({ticker: int(ns // 10**6) for ticker, ns in last_times.items()})
+    with open(os.path.join(cache_dir, MANIFEST_FILE), 'w') as file:
+        json.dump({
+            'base_interval': base_interval,
+            'intervals': sorted(set(manifest.get('intervals', [])) | set(intervals)),
+            'last_open_ms': last_open,
+            'updated': datetime.now().isoformat(timespec='seconds')
+        }, file, indent=2)
+    logging.info(f"Bar cache {cache_dir}: {recomputed} bars recomputed")
+    return recomputed
+
+
+def get_multi_interval_bars(
+    client,
+    trading_pairs: List[str],
+    base_interval: str = BASE_INTERVAL,
+    intervals: List[str] = BAR_INTERVALS,
+    days_back: int = 365,
+    kline_cache_dir: str = str(DATA_DIR / 'klines'),
+    bar_cache_dir: str = str(DATA_DIR / 'bars')
+) -> Dict[str, pd.DataFrame]:
+    """
+    Download the missing base klines once, refresh the bar cache and return every interval.
+
+    Parameters:
+    client (Client): An instance of the Binance Client.
+    trading_pairs (List[str]): A list of trading pair symbols.
+    base_interval (str): Interval fetched from Binance.
+    intervals (List[str]): Coarser intervals built from it.
+    days_back (int): History requested on the first run, later runs only fetch new candles.
+    kline_cache_dir (str): Root directory of the kline cache (see src.kline_cache).
+    bar_cache_dir (str): Root directory of the bar cache.
+
+    Returns:
+    Dict[str, pd.DataFrame]: Interval to bars, base_interval included.
+    """
+    from src.get_data import fetch_all_candlestick_data
+
+    base_bars = fetch_all_candlestick_data(
+        client, trading_pairs, base_interval, days_back, cache_dir=kline_cache_dir, full=True
+    )
+    update_bar_cache(bar_cache_dir, base_bars, base_interval, intervals)
+    bars = {interval: read_bars(bar_cache_dir, interval, trading_pairs) for interval in intervals}
+    bars[base_interval] = base_bars
+    return bars
@@ -0,0 +1,644 @@
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from queue import Empty
+from typing import List, Dict, Optional
+
+import pandas as pd
+
+from src.fakes import FakeBinanceClient
+from src.get_data import (
+    TokenBucket,
+    compact_candlestick_data,
+    fetch_all_candlestick_data,
+    fetch_candlestick_data
+)
+from src.instrumentation import RSSSampler
+
+##########################################################################
+#######################    FETCH THROUGHPUT   ############################
+##########################################################################
+def benchmark_fetch_throughput(
+    symbol_counts: List[int] = [10, 50, 100],
+    max_workers_list: List[int] = [1, 8, 32],
+    latency: float = 0.05,
+    error_rate: float = 0.02,
+    days_back: int = 365,
+    weight_per_minute: int = 60_000
+) -> pd.DataFrame:
+    """
+    Measure fetch_all_candlestick_data throughput against a local FakeBinanceClient.
+
+    Parameters:
+    symbol_counts (List[int]): Numbers of trading pairs to download.
+    max_workers_list (List[int]): Thread pool sizes to compare (1 is the serial download).
+    latency (float): Simulated latency of every kline page in seconds.
+    error_rate (float): Probability of a simulated HTTP 429 per kline page.
+    days_back (int): Days of daily candles requested per pair.
+    weight_per_minute (int): Request-weight budget of the token bucket.
+
+    Returns:
+    pd.DataFrame: One row per (n_symbols, max_workers) with wall time, symbols/s and request counts.
+    """
+    results = []
+    for n_symbols in symbol_counts:
+        for max_workers in max_workers_list:
+            client = FakeBinanceClient(n_symbols=n_symbols, latency=latency, error_rate=error_rate, retry_after=0.01)
+            rate_limiter = TokenBucket(capacity=weight_per_minute, refill_rate=weight_per_minute / 60)
+            start = time.perf_counter()
+            data = fetch_all_candlestick_data(
+                client,
+                client.symbols(),
+                interval='1d',
+                days_back=days_back,
+                max_workers=max_workers,
+                rate_limiter=rate_limiter,
+                progress_callback=None
+            )
+            elapsed = time.perf_counter() - start
+            results.append({
+                'n_symbols': n_symbols,
+                'max_workers': max_workers,
+                'seconds': elapsed,
+                'symbols_per_second': n_symbols / elapsed,
+                'rows': len(data),
+                'requests': client.n_requests,
+                'simulated_429': client.n_errors
+            })
+            logging.info(f"{n_symbols} symbols, {max_workers} workers: {elapsed:.2f}s")
+    return pd.DataFrame(results)
+
+
+##########################################################################
+####################    CANDLESTICK ACCUMULATION   #######################
+##########################################################################
+ACCUMULATION_VARIANTS = ['repeated_concat', 'single_concat', 'single_concat_compact']
+
+
+def _accumulate(variant: str, frames: List[pd.DataFrame]) -> pd.DataFrame:
+    if variant == 'repeated_concat':
+        # Former fetch_all_candlestick_data loop, kept as the reference
+        all_data = pd.DataFrame()
+        for frame in frames:
+            all_data = pd.concat([all_data, frame], ignore_index=True)
+        return all_data
+    if variant == 'single_concat_compact':
+        # Same per-pair compaction as fetch_all_candlestick_data(compact=True)
+        frames = [compact_candlestick_data(frame, categorical_ticker=False) for frame in frames]
+        all_data = pd.concat(frames, ignore_index=True)
+        all_data['ticker'] = all_data['ticker'].astype('category')
+        return all_data
+    return pd.concat(frames, ignore_index=True)
+
+
+def _get_result(queue, process, poll_seconds: float = 1.0):
+    """
+    Next item sent by a benchmark child process.
+
+    Raises RuntimeError when the process exits without sending it, e.g. after a crash or
+    an out-of-memory kill, instead of waiting on the queue forever.
+    """
+    while True:
+        try:
+            return queue.get(timeout=poll_seconds)
+        except Empty:
+            if process.is_alive():
+                continue
+        # The process may have sent its last item right before exiting
+        try:
+            return queue.get(timeout=poll_seconds)
+        except Empty:
+            raise RuntimeError(f"Benchmark process exited with code {process.exitcode} without a result") from None
+
+
+def _run_accumulation(variant: str, n_symbols: int, days_back: int, queue) -> None:
+    client = FakeBinanceClient(n_symbols=n_symbols, latency=0)
+    frames = [fetch_candlestick_data(client, symbol, '1d', days_back) for symbol in client.symbols()]
+    with RSSSampler() as sampler:
+        start = time.perf_counter()
+        all_data = _accumulate(variant, frames)
+        elapsed = time.perf_counter() - start
+    queue.put({
+        'variant': variant,
+        'n_symbols': n_symbols,
+        'rows': len(all_data),
+        'seconds': elapsed,
+        'peak_rss_increase_mb': sampler.peak_increase_bytes / 2**20,
+        'result_mb': all_data.memory_usage(deep=True).sum() / 2**20
+    })
+
+
+def benchmark_accumulation(n_symbols: int = 500, days_back: int = 2000) -> pd.DataFrame:
+    """
+    Compare the former repeated pd.concat accumulation with the single concatenation.
+
+    Each variant runs in a fresh process, so that its peak RSS is not hidden by the
+    high-water mark of a previous variant.
+
+    Parameters:
+    n_symbols (int): Number of synthetic trading pairs.
+    days_back (int): Number of daily candles per trading pair.
+
+    Returns:
+    pd.DataFrame: One row per variant with wall time, peak RSS increase and result size.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    results = []
+    for variant in ACCUMULATION_VARIANTS:
+        process = context.Process(target=_run_accumulation, args=(variant, n_symbols, days_back, queue))
+        process.start()
+        results.append(_get_result(queue, process))
+        process.join()
+    return pd.DataFrame(results)
+
+
+##########################################################################
+########################    MODEL LOADING   ##############################
+##########################################################################
+def benchmark_model_loading(
+    n_samples: int = 20_000,
+    n_features: int = 100,
+    hidden_layer_sizes: tuple = (512, 512),
+    n_loads: int = 5
+) -> pd.DataFrame:
+    """
+    Compare loading models from raw pickle files and from memory-mapped model directories.
+
+    Parameters:
+    n_samples (int): Number of synthetic training rows.
+    n_features (int): Number of synthetic features.
+    hidden_layer_sizes (tuple): Hidden layers of the MLP, its weights dominate the file size.
+    n_loads (int): Number of loads averaged per format.
+
+    Returns:
+    pd.DataFrame: One row per (model, format) with file size and mean load time.
+    """
+    import pickle
+    import tempfile
+
+    import numpy as np
+    from sklearn.ensemble import AdaBoostClassifier
+    from sklearn.neural_network import MLPClassifier
+
+    from src.model_store import export_model, load_model, model_file
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(n_samples, n_features))
+    y = (X[:, 0] + rng.normal(size=n_samples) > 0).astype(int)
+    models = {
+        'Neural Net': MLPClassifier(hidden_layer_sizes=hidden_layer_sizes, max_iter=5, random_state=42),
+        'AdaBoost': AdaBoostClassifier(n_estimators=200, random_state=42),
+    }
+
+    directory = tempfile.mkdtemp()
+    results = []
+    for name, model in models.items():
+        model.fit(X, y)
+        pickle_path = os.path.join(directory, f"{name}.pkl")
+        with open(pickle_path, 'wb') as file:
+            pickle.dump(model, file)
+        store_path = export_model(model, os.path.join(directory, name))
+
+        def load_pickle():
+            with open(pickle_path, 'rb') as file:
+                return pickle.load(file)
+
+        store_size = os.path.getsize(model_file(store_path))
+        loaders = {
+            'pickle': (load_pickle, os.path.getsize(pickle_path)),
+            'model_store_mmap': (lambda: load_model(store_path, mmap_mode='r'), store_size),
+            'model_store_copy': (lambda: load_model(store_path, mmap_mode=None), store_size),
+        }
+        for format_name, (loader, size) in loaders.items():
+            start = time.perf_counter()
+            for _ in range(n_loads):
+                loader()
+            results.append({
+                'model': name,
+                'format': format_name,
+                'file_mb': size / 2**20,
+                'load_ms': (time.perf_counter() - start) / n_loads * 1000
+            })
+    return pd.DataFrame(results)
+
+
+##########################################################################
+####################    OFFLINE PIPELINE SUITE   #########################
+##########################################################################
+SUITE_STAGES = ['fetch_binance', 'fetch_coinmetrics', 'quality_checks', 'merge', 'features', 'train', 'predict']
+
+
+def suite_metrics(file_path_metrics: str, n_metrics: int) -> List[str]:
+    """
+    The first n_metrics metrics of the metrics file plus those used by the ratio features.
+    """
+    from src.get_data import get_metrics_names
+    from src.preprocesing import COINMETRICS_RATIO_FEATURES
+
+    ratio_metrics = [feature[side] for feature in COINMETRICS_RATIO_FEATURES for side in ('numerator', 'denominator')]
+    metrics = get_metrics_names(file_path_metrics)[:n_metrics]
+    return metrics + [metric for metric in dict.fromkeys(ratio_metrics) if metric not in metrics]
+
+
+def _run_suite_scale(
+    n_assets: int,
+    days: int,
+    n_metrics: int,
+    n_folds: int,
+    latency: float,
+    file_path_metrics: str,
+    file_path_metadata: str,
+    queue
+) -> None:
+    import tempfile
+
+    import numpy as np
+    from sklearn.ensemble import AdaBoostClassifier
+    from sklearn.neural_network import MLPClassifier
+
+    from src.data_quality_checks import check_data_quality
+    from src.fakes import FakeCoinMetricsClient
+    from src.feature_store import join_coinmetrics_binance
+    from src.get_data import fetch_asset_metrics
+    from src.prediction_service import PredictionService
+    from src.preprocesing import COINMETRICS_RATIO_FEATURES, DEFAULT_FEATURES, FeatureEngine, coinmetrics_to_wide
+    from src.schema import read_metric_metadata
+    from src.train_models import train_walk_forward
+
+    metrics = suite_metrics(file_path_metrics, n_metrics)
+    binance_client = FakeBinanceClient(n_symbols=n_assets, latency=latency)
+    coinmetrics_client = FakeCoinMetricsClient(n_assets, latency, read_metric_metadata(file_path_metrics, file_path_metadata))
+    symbol_map = pd.DataFrame({'asset': coinmetrics_client.assets(), 'ticker': binance_client.symbols()})
+    start_time = (pd.Timestamp.now(tz='UTC').floor('D') - pd.Timedelta(days=days)).strftime('%Y-%m-%d')
+    artifacts_dir = tempfile.mkdtemp()
+    outputs = {}
+
+    def run_binance():
+        return fetch_all_candlestick_data(
+            binance_client, binance_client.symbols(), interval='1d', days_back=days, max_workers=8,
+            rate_limiter=TokenBucket(capacity=10**9, refill_rate=10**9), progress_callback=None
+        )
+
+    def run_features():
+        binance_data = outputs['fetch_binance']
+        close = binance_data.pivot_table(index='dateTime', columns='ticker', values='close', observed=True)
+        ratio_metrics = [f[side] for f in COINMETRICS_RATIO_FEATURES for side in ('numerator', 'denominator')]
+        wide = coinmetrics_to_wide(
+            outputs['fetch_coinmetrics'], list(dict.fromkeys(ratio_metrics)),
+            symbol_map.set_index('asset')['ticker'].to_dict(), close.index, close.columns
+        )
+        return FeatureEngine(close, wide).compute(DEFAULT_FEATURES + COINMETRICS_RATIO_FEATURES)
+
+    def run_train():
+        rows = outputs['features'].replace([np.inf, -np.inf], np.nan)
+        rows = rows[rows['target'].notna()].dropna()
+        classifiers = {
+            'Neural Net': MLPClassifier(hidden_layer_sizes=(32,), max_iter=20, random_state=42),
+            'AdaBoost': AdaBoostClassifier(n_estimators=20, random_state=42),
+        }
+        return train_walk_forward(
+            rows.drop(columns='target'), (rows['target'] > 0).astype(int), list(classifiers),
+            list(classifiers.values()), n_folds=n_folds, artifacts_dir=artifacts_dir
+        )
+
+    def run_predict():
+        results = outputs['train']
+        last_fold = results[results['fold'] == results['fold'].max()]
+        features = outputs['features'].drop(columns='target').replace([np.inf, -np.inf], np.nan).dropna()
+        return PredictionService(dict(zip(last_fold['model'], last_fold['artifact_path']))).predict(features)
+
+    stages = {
+        'fetch_binance': run_binance,
+        'fetch_coinmetrics': lambda: fetch_asset_metrics(coinmetrics_client, coinmetrics_client.assets(), metrics, start_time),
+        'quality_checks': lambda: check_data_quality(
+            outputs['fetch_coinmetrics'], file_path_metrics, file_path_metadata=file_path_metadata
+        ),
+        'merge': lambda: join_coinmetrics_binance(outputs['fetch_coinmetrics'], outputs['fetch_binance'], symbol_map),
+        'features': run_features,
+        'train': run_train,
+        'predict': run_predict,
+    }
+    # The sentinel is sent even when a stage raises, the parent then reports the exit code
+    try:
+        for stage in SUITE_STAGES:
+            # Rows processed: the input rows for checks and training, the output rows otherwise
+            with RSSSampler() as sampler:
+                start = time.perf_counter()
+                outputs[stage] = stages[stage]()
+                elapsed = time.perf_counter() - start
+            if stage == 'quality_checks':
+                rows = len(outputs['fetch_coinmetrics'])
+            elif stage == 'train':
+                rows = int(outputs['train']['n_train'].sum())
+            else:
+                rows = len(outputs[stage])
+            queue.put({
+                'n_assets': n_assets,
+                'days': days,
+                'n_metrics': len(metrics),
+                'stage': stage,
+                'seconds': elapsed,
+                'rows': rows,
+                'rows_per_second': rows / elapsed if elapsed > 0 else None,
+                'peak_rss_increase_mb': sampler.peak_increase_bytes / 2**20,
+                'rss_mb': sampler.peak / 2**20,
+            })
+    finally:
+        queue.put(None)
+
+
+def benchmark_pipeline_suite(
+    asset_counts: List[int] = [10, 100, 1000],
+    days: int = 365,
+    n_metrics: int = 20,
+    n_folds: int = 3,
+    latency: float = 0.0,
+    file_path_metrics: str = '../data/static/metrics.txt',
+    file_path_metadata: str = '../data/static/metric_metadata.csv',
+    output_path: str = None
+) -> pd.DataFrame:
+    """
+    Run every pipeline stage against the local Binance and CoinMetrics stand-ins at several scales.
+
+    Every scale runs in a fresh process, so that its memory figures are not hidden by
+    the high-water mark of a previous scale. No network access or API key is needed.
+
+    Parameters:
+    asset_counts (List[int]): Numbers of assets (and Binance pairs) to benchmark.
+    days (int): Days of history per asset.
+    n_metrics (int): Number of CoinMetrics metrics, plus those used by the ratio features.
+    n_folds (int): Walk-forward folds of the training stage.
+    latency (float): Simulated latency per API page, 0 measures the local work only.
+    file_path_metrics (str): Path of the metric names file.
+    file_path_metadata (str): Path of the metric metadata file.
+    output_path (str): JSON-lines file receiving one line per (scale, stage), appended to.
+
+    Returns:
+    pd.DataFrame: One row per (n_assets, stage) with seconds, rows, rows per second,
+    peak RSS increase and peak RSS.
+    """
+    import json
+    import platform
+
+    import numpy as np
+
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    results = []
+    for n_assets in asset_counts:
+        process = context.Process(
+            target=_run_suite_scale,
+            args=(n_assets, days, n_metrics, n_folds, latency, file_path_metrics, file_path_metadata, queue)
+        )
+        process.start()
+        while True:
+            row = _get_result(queue, process)
+            if row is None:
+                break
+            results.append(row)
+            logging.info(f"{n_assets} assets, {row['stage']}: {row['seconds']:.2f}s")
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"Benchmark at {n_assets} assets failed with exit code {process.exitcode}")
+
+    results = pd.DataFrame(results)
+    if output_path is not None:
+        environment = {
+            'run': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'cpu_count': os.cpu_count(),
+        }
+        with open(output_path, 'a') as file:
+            for row in results.to_dict(orient='records'):
+                file.write(json.dumps(dict(row, **environment)) + '\n')
+    return results
+
+
+##########################################################################
+######################    STREAMING INGESTION   ##########################
+##########################################################################
+def benchmark_streaming(
+    symbol_counts: List[int] = [10, 100, 400],
+    n_bars: int = 200,
+    interval: str = '1m',
+    updates_per_bar: int = 1,
+    capacity: int = 500,
+    events_per_second: Optional[float] = None
+) -> pd.DataFrame:
+    """
+    Replay recorded klines through a local websocket server into KlineStream.
+
+    Every closed bar goes through the ring buffer, the cross-section batcher and the
+    online features, so the latency is end to end up to the features.
+
+    Parameters:
+    symbol_counts (List[int]): Numbers of streamed symbols.
+    n_bars (int): Bars replayed per symbol.
+    interval (str): Kline interval of the recording.
+    updates_per_bar (int): In-progress events sent before every closed bar.
+    capacity (int): Bars kept per symbol by the ring buffer.
+    events_per_second (float): Replay pace per connection, as fast as possible if None (the
+        latency then includes the time spent queued behind the backlog).
+
+    Returns:
+    pd.DataFrame: One row per symbol count with events/sec and latency percentiles.
+    """
+    import asyncio
+
+    from src.kline_cache import interval_to_timedelta
+    from src.preprocesing import OnlineFeatureState
+    from src.streaming import CrossSectionBatcher, KlineStream, ReplayServer, StreamingPredictor, record_klines
+
+    end = pd.Timestamp.now().floor(interval_to_timedelta(interval))
+    start = end - n_bars * interval_to_timedelta(interval)
+    results = []
+    for n_symbols in symbol_counts:
+        client = FakeBinanceClient(n_symbols=n_symbols, latency=0.0)
+        recording = record_klines(client, client.symbols(), interval, str(start), str(end))
+        with ReplayServer(recording, interval, updates_per_bar, events_per_second) as url:
+            predictor = StreamingPredictor(OnlineFeatureState(client.symbols()))
+            stream = KlineStream(
+                client.symbols(), interval, capacity, CrossSectionBatcher(client.symbols(), predictor),
+                base_url=url, reconnect=False
+            )
+            summary = asyncio.run(stream.run())
+        results.append(dict({'n_symbols': n_symbols, 'n_connections': len(stream.urls)}, **summary))
+    return pd.DataFrame(results)
+
+
+##########################################################################
+#####################    PORTFOLIO CONSTRUCTION   ########################
+##########################################################################
+def benchmark_portfolio(
+    sizes: List[tuple] = [(100, 2000), (500, 2000), (1000, 3000)],
+    n_variants: int = 10,
+    max_turnover: float = 0.3,
+    repeat: int = 3
+) -> pd.DataFrame:
+    """
+    Time build_portfolio and run_backtest on random scores, volatilities and returns.
+
+    Parameters:
+    sizes (List[tuple]): (tickers, days) of every case.
+    n_variants (int): Leading variant axis K of the (K, T, N) scores, e.g. search candidates.
+    max_turnover (float): Turnover limit, the only step looping over time.
+    repeat (int): Runs per case, the best one is reported.
+
+    Returns:
+    pd.DataFrame: One row per case with the best seconds of the sizing, the turnover limit and the backtest.
+    """
+    import numpy as np
+
+    from src.backtest import run_backtest
+    from src.portfolio import build_portfolio
+
+    rng = np.random.default_rng(0)
+    results = []
+    for n_tickers, n_days in sizes:
+        scores = rng.uniform(-1, 1, (n_variants, n_days, n_tickers))
+        volatility = rng.uniform(0.005, 0.1, (n_days, n_tickers))
+        returns = rng.normal(0, 0.03, (n_days, n_tickers))
+        timings = {'caps_s': [], 'turnover_s': [], 'backtest_s': []}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            build_portfolio(scores, volatility, max_position=0.05, max_gross=1.0, max_net=0.2)
+            timings['caps_s'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            weights = build_portfolio(scores, volatility, max_position=0.05, max_gross=1.0, max_net=0.2, max_turnover=max_turnover)
+            timings['turnover_s'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            run_backtest(weights, returns)
+            timings['backtest_s'].append(time.perf_counter() - start)
+        results.append(dict(
+            {'n_tickers': n_tickers, 'n_days': n_days, 'n_variants': n_variants},
+            **{name: round(min(values), 4) for name, values in timings.items()}
+        ))
+    return pd.DataFrame(results)
+
+
+##########################################################################
+#########################    IMPORT TIME   ###############################
+##########################################################################
+# Modules costing seconds to import, only loaded by the functions needing them
+HEAVY_MODULES = ['binance', 'coinmetrics', 'sklearn', 'joblib', 'pyarrow.dataset']
+# Entry points with their import-time budget in milliseconds and the modules they must not load.
+# Budgets leave room for slower machines, pandas alone takes a few hundred milliseconds.
+IMPORT_GUARDS = {
+    'src.config': {'budget_ms': 50, 'forbidden': HEAVY_MODULES + ['numpy', 'pandas', 'pyarrow']},
+    'src.model_store': {'budget_ms': 300, 'forbidden': HEAVY_MODULES + ['pandas']},
+    'src.get_data': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.data_quality_checks': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.schema': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.reconcile': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.preprocesing': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.train_models': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.search': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.portfolio': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.monitoring': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.predict': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.prediction_service': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.main': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES},
+    'src.streaming': {'budget_ms': 1500, 'forbidden': HEAVY_MODULES + ['websockets']},
+}
+
+
+def import_times(module: str) -> Dict[str, float]:
+    """
+    Cumulative import time of every module loaded by 'import module' in a fresh interpreter.
+
+    Parameters:
+    module (str): Dotted module name, e.g. 'src.get_data'.
+
+    Returns:
+    Dict[str, float]: Module name to cumulative import time in milliseconds, parsed from
+    the output of python -X importtime.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=root
+    )
+    if completed.returncode != 0:
+        raise ImportError(f"Importing {module} failed:\n{completed.stderr}")
+    times = {}
+    # Lines look like 'import time:   self [us] | cumulative | imported package'
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def benchmark_import_time(guards: Dict[str, Dict] = IMPORT_GUARDS, repeat: int = 3) -> pd.DataFrame:
+    """
+    Import time of every entry point against its budget and its forbidden modules.
+
+    Parameters:
+    guards (Dict[str, Dict]): Entry point to {'budget_ms': float, 'forbidden': List[str]}.
+    repeat (int): Fresh interpreters per entry point, the fastest one is kept (the first
+        run may include compiling the bytecode).
+
+    Returns:
+    pd.DataFrame: One row per entry point with its import time, budget, the forbidden
+    modules it loaded and whether it passed.
+    """
+    results = []
+    for module, guard in guards.items():
+        runs = [import_times(module) for _ in range(repeat)]
+        # Forbidden packages loaded directly or through one of their submodules
+        loaded = sorted({
+            heavy for heavy in guard['forbidden'] for name in runs[0]
+            if name == heavy or name.startswith(f"{heavy}.")
+        })
+        import_ms = min(run[module] for run in runs)
+        results.append({
+            'module': module,
+            'import_ms': round(import_ms, 1),
+            'budget_ms': guard['budget_ms'],
+            'heavy_modules': ','.join(loaded),
+            'passed': import_ms <= guard['budget_ms'] and not loaded
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline benchmarks against local API stand-ins.")
+    parser.add_argument(
+        'benchmark', nargs='?', default='suite', choices=['suite', 'fetch', 'accumulation', 'model_loading', 'streaming', 'portfolio', 'import_time']
+    )
+    parser.add_argument('--assets', type=int, nargs='+', default=[10, 100, 1000], help="Asset counts of the suite")
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--metrics', type=int, default=20, help="Number of CoinMetrics metrics of the suite")
+    parser.add_argument('--latency', type=float, default=0.0, help="Simulated latency per API page")
+    parser.add_argument('--output', default=None, help="JSON-lines file receiving the suite results")
+    args = parser.parse_args()
+
+    if args.benchmark == 'suite':
+        print(benchmark_pipeline_suite(
+            args.assets, args.days, args.metrics, latency=args.latency, output_path=args.output
+        ).to_string(index=False))
+    elif args.benchmark == 'fetch':
+        print(benchmark_fetch_throughput().to_string(index=False))
+    elif args.benchmark == 'accumulation':
+        print(benchmark_accumulation().to_string(index=False))
+    elif args.benchmark == 'streaming':
+        print(benchmark_streaming().to_string(index=False))
+    elif args.benchmark == 'portfolio':
+        print(benchmark_portfolio().to_string(index=False))
+    elif args.benchmark == 'import_time':
+        report = benchmark_import_time()
+        print(report.to_string(index=False))
+        # Non-zero exit so that CI fails when an entry point regresses
+        sys.exit(0 if report['passed'].all() else 1)
+    else:
+        print(benchmark_model_loading().to_string(index=False))
@@ -0,0 +1,123 @@
+import csv
+import logging
+from typing import List, Dict
+
+# Lightweight configuration and metadata loaders. This module only uses the standard
+# library so that entry points which just need a list of assets or metrics (quality
+# checks, reconciliation, the prediction service) do not import the API clients, pyarrow
+# or sklearn. Keep it that way: heavy imports belong inside the functions
+# that need them.
+
+##########################################################################
+#########################    STATIC FILES   ##############################
+##########################################################################
+METRIC_KINDS = ['count', 'float', 'level', 'timestamp']
+
+
+def get_metrics_names(file_path: str) -> List[str]:
+    """
+    Read metric names from a file and return them as a list.
+
+    Returns:
+    List[str]: A list containing metric names.
+
+    Raises:
+    FileNotFoundError: If the specified file is not found.
+    Exception: If an error occurs while reading the file.
+    """
+    # Initialize an empty list to store metric names
+    metric_names = []
+
+    try:
+        # Open the file in read mode
+        with open(file_path, 'r') as file:
+            # Read all lines from the file
+            lines = file.readlines()
+
+            # Remove leading and trailing whitespaces and add each line to the list
+            metric_names = [line.strip() for line in lines]
+
+    except FileNotFoundError:
+        # Handle file not found error
+        print(f"File '{file_path}' not found.")
+    except Exception as e:
+        # Handle other exceptions
+        print(f"An error occurred: {e}")
+
+    # Return the list of metric names
+    return metric_names
+
+
+def get_asset_names(file_path: str)-> List[str]:
+    """
+    Read asset names from a file and return them as a list.
+
+    Returns:
+    List[str]: A list containing asset names.
+
+    Raises:
+    FileNotFoundError: If the specified file is not found.
+    Exception: If an error occurs while reading the file.
+    """
+    # Initialize an empty list to store asset names
+    asset_names = []
+
+    try:
+        # Open the file in read mode
+        with open(file_path, 'r') as file:
+            # Read all lines from the file
+            lines = file.readlines()
+
+            # Remove leading and trailing whitespaces and add each line to the list
+            asset_names = [line.strip() for line in lines]
+
+    except FileNotFoundError:
+        # Handle file not found error
+        print(f"File '{file_path}' not found.")
+    except Exception as e:
+        # Handle other exceptions
+        print(f"An error occurred: {e}")
+
+    # Return the list of asset names
+    return asset_names
+
+
+def read_metric_metadata(
+    file_path_metrics: str = '../data/static/metrics.txt',
+    file_path_metadata: str = '../data/static/metric_metadata.csv'
+) -> Dict[str, str]:
+    """
+    Kind of every metric of the metrics file (see the dtype policy of src.schema).
+
+    Parameters:
+    file_path_metrics (str): Path of the metric names file.
+    file_path_metadata (str): CSV with 'metric' and 'kind' columns.
+
+    Returns:
+    Dict[str, str]: Metric name to kind, 'float' for metrics without metadata.
+    """
+    with open(file_path_metadata, newline='') as file:
+        metadata = {row['metric']: row['kind'] for row in csv.DictReader(file)}
+    unknown = set(metadata.values()) - set(METRIC_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown metric kinds {sorted(unknown)} in {file_path_metadata}")
+    return {metric: metadata.get(metric, 'float') for metric in get_metrics_names(file_path_metrics)}
+
+
+##########################################################################
+###########################    LOGGING   #################################
+##########################################################################
+def configure_logger() -> None:
+    """
+    Configure the logging format and level.
+
+    This function configures the logging format, level, and date format.
+
+    Returns:
+    None
+    """
+    logging.basicConfig(
+        format='%(asctime)s %(levelname)-8s %(message)s',
+        level=logging.INFO,
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
@@ -0,0 +1,264 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from src.config import configure_logger, get_asset_names, read_metric_metadata
+from src.reconcile import read_metrics_csv
+
+# Default paths do not depend on the working directory the module is run from
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = REPO_ROOT / 'data'
+
+##########################################################################
+##################    COMMUNITY DUMP CONVERSION   ########################
+##########################################################################
+# Community-network dumps (https://coinmetrics.io/community-network-data/) hold one asset
+# per CSV, e.g. btc.csv or eth_dump.csv, with a 'time' column and one column per metric.
+# They are converted once into:
+#   {root}/asset={asset}/year={year}/part-0.parquet
+#   {root}/_manifest.json   source file, first and last day and rows of every asset
+# Every column has an explicit type derived from the metric kinds of src.config, the same
+# dtype policy as src.schema: counts int64, floats float32, levels float64, timestamps
+# and 'time' UTC timestamps. Parquet statistics let readers skip row groups on 'time'.
+MANIFEST_FILE = '_manifest.json'
+PARTITIONING = ds.partitioning(pa.schema([('asset', pa.string()), ('year', pa.int32())]), flavor='hive')
+KIND_TYPES = {
+    'count': pa.int64(),
+    'float': pa.float32(),
+    'level': pa.float64(),
+    'timestamp': pa.timestamp('ns', tz='UTC'),
+}
+FLOAT32_MAX = float(np.finfo('float32').max)
+
+
+def dump_asset(file_path: str) -> str:
+    """
+    Asset of a dump file, the file name up to its first '_' or '.' ('eth_dump.csv' -> 'eth').
+    """
+    return os.path.basename(file_path).split('.')[0].split('_')[0].lower()
+
+
+def dump_schema(metric_kinds: Dict[str, str]) -> pa.Schema:
+    """
+    Schema of the converted dumps, without the partition columns.
+    """
+    fields = [('time', pa.timestamp('ns', tz='UTC'))]
+    fields += [(metric, KIND_TYPES[kind]) for metric, kind in metric_kinds.items()]
+    return pa.schema(fields)
+
+
+def _cast_metric(column: pa.ChunkedArray, metric: str, target: pa.DataType) -> pa.ChunkedArray:
+    """
+    Cast a metric column read as float64 (or string for timestamps) to its target type.
+    """
+    if pa.types.is_timestamp(target):
+        times = pd.to_datetime(column.to_pandas(), utc=True, format='mixed')
+        return pa.chunked_array([pa.array(times, type=target)])
+    if pa.types.is_float32(target):
+        # Casting to float32 turns values beyond its range into inf instead of failing
+        largest = pc.max(pc.abs(column)).as_py()
+        if largest is not None and largest > FLOAT32_MAX:
+            raise ValueError(f"{metric} reaches {largest:.3g}, beyond float32: declare it as 'level'")
+    try:
+        # Safe casts refuse fractional counts
+        return column.cast(target, safe=True)
+    except pa.ArrowInvalid as error:
+        raise ValueError(f"{metric} cannot be stored as {target}: {error}")
+
+
+def convert_dump(
+    file_path: str,
+    root: str,
+    metric_kinds: Dict[str, str],
+    asset: Optional[str] = None,
+    row_group_size: int = 366
+) -> Dict:
+    """
+    Convert one community dump into the asset partition of the dataset.
+
+    The CSV is parsed by pyarrow with explicit column types (no inference), the previous
+    partition of the asset is replaced.
+
+    Parameters:
+    file_path (str): Path of the CSV dump.
+    root (str): Root directory of the dataset.
+    metric_kinds (Dict[str, str]): Output of read_metric_metadata.
+    asset (str): Asset of the dump, derived from the file name if None.
+    row_group_size (int): Maximum rows per Parquet row group (a year of days by default).
+
+    Returns:
+    Dict: Asset, source file, rows, first and last day, and conversion time.
+    """
+    start = time.perf_counter()
+    asset = asset or dump_asset(file_path)
+    metrics = list(metric_kinds)
+    table = read_metrics_csv(file_path, metrics, asset)
+    schema = dump_schema(metric_kinds)
+
+    columns = [table.column('time').cast(schema.field('time').type)]
+    for metric in metrics:
+        columns.append(_cast_metric(table.column(metric), metric, schema.field(metric).type))
+    converted = pa.Table.from_arrays(columns, schema=schema)
+    converted = converted.sort_by('time')
+    converted = converted.append_column('asset', pa.array([asset] * len(converted), pa.string()))
+    converted = converted.append_column('year', pc.cast(pc.year(converted.column('time')), pa.int32()))
+
+    ds.write_dataset(
+        converted,
+        root,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template='part-{i}.parquet',
+        # Replaces the years of this asset written by an earlier conversion
+        existing_data_behavior='delete_matching',
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=0
+    )
+    times = converted.column('time')
+    return {
+        'asset': asset,
+        'source': os.path.abspath(file_path),
+        'rows': len(converted),
+        'first_day': pc.min(times).as_py().strftime('%Y-%m-%d') if len(converted) else None,
+        'last_day': pc.max(times).as_py().strftime('%Y-%m-%d') if len(converted) else None,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def read_dump_manifest(root: str) -> Dict[str, Dict]:
+    """
+    Conversion record of every asset of the dataset, empty if it does not exist yet.
+    """
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)['assets']
+
+
+def convert_dumps(
+    file_paths: List[str],
+    root: str,
+    file_path_metrics: str = str(DATA_DIR / 'static' / 'metrics.txt'),
+    file_path_metadata: str = str(DATA_DIR / 'static' / 'metric_metadata.csv'),
+    max_workers: int = 4
+) -> pd.DataFrame:
+    """
+    Convert community dumps into the partitioned dataset, one process per file.
+
+    Parameters:
+    file_paths (List[str]): CSV dumps, one asset per file.
+    root (str): Root directory of the dataset.
+    file_path_metrics (str): Path of the metric names file.
+    file_path_metadata (str): Path of the metric metadata file.
+    max_workers (int): Number of worker processes.
+
+    Returns:
+    pd.DataFrame: One row per converted file with its asset, rows, days and time.
+    """
+    metric_kinds = read_metric_metadata(file_path_metrics, file_path_metadata)
+    assets = [dump_asset(path) for path in file_paths]
+    duplicated = sorted({asset for asset in assets if assets.count(asset) > 1})
+    if duplicated:
+        raise ValueError(f"Several dumps for the assets {duplicated}")
+    os.makedirs(root, exist_ok=True)
+
+    # Every file writes its own asset partition, so the workers never touch the same directory
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(convert_dump, file_paths, [root] * len(file_paths), [metric_kinds] * len(file_paths)))
+
+    manifest = read_dump_manifest(root)
+    manifest.update({result['asset']: result for result in results})
+    with open(os.path.join(root, MANIFEST_FILE), 'w') as file:
+        json.dump({'assets': manifest, 'updated': datetime.now().isoformat(timespec='seconds')}, file, indent=2)
+    return pd.DataFrame(results)
+
+
+##########################################################################
+########################    HISTORY READER   #############################
+##########################################################################
+def read_coinmetrics_history(
+    root: str,
+    assets: Optional[List[str]] = None,
+    metrics: Optional[List[str]] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Read converted dumps in the layout of get_coinmetrics_data.
+
+    The asset and year directories outside the request are never opened and row groups
+    are skipped on their 'time' statistics.
+
+    Parameters:
+    root (str): Root directory of the dataset.
+    assets (List[str]): Assets to read, all of them if None.
+    metrics (List[str]): Metrics to read, all of them if None.
+    start_time (str): First day to read (inclusive).
+    end_time (str): Last day to read (exclusive).
+
+    Returns:
+    pd.DataFrame: One row per (asset, time) with a UTC 'time' and one column per metric.
+    """
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING)
+    expression = None
+
+    def combine(condition):
+        return condition if expression is None else expression & condition
+
+    if assets is not None:
+        expression = combine(ds.field('asset').isin(assets))
+    if start_time is not None:
+        start = pd.Timestamp(start_time, tz='UTC')
+        expression = combine((ds.field('year') >= start.year) & (ds.field('time') >= pa.scalar(start, pa.timestamp('ns', tz='UTC'))))
+    if end_time is not None:
+        end = pd.Timestamp(end_time, tz='UTC')
+        expression = combine((ds.field('year') <= end.year) & (ds.field('time') < pa.scalar(end, pa.timestamp('ns', tz='UTC'))))
+
+    available = [name for name in dataset.schema.names if name not in ('asset', 'time', 'year')]
+    metric_columns = available if metrics is None else [metric for metric in metrics if metric in available]
+    table = dataset.to_table(columns=['asset', 'time'] + metric_columns, filter=expression)
+    # Counts keep their integer type with missing days as pd.NA, like the API data
+    history = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+    history['asset'] = history['asset'].astype(str)
+    return history.sort_values(['asset', 'time']).reset_index(drop=True)
+
+
+##########################################################################
+###########################    ENTRY POINT   #############################
+##########################################################################
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Convert CoinMetrics community CSV dumps to partitioned Parquet.")
+    parser.add_argument('dumps', nargs='+', help="CSV dumps, one asset per file (btc.csv, eth_dump.csv, ...)")
+    parser.add_argument('--output', default=str(DATA_DIR / 'coinmetrics_history'), help="Root directory of the dataset")
+    parser.add_argument('--metrics', default=str(DATA_DIR / 'static' / 'metrics.txt'))
+    parser.add_argument('--metadata', default=str(DATA_DIR / 'static' / 'metric_metadata.csv'))
+    parser.add_argument('--assets', default=None, help="Only convert the dumps of the assets of this file")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    configure_logger()
+    dumps = args.dumps
+    if args.assets is not None:
+        wanted = set(get_asset_names(args.assets))
+        dumps = [path for path in dumps if dump_asset(path) in wanted]
+    start = time.perf_counter()
+    report = convert_dumps(dumps, args.output, args.metrics, args.metadata, args.workers)
+    logging.info(f"Converted {len(report)} dumps, {report['rows'].sum()} rows, in {time.perf_counter() - start:.1f}s")
+    print(report.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,16 +2,21 @@ import logging
 import numpy as np
 from pandas import (
     DataFrame,
+    Series,
+    concat,
     isna,
+    read_csv,
     to_datetime,
     date_range
 )
-from typing import List, Dict, Union
+from pandas.api.types import is_numeric_dtype
+from typing import Iterator, List, Dict, Optional
 
-from src.get_data import get_asset_names
+from src.config import get_asset_names, read_metric_metadata
+from src.instrumentation import input_rows, timed
 
-logging.basicConfig(level=logging.ERROR)
 
+@timed(rows=input_rows)
 def verify_data_is_not_empty(df: DataFrame, asset_name: str) -> None:
     logging.info(f"Verifying {asset_name} data is not empty")
     try:
@@ -19,6 +24,7 @@ def verify_data_is_not_empty(df: DataFrame, asset_name: str) -> None:
     except:
         print(f"AssertionError: {asset_name}: Dataframe is empty")
 
+@timed(rows=input_rows)
 def verify_dataframe_is_not_all_nan(
     df: DataFrame,
     asset_name: str,
@@ -30,6 +36,7 @@ def verify_dataframe_is_not_all_nan(
     except:
         print(f"AssertionError: {asset_name}: Entire DataFrame is not NaN")
 
+@timed(rows=input_rows)
 def verify_last_row_is_nan(
     df: DataFrame,
     asset_name: str,
@@ -41,6 +48,7 @@ def verify_last_row_is_nan(
     except:
         print(f"AssertionError: {asset_name}: Last row is not all NaN")
 
+@timed(rows=input_rows)
 def verify_second_to_last_row_is_not_nan(
     df: DataFrame,
     asset_name: str,
@@ -52,6 +60,7 @@ def verify_second_to_last_row_is_not_nan(
     except:
         print(f"AssertionError: {asset_name}: Second to last row is all NaN")
 
+@timed(rows=input_rows)
 def verify_no_duplicates(df: DataFrame, asset_name: str,) -> None:
     logging.info(f"Verifying {asset_name} dataframe has no duplicates")
     try:
@@ -59,6 +68,7 @@ def verify_no_duplicates(df: DataFrame, asset_name: str,) -> None:
     except:
         print(f"AssertionError: {asset_name}: DataFrame contains duplicates")
 
+@timed(rows=input_rows)
 def verify_column_names(
     df: DataFrame,
     asset_name: str,
@@ -74,6 +84,7 @@ def verify_column_names(
         print(f"Columns not downloaded: {asset_name}: ", set(metrics_names+default_columns).difference(set(df.columns)))
         print(f"Columns downloaded but not in wanted list {asset_name}: ", set(df.columns).difference(set(metrics_names+default_columns)))
 
+@timed(rows=input_rows)
 def verify_data_types(
     df: DataFrame,
     asset_name: str,
@@ -90,6 +101,7 @@ def verify_data_types(
         except AssertionError:
             print(f"AssertionError: {asset_name}: {col} is not of type {allowed_types}. it is of type {df[col].dtype}")
 
+@timed(rows=input_rows)
 def verify_dates_are_sorted(df: DataFrame, date_column: str, asset_name: str,) -> None:
     logging.info(f"Verifying {asset_name} dates are sorted")
     try:
@@ -97,6 +109,7 @@ def verify_dates_are_sorted(df: DataFrame, date_column: str, asset_name: str,) -
     except:
         logging.error(f"AssertionError: {asset_name}: Dates are not sorted")
 
+@timed(rows=input_rows)
 def verify_no_missing_dates(df: DataFrame, asset_name: str) -> None:
     logging.info(f"Verifying {asset_name} has no missing dates")
     df['time'] = to_datetime(df['time']).dt.date
@@ -106,6 +119,7 @@ def verify_no_missing_dates(df: DataFrame, asset_name: str) -> None:
     except:
         print(f"AssertionError: {asset_name}: Missing dates {set(possible_date_range).difference(df['time'])}")
 
+@timed(rows=input_rows)
 def verify_values_positive(
     df: DataFrame,
     asset_name: str,
@@ -122,26 +136,412 @@ def verify_values_positive(
     except:
         print(f"AssertionError: {asset_name}: DataFrame contains negative values : {df_with_wanted_downloaded_columns_no_na[df_with_wanted_downloaded_columns_no_na < 0]}")
 
+@timed(rows=input_rows)
 def calculate_nan_percentage(df: DataFrame, asset_name: str,) -> None:
     logging.info(f"Calculating {asset_name} NaN percentage")
     logging.info(f"{asset_name}: The percentage of NaN values (except the last row) is: {df.iloc[:-1].isna().mean().mean() * 100:.2f}%")
 
 # =============================================================================
-def check_data_quality(coinmetrics_data: DataFrame) -> None:
-    not_nan_columns_names = ['asset',"time", "ReferenceRate", "ReferenceRateUSD", "ReferenceRateEUR"]
-    file_path_metrics = '../data/static/metrics.txt'
-    default_columns = ['asset',"time"]
-    date_column='time'
-    for (asset_name, df) in coinmetrics_data.groupby('asset'):
-        verify_data_is_not_empty(df, asset_name)
-        verify_dataframe_is_not_all_nan(df, asset_name, not_nan_columns_names)
-        verify_last_row_is_nan(df, asset_name, not_nan_columns_names)
-        verify_second_to_last_row_is_not_nan(df, asset_name, not_nan_columns_names)
-        verify_no_duplicates(df, asset_name)
-        verify_column_names(df, asset_name, file_path_metrics, default_columns)
-        verify_data_types(df, asset_name, file_path_metrics)
-        verify_dates_are_sorted(df, date_column, asset_name)
-        verify_no_missing_dates(df, asset_name)
-        verify_values_positive(df, asset_name, file_path_metrics)
-        calculate_nan_percentage(df, asset_name)
+# Vectorized engine: every check is computed for all assets at once from a
+# handful of per-asset statistics, then turned into a (asset, check, passed,
+# detail) report. The statistics are additive so that they can also be
+# accumulated batch by batch.
+DEFAULT_NOT_NAN_COLUMNS = ['asset', "time", "ReferenceRate", "ReferenceRateUSD", "ReferenceRateEUR"]
+DEFAULT_COLUMNS = ['asset', "time"]
+# Nullable dtypes of the API frame, plus the compact dtypes of src.schema. The policy
+# keeps float64 for the metrics of kind 'level' only, anywhere else it is a wrong type.
+ALLOWED_TYPES = ['Int64', 'Float64', 'Int32', 'float32']
+LEVEL_TYPES = ['float64']
+REPORT_COLUMNS = ['asset', 'check', 'passed', 'detail']
 
+
+def compute_quality_stats(
+    coinmetrics_data: DataFrame,
+    metrics_names: List[str],
+    not_nan_columns_names: List[str] = DEFAULT_NOT_NAN_COLUMNS,
+    date_column: str = 'time'
+) -> Dict[str, DataFrame]:
+    """
+    Compute the per-asset statistics behind every data quality check in one pass.
+
+    Parameters:
+    coinmetrics_data (DataFrame): CoinMetrics data with an 'asset' column, in download order.
+        Every repetition of an (asset, time) key counts as a duplicate.
+    metrics_names (List[str]): Expected metric names.
+    not_nan_columns_names (List[str]): Columns ignored by the NaN row checks.
+    date_column (str): Name of the date column.
+
+    Returns:
+    Dict[str, DataFrame]: 'assets' holds one row of statistics per asset, 'negatives'
+    the number of negative values per (asset, metric).
+    """
+    assets = coinmetrics_data['asset'].astype(str).to_numpy()
+    position_from_end = coinmetrics_data.groupby(assets, sort=False).cumcount(ascending=False).to_numpy()
+
+    checked_columns = coinmetrics_data.columns.difference(not_nan_columns_names, sort=False)
+    row_non_null = coinmetrics_data[checked_columns].notna().sum(axis=1).to_numpy()
+    row_nan = coinmetrics_data.isna().sum(axis=1).to_numpy()
+
+    times = to_datetime(coinmetrics_data[date_column], utc=True)
+    days = times.dt.floor('D')
+    time_values = times.astype('int64').to_numpy()
+    previous_time_values = Series(time_values).groupby(assets, sort=False).shift().to_numpy()
+
+    rows = DataFrame({
+        'asset': assets,
+        'rows': 1,
+        'non_null_values': row_non_null,
+        'last_row_non_null': np.where(position_from_end == 0, row_non_null, 0),
+        'second_to_last_row_non_null': np.where(position_from_end == 1, row_non_null, 0),
+        'duplicates': DataFrame({'asset': assets, 'time': time_values}).duplicated().to_numpy(),
+        'unsorted': time_values < previous_time_values,
+        'nan_cells_except_last_row': np.where(position_from_end > 0, row_nan, 0),
+        'first_day': days.to_numpy(),
+        'last_day': days.to_numpy(),
+    })
+    stats = rows.groupby('asset').agg(
+        rows=('rows', 'sum'),
+        non_null_values=('non_null_values', 'sum'),
+        last_row_non_null=('last_row_non_null', 'sum'),
+        second_to_last_row_non_null=('second_to_last_row_non_null', 'sum'),
+        duplicates=('duplicates', 'sum'),
+        unsorted=('unsorted', 'sum'),
+        nan_cells_except_last_row=('nan_cells_except_last_row', 'sum'),
+        first_day=('first_day', 'min'),
+        last_day=('last_day', 'max'),
+    )
+    stats['distinct_days'] = Series(days.to_numpy()).groupby(assets).nunique()
+    stats['n_columns'] = coinmetrics_data.shape[1]
+
+    numeric_metrics = [
+        col for col in coinmetrics_data.columns
+        if col in set(metrics_names) and is_numeric_dtype(coinmetrics_data[col])
+    ]
+    negatives = (coinmetrics_data[numeric_metrics] < 0).fillna(False).astype('int64').groupby(assets).sum()
+
+    return {'assets': stats, 'negatives': negatives}
+
+
+def build_quality_report(
+    stats: Dict[str, DataFrame],
+    columns: List[str],
+    dtypes: Dict[str, str],
+    metrics_names: List[str],
+    default_columns: List[str] = DEFAULT_COLUMNS,
+    allowed_types: List[str] = ALLOWED_TYPES,
+    metric_kinds: Optional[Dict[str, str]] = None
+) -> DataFrame:
+    """
+    Turn the statistics of compute_quality_stats into a data quality report.
+
+    Parameters:
+    stats (Dict[str, DataFrame]): Output of compute_quality_stats.
+    columns (List[str]): Columns of the CoinMetrics data.
+    dtypes (Dict[str, str]): Dtype name of every column.
+    metrics_names (List[str]): Expected metric names.
+    default_columns (List[str]): Expected non-metric columns.
+    allowed_types (List[str]): Allowed dtypes of the metric columns.
+    metric_kinds (Dict[str, str]): Output of read_metric_metadata, metrics of kind 'level'
+        may also be LEVEL_TYPES.
+
+    Returns:
+    DataFrame: One row per (asset, check) with columns asset, check, passed and detail.
+    """
+    assets = stats['assets']
+    negatives = stats['negatives'].reindex(assets.index, fill_value=0)
+    expected_columns = set(metrics_names + default_columns)
+
+    # Schema checks do not depend on the asset, compute them once
+    missing_columns = expected_columns.difference(columns)
+    extra_columns = set(columns).difference(expected_columns)
+    columns_detail = (
+        f"Columns not downloaded: {sorted(missing_columns)}; "
+        f"Columns downloaded but not in wanted list: {sorted(extra_columns)}"
+        if missing_columns or extra_columns else ''
+    )
+    metric_kinds = metric_kinds or {}
+    wrong_types = {
+        col: dtypes[col] for col in columns
+        if col in set(metrics_names) and dtypes[col] not in allowed_types
+        and not (metric_kinds.get(col) == 'level' and dtypes[col] in LEVEL_TYPES)
+    }
+    types_detail = (
+        "; ".join(f"{col} is of type {dtype}" for col, dtype in sorted(wrong_types.items()))
+        if wrong_types else ''
+    )
+
+    expected_days = (assets['last_day'] - assets['first_day']).dt.days + 1
+    missing_days = expected_days - assets['distinct_days']
+    nan_cells = (assets['rows'] - 1).clip(lower=0) * assets['n_columns']
+    nan_percentage = assets['nan_cells_except_last_row'] / nan_cells.where(nan_cells > 0) * 100
+    negative_metrics = negatives.apply(lambda row: sorted(row[row > 0].index), axis=1)
+
+    checks = {
+        'not_empty': (assets['rows'] > 0, "Dataframe is empty"),
+        'not_all_nan': (assets['non_null_values'] > 0, "Entire DataFrame is NaN"),
+        'last_row_is_nan': (assets['last_row_non_null'] == 0, "Last row is not all NaN"),
+        'second_to_last_row_is_not_nan': (
+            (assets['rows'] >= 2) & (assets['second_to_last_row_non_null'] > 0),
+            "Second to last row is all NaN"
+        ),
+        'no_duplicates': (assets['duplicates'] == 0, assets['duplicates'].map("{} duplicated rows".format)),
+        'column_names': (Series(not columns_detail, index=assets.index), columns_detail),
+        'data_types': (Series(not types_detail, index=assets.index), types_detail),
+        'dates_sorted': (assets['unsorted'] == 0, assets['unsorted'].map("{} dates out of order".format)),
+        'no_missing_dates': (missing_days == 0, missing_days.map("{} missing dates".format)),
+        'values_positive': (
+            negatives.sum(axis=1) == 0,
+            negative_metrics.map(lambda cols: f"Negative values in {cols}")
+        ),
+        'nan_percentage': (
+            Series(True, index=assets.index),
+            nan_percentage.map(lambda pct: f"{pct:.2f}% NaN values (except the last row)")
+        ),
+    }
+
+    report = []
+    for check, (passed, detail) in checks.items():
+        detail = detail if isinstance(detail, Series) else Series(detail, index=assets.index)
+        report.append(DataFrame({
+            'asset': assets.index,
+            'check': check,
+            'passed': passed.to_numpy(dtype=bool),
+            # Failure messages only matter for failed checks, nan_percentage is informational
+            'detail': np.where(passed.to_numpy(dtype=bool) & (check != 'nan_percentage'), '', detail.to_numpy()),
+        }))
+    return concat(report).sort_values(['asset'], kind='stable').reset_index(drop=True)
+
+
+@timed(rows=input_rows)
+def check_data_quality(
+    coinmetrics_data: DataFrame,
+    file_path_metrics: str = '../data/static/metrics.txt',
+    not_nan_columns_names: List[str] = DEFAULT_NOT_NAN_COLUMNS,
+    default_columns: List[str] = DEFAULT_COLUMNS,
+    date_column: str = 'time',
+    file_path_metadata: str = '../data/static/metric_metadata.csv'
+) -> DataFrame:
+    """
+    Run every data quality check on all assets at once.
+
+    Parameters:
+    coinmetrics_data (DataFrame): CoinMetrics data as returned by get_coinmetrics_data.
+    file_path_metrics (str): Path of the metric names file, read once.
+    not_nan_columns_names (List[str]): Columns ignored by the NaN row checks.
+    default_columns (List[str]): Expected non-metric columns.
+    date_column (str): Name of the date column.
+    file_path_metadata (str): Path of the metric metadata file, gives the metrics kept in float64.
+
+    Returns:
+    DataFrame: One row per (asset, check) with columns asset, check, passed and detail.
+    """
+    metrics_names = get_asset_names(file_path_metrics)
+    metric_kinds = read_metric_metadata(file_path_metrics, file_path_metadata)
+    stats = compute_quality_stats(coinmetrics_data, metrics_names, not_nan_columns_names, date_column)
+    dtypes = {col: str(dtype) for col, dtype in coinmetrics_data.dtypes.items()}
+    report = build_quality_report(
+        stats, list(coinmetrics_data.columns), dtypes, metrics_names, default_columns, metric_kinds=metric_kinds
+    )
+    for row in report[~report['passed']].itertuples():
+        logging.info(f"{row.asset}: {row.check} failed: {row.detail}")
+    return report
+
+# =============================================================================
+# Streaming mode: the same statistics accumulated batch by batch, so that a
+# Parquet or CSV history can be checked with memory bounded by the batch size.
+def coinmetrics_csv_dtypes(metric_kinds: Dict[str, str]) -> Dict[str, str]:
+    """
+    Dtypes of the API frame for the metric columns of a CSV export.
+
+    Counts are nullable Int64 and the other numeric metrics Float64; timestamps are left
+    to parse_dates.
+    """
+    return {
+        metric: 'Int64' if kind == 'count' else 'Float64'
+        for metric, kind in metric_kinds.items() if kind != 'timestamp'
+    }
+
+
+def iter_coinmetrics_batches(
+    source: str,
+    batch_size: int = 100_000,
+    metric_kinds: Optional[Dict[str, str]] = None
+) -> Iterator[DataFrame]:
+    """
+    Read a Parquet or CSV CoinMetrics file batch by batch.
+
+    Parquet batches keep the pandas dtypes stored in the file metadata. CSV batches are
+    parsed with the nullable dtypes of the API data, set from the metric kinds so that
+    every batch gets the same dtypes whatever its values (a first batch of empty cells
+    would otherwise be read as object).
+
+    Parameters:
+    source (str): Path of a .parquet or .csv file.
+    batch_size (int): Number of rows per batch.
+    metric_kinds (Dict[str, str]): Output of read_metric_metadata, used for CSV files.
+
+    Yields:
+    DataFrame: Consecutive batches of rows.
+    """
+    if source.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        from pyarrow import Table
+
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield Table.from_batches([batch], schema=parquet_file.schema_arrow).to_pandas()
+    else:
+        metric_kinds = metric_kinds or {}
+        header = read_csv(source, nrows=0).columns
+        dtypes = {'asset': 'string'}
+        dtypes.update({col: dtype for col, dtype in coinmetrics_csv_dtypes(metric_kinds).items() if col in header})
+        timestamps = [col for col in header if metric_kinds.get(col) == 'timestamp']
+        yield from read_csv(source, chunksize=batch_size, dtype=dtypes, parse_dates=timestamps, dtype_backend='numpy_nullable')
+
+
+class StreamingQualityState:
+    """
+    Running per-asset state of the data quality checks.
+
+    Holds row and NaN counters, the last timestamp and the non-null counts of the last
+    two rows of every asset, the sets of times (duplicates) and of distinct days (missing
+    dates) of every asset, and the negative counts per metric. The time sets hold the
+    exact (asset, time) keys, so a repeated key counts wherever it appears. finalize
+    returns the same statistics as compute_quality_stats on the concatenated batches.
+
+    Parameters:
+    metrics_names (List[str]): Expected metric names.
+    not_nan_columns_names (List[str]): Columns ignored by the NaN row checks.
+    date_column (str): Name of the date column.
+    """
+
+    def __init__(
+        self,
+        metrics_names: List[str],
+        not_nan_columns_names: List[str] = DEFAULT_NOT_NAN_COLUMNS,
+        date_column: str = 'time'
+    ):
+        self.metrics_names = metrics_names
+        self.not_nan_columns_names = not_nan_columns_names
+        self.date_column = date_column
+        self.columns = None
+        self.dtypes = None
+        self.assets = DataFrame()
+        self.negatives = DataFrame()
+        self.times = {}
+        self.days = {}
+
+    def update(self, batch: DataFrame) -> None:
+        """
+        Fold one batch of rows into the state.
+
+        Parameters:
+        batch (DataFrame): Consecutive rows of the CoinMetrics data.
+
+        Returns:
+        None
+        """
+        if batch.empty:
+            return
+        if self.columns is None:
+            self.columns = list(batch.columns)
+            self.dtypes = {col: str(dtype) for col, dtype in batch.dtypes.items()}
+
+        batch_stats = compute_quality_stats(batch, self.metrics_names, self.not_nan_columns_names, self.date_column)
+        stats = batch_stats['assets']
+        assets = batch['asset'].astype(str).to_numpy()
+        times = to_datetime(batch[self.date_column], utc=True)
+        by_asset = times.groupby(assets, sort=False)
+        stats['first_time'] = by_asset.first()
+        stats['last_time'] = by_asset.last()
+        stats['last_row_nan'] = batch.isna().sum(axis=1).groupby(assets).last()
+
+        # Duplicates across batches: a key repeats one of the batch or one already seen
+        time_values = times.astype('int64').to_numpy()
+        duplicated = DataFrame({'asset': assets, 'time': time_values}).duplicated().to_numpy()
+        for asset, positions in Series(np.arange(len(batch))).groupby(assets):
+            seen = self.times.setdefault(asset, set())
+            positions = positions.to_numpy()
+            asset_times = time_values[positions].tolist()
+            duplicated[positions] |= np.array([value in seen for value in asset_times], dtype=bool)
+            seen.update(asset_times)
+        stats['duplicates'] = Series(duplicated).groupby(assets).sum()
+
+        day_values = times.dt.floor('D').astype('int64').to_numpy()
+        for asset, asset_days in Series(day_values).groupby(assets):
+            self.days.setdefault(asset, set()).update(asset_days.unique().tolist())
+
+        self.negatives = batch_stats['negatives'].add(self.negatives, fill_value=0)
+        self.assets = self._merge(self.assets, stats)
+
+    @staticmethod
+    def _merge(previous: DataFrame, stats: DataFrame) -> DataFrame:
+        continued = stats.index.intersection(previous.index)
+        if len(continued) == 0:
+            return concat([previous, stats])
+        old, new = previous.loc[continued], stats.loc[continued]
+        merged = new.copy()
+        for col in ['rows', 'non_null_values']:
+            merged[col] = old[col] + new[col]
+        # A batch boundary between two rows of an asset can hide one out-of-order pair
+        merged['unsorted'] = old['unsorted'] + new['unsorted'] + (new['first_time'] < old['last_time'])
+        merged['duplicates'] = old['duplicates'] + new['duplicates']
+        # The previous last row is not the last row anymore
+        merged['nan_cells_except_last_row'] = (
+            old['nan_cells_except_last_row'] + old['last_row_nan'] + new['nan_cells_except_last_row']
+        )
+        merged['first_day'] = np.minimum(old['first_day'], new['first_day'])
+        merged['last_day'] = np.maximum(old['last_day'], new['last_day'])
+        merged['second_to_last_row_non_null'] = new['second_to_last_row_non_null'].where(
+            new['rows'] > 1, old['last_row_non_null']
+        )
+        return concat([previous.drop(index=continued), merged, stats.drop(index=continued)])
+
+    def finalize(self) -> Dict[str, DataFrame]:
+        """
+        Statistics of all the batches seen so far, in the compute_quality_stats format.
+
+        Returns:
+        Dict[str, DataFrame]: 'assets' and 'negatives' statistics.
+        """
+        assets = self.assets.drop(columns=['first_time', 'last_time', 'last_row_nan']).copy()
+        assets['distinct_days'] = Series({asset: len(days) for asset, days in self.days.items()})
+        return {'assets': assets.sort_index(), 'negatives': self.negatives.astype('int64')}
+
+
+def check_data_quality_streaming(
+    source: str,
+    file_path_metrics: str = '../data/static/metrics.txt',
+    batch_size: int = 100_000,
+    not_nan_columns_names: List[str] = DEFAULT_NOT_NAN_COLUMNS,
+    default_columns: List[str] = DEFAULT_COLUMNS,
+    date_column: str = 'time',
+    file_path_metadata: str = '../data/static/metric_metadata.csv'
+) -> DataFrame:
+    """
+    Run every data quality check on a Parquet or CSV file without loading it in memory.
+
+    Produces the same report as check_data_quality on the full file, with memory
+    bounded by the batch size plus the per-asset state.
+
+    Parameters:
+    source (str): Path of a .parquet or .csv CoinMetrics file with an 'asset' column.
+    file_path_metrics (str): Path of the metric names file.
+    batch_size (int): Number of rows read at a time.
+    not_nan_columns_names (List[str]): Columns ignored by the NaN row checks.
+    default_columns (List[str]): Expected non-metric columns.
+    date_column (str): Name of the date column.
+    file_path_metadata (str): Path of the metric metadata file, sets the dtypes of CSV files
+        and the metrics kept in float64.
+
+    Returns:
+    DataFrame: One row per (asset, check) with columns asset, check, passed and detail.
+    """
+    metrics_names = get_asset_names(file_path_metrics)
+    state = StreamingQualityState(metrics_names, not_nan_columns_names, date_column)
+    metric_kinds = read_metric_metadata(file_path_metrics, file_path_metadata)
+    for batch in iter_coinmetrics_batches(source, batch_size, metric_kinds):
+        state.update(batch)
+    return build_quality_report(
+        state.finalize(), state.columns, state.dtypes, metrics_names, default_columns, metric_kinds=metric_kinds
+    )
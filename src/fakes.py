@@ -0,0 +1,259 @@
+import json
+import random
+import threading
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+##########################################################################
+#####################    FAKE BINANCE CLIENT   ###########################
+##########################################################################
+class FakeAPIException(Exception):
+    """
+    Error raised by FakeBinanceClient, shaped like binance.exceptions.BinanceAPIException.
+
+    Parameters:
+    status_code (int): HTTP status code of the simulated response.
+    retry_after (float): Value of the simulated Retry-After header, if any.
+    """
+
+    def __init__(self, status_code: int, retry_after: float = None):
+        super().__init__(f"APIError(code={status_code}): simulated error")
+        self.status_code = status_code
+        self.response = type('FakeResponse', (), {})()
+        self.response.headers = {} if retry_after is None else {'Retry-After': str(retry_after)}
+
+
+class FakeResponse:
+    """
+    Body of a simulated HTTP response, passed to the response hooks of FakeSession.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+
+class FakeSession:
+    """
+    Stand-in for the requests.Session of binance.client.Client, holding its response hooks.
+    """
+
+    def __init__(self):
+        self.hooks = {'response': []}
+
+
+class FakeBinanceClient:
+    """
+    Local stand-in for binance.client.Client generating deterministic synthetic klines.
+
+    Every kline page is passed as a JSON body to the response hooks of `session`, like
+    the requests session of the real client.
+
+    Parameters:
+    n_symbols (int): Number of USDT margin pairs listed by get_exchange_info.
+    latency (float): Simulated network latency in seconds for every kline page.
+    error_rate (float): Probability that a kline page answers with HTTP 429.
+    retry_after (float): Retry-After header attached to the simulated 429 responses.
+    seed (int): Seed of the error generator.
+    """
+
+    KLINE_INTERVAL_1DAY = '1d'
+    PAGE_LIMIT = 1500
+
+    def __init__(
+        self,
+        n_symbols: int = 100,
+        latency: float = 0.05,
+        error_rate: float = 0.0,
+        retry_after: float = None,
+        seed: int = 42
+    ):
+        self.n_symbols = n_symbols
+        self.latency = latency
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.n_requests = 0
+        self.n_errors = 0
+        self.session = FakeSession()
+
+    def symbols(self) -> List[str]:
+        return [f"SYM{i:04d}USDT" for i in range(self.n_symbols)]
+
+    def get_exchange_info(self) -> dict:
+        return {
+            'symbols': [
+                {'symbol': symbol, 'quoteAsset': 'USDT', 'status': 'TRADING', 'permissions': ['SPOT', 'MARGIN']}
+                for symbol in self.symbols()
+            ]
+        }
+
+    def _simulate_request(self) -> None:
+        with self.lock:
+            self.n_requests += 1
+            failed = self.random.random() < self.error_rate
+            if failed:
+                self.n_errors += 1
+        time.sleep(self.latency)
+        if failed:
+            raise FakeAPIException(429, self.retry_after)
+
+    def futures_historical_klines(self, symbol: str, interval: str, start_str, end_str=None, limit=None) -> list:
+        """
+        Return klines between start_str and end_str, paying the latency once per page of 1500 candles.
+        """
+        units = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+        step = pd.Timedelta(**{units[interval[-1]]: int(interval[:-1])})
+        end = pd.Timestamp(end_str) if end_str is not None else pd.Timestamp.now()
+        start = pd.Timestamp(start_str).ceil(step)
+        open_times = pd.date_range(start, end, freq=step, inclusive='left')
+
+        klines = synthetic_klines(symbol, open_times, step)
+        n_pages = max(1, -(-len(open_times) // self.PAGE_LIMIT))
+        for page in range(n_pages):
+            self._simulate_request()
+            if self.session.hooks['response']:
+                response = FakeResponse(json.dumps(klines[page * self.PAGE_LIMIT:(page + 1) * self.PAGE_LIMIT]).encode())
+                for hook in self.session.hooks['response']:
+                    hook(response)
+
+        return klines
+
+
+def synthetic_klines(symbol: str, open_times: pd.DatetimeIndex, step: pd.Timedelta) -> list:
+    """
+    Build deterministic klines in the raw Binance list-of-lists format.
+
+    Prices only depend on the symbol and on the candle open time, so that two
+    overlapping requests return identical candles.
+
+    Parameters:
+    symbol (str): The trading pair symbol.
+    open_times (pd.DatetimeIndex): Open time of every candle.
+    step (pd.Timedelta): Candle duration.
+
+    Returns:
+    list: One list of 12 fields per candle, like the Binance REST API.
+    """
+    open_ms = open_times.as_unit('ms').asi8
+    step_ms = int(step / pd.Timedelta(milliseconds=1))
+    seed = sum(map(ord, symbol))
+    close = _synthetic_price(open_ms, seed)
+    open_ = _synthetic_price(open_ms - step_ms, seed)
+    high = np.maximum(open_, close) * 1.01
+    low = np.minimum(open_, close) * 0.99
+    volume = 1000 + np.abs(close - open_) / close * 1e6
+    close_ms = open_ms + step_ms - 1
+    trades = (volume // 10).astype(int)
+    return [
+        [int(o), f"{op:.8f}", f"{h:.8f}", f"{lo:.8f}", f"{c:.8f}", f"{v:.8f}", int(ct),
+         f"{v * c:.8f}", int(n), f"{v / 2:.8f}", f"{v * c / 2:.8f}", "0"]
+        for o, op, h, lo, c, v, ct, n in zip(open_ms, open_, high, low, close, volume, close_ms, trades)
+    ]
+
+
+def _synthetic_price(time_ms: np.ndarray, seed: int) -> np.ndarray:
+    """
+    Price as a pure function of time, so that no state is carried between candles.
+    """
+    days = time_ms / 86_400_000
+    noise = np.sin(days * 12.9898 + seed * 78.233) * 43758.5453
+    noise = noise - np.floor(noise) - 0.5
+    return (10 + seed % 90) * np.exp(0.5 * np.sin(days / 60 + seed) + 0.05 * noise)
+
+
+##########################################################################
+###################    FAKE COINMETRICS CLIENT   #########################
+##########################################################################
+class FakeDataCollection:
+    """
+    Result of FakeCoinMetricsClient.get_asset_metrics, shaped like coinmetrics.api_client.DataCollection.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self.frame
+
+
+class FakeCoinMetricsClient:
+    """
+    Local stand-in for coinmetrics.api_client.CoinMetricsClient generating deterministic asset metrics.
+
+    Rows follow the API layout: 'asset', 'time' (UTC), one column per metric, counts as
+    Int64, timestamps as UTC datetimes and everything else as Float64. Like the live API,
+    the row of the current day has no values yet.
+
+    Parameters:
+    n_assets (int): Number of assets, named 'sym0000', 'sym0001', ... (the lower-case base
+        of the FakeBinanceClient pairs).
+    latency (float): Simulated latency in seconds per page of page_size rows.
+    metric_kinds (Dict[str, str]): Metric name to kind (see src.schema), 'float' for unknown metrics.
+    page_size (int): Rows per simulated page.
+    """
+
+    def __init__(self, n_assets: int = 100, latency: float = 0.05, metric_kinds: dict = None, page_size: int = 10_000):
+        self.n_assets = n_assets
+        self.latency = latency
+        self.metric_kinds = metric_kinds or {}
+        self.page_size = page_size
+        self.lock = threading.Lock()
+        self.n_requests = 0
+
+    def assets(self) -> List[str]:
+        return [f"sym{i:04d}" for i in range(self.n_assets)]
+
+    def get_asset_metrics(
+        self,
+        assets,
+        metrics,
+        frequency: str = '1d',
+        start_time=None,
+        end_time=None,
+        end_inclusive: bool = True,
+        **kwargs
+    ) -> FakeDataCollection:
+        """
+        Return daily metrics of the assets between start_time and end_time.
+        """
+        assets = [assets] if isinstance(assets, str) else list(assets)
+        metrics = [metrics] if isinstance(metrics, str) else list(metrics)
+        today = pd.Timestamp.now(tz='UTC').floor('D')
+        end = pd.Timestamp(end_time, tz='UTC') if end_time is not None else today
+        if end_time is None or end_inclusive:
+            end = end + pd.Timedelta(days=1)
+        days = pd.date_range(pd.Timestamp(start_time, tz='UTC').ceil('D'), min(end, today + pd.Timedelta(days=1)), freq='D', inclusive='left')
+
+        n_rows = len(assets) * len(days)
+        with self.lock:
+            self.n_requests += max(1, -(-n_rows // self.page_size))
+        time.sleep(self.latency * max(1, -(-n_rows // self.page_size)))
+
+        day_numbers = np.tile((days.as_unit('ms').asi8 // 86_400_000).astype('float64'), len(assets))
+        asset_seeds = np.repeat([sum(map(ord, asset)) for asset in assets], len(days)).astype('float64')
+        is_today = np.tile(days == today, len(assets))
+        columns = {'asset': np.repeat(assets, len(days)), 'time': np.tile(days, len(assets))}
+        for k, metric in enumerate(metrics):
+            kind = self.metric_kinds.get(metric, 'float')
+            values = _synthetic_metric(day_numbers, asset_seeds + 31 * k)
+            if kind == 'timestamp':
+                completion = pd.to_datetime(day_numbers * 86_400_000 + 86_400_000, unit='ms', utc=True)
+                columns[metric] = pd.Series(completion).where(~is_today)
+            elif kind == 'count':
+                columns[metric] = pd.array(np.where(is_today, np.nan, np.round(values * 1e5)), dtype='Float64').astype('Int64')
+            else:
+                columns[metric] = pd.array(np.where(is_today, np.nan, values * 1e6), dtype='Float64')
+        return FakeDataCollection(pd.DataFrame(columns))
+
+
+def _synthetic_metric(day_numbers: np.ndarray, seeds: np.ndarray) -> np.ndarray:
+    """
+    Positive metric value as a pure function of the day and of a seed.
+    """
+    noise = np.sin(day_numbers * 12.9898 + seeds * 78.233) * 43758.5453
+    noise = noise - np.floor(noise) - 0.5
+    return (1 + seeds % 9) * np.exp(0.3 * np.sin(day_numbers / 90 + seeds) + 0.02 * noise)
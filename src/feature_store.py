@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+from datetime import datetime
+from typing import List, Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+##########################################################################
+##########################    SYMBOL MAPPING   ###########################
+##########################################################################
+def read_symbol_map(file_path: str = '../data/static/symbol_map.csv') -> pd.DataFrame:
+    """
+    Read the table mapping CoinMetrics assets ('eth') to Binance tickers ('ETHUSDT').
+
+    Parameters:
+    file_path (str): CSV file with 'asset' and 'ticker' columns.
+
+    Returns:
+    pd.DataFrame: One row per (asset, ticker) pair.
+    """
+    symbol_map = pd.read_csv(file_path, dtype=str)
+    duplicated = symbol_map['ticker'].duplicated()
+    if duplicated.any():
+        raise ValueError(f"Tickers mapped to several assets: {list(symbol_map['ticker'][duplicated])}")
+    return symbol_map
+
+
+def join_coinmetrics_binance(
+    coinmetrics_data: pd.DataFrame,
+    binance_data: pd.DataFrame,
+    symbol_map: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Join CoinMetrics metrics with Binance candles through the symbol mapping table.
+
+    CoinMetrics rows are keyed by ('time' in UTC, 'asset'), Binance rows by ('dateTime'
+    as naive UTC, 'ticker'). Both are aligned on the naive UTC day.
+
+    Parameters:
+    coinmetrics_data (pd.DataFrame): Output of get_coinmetrics_data.
+    binance_data (pd.DataFrame): Output of fetch_all_candlestick_data.
+    symbol_map (pd.DataFrame): Output of read_symbol_map.
+
+    Returns:
+    pd.DataFrame: One row per (dateTime, ticker) present in both sources, with an 'asset' column.
+    """
+    coinmetrics_data = coinmetrics_data.copy()
+    coinmetrics_data['dateTime'] = (
+        pd.to_datetime(coinmetrics_data.pop('time'), utc=True).dt.tz_localize(None).dt.floor('D')
+    )
+    coinmetrics_data['asset'] = coinmetrics_data['asset'].astype(str)
+    coinmetrics_data = coinmetrics_data.merge(symbol_map, how='inner', on='asset')
+
+    binance_data = binance_data.copy()
+    binance_data['ticker'] = binance_data['ticker'].astype(str)
+    all_data = coinmetrics_data.merge(binance_data, how='inner', on=['dateTime', 'ticker'])
+    keys = ['dateTime', 'asset', 'ticker']
+    columns = keys + [col for col in all_data.columns if col not in keys]
+    return all_data[columns].sort_values(['asset', 'dateTime']).reset_index(drop=True)
+
+
+##########################################################################
+#########################    FEATURE STORE   #############################
+##########################################################################
+# Layout of the store:
+#   {root}/asset={asset}/year={year}/month={month}/part-{append_time}-{i}.parquet
+#   {root}/_manifest.json   last stored day of every asset
+#   {root}/_schema.parquet  empty table holding the union of all stored columns
+# Files starting with '_' are skipped by pyarrow dataset discovery. Reads filter on the
+# asset/year/month directories before opening any file, then on the row group statistics
+# of 'dateTime', and only decode the requested columns.
+MANIFEST_FILE = '_manifest.json'
+SCHEMA_FILE = '_schema.parquet'
+PARTITIONING = ds.partitioning(
+    pa.schema([('asset', pa.string()), ('year', pa.int32()), ('month', pa.int32())]),
+    flavor='hive'
+)
+KEY_COLUMNS = ['dateTime', 'asset', 'ticker']
+
+
+def read_store_manifest(root: str) -> Dict[str, str]:
+    """
+    Last stored day of every asset, empty if the store does not exist yet.
+    """
+    path = os.path.join(root, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)['last_day']
+
+
+def read_store_schema(root: str) -> Optional[pa.Schema]:
+    """
+    Schema of the store without the partition columns, None if the store does not exist yet.
+    """
+    path = os.path.join(root, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    return pq.read_schema(path)
+
+
+def _cast_to_store(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """
+    Cast the columns of table that are already stored to their stored type.
+
+    A feature can change type between runs, e.g. an integer count that is missing on
+    some day comes as float64. Lossless casts are applied, anything else raises.
+    """
+    for i, field in enumerate(table.schema):
+        index = schema.get_field_index(field.name)
+        if index < 0 or schema.field(index).type == field.type:
+            continue
+        stored_type = schema.field(index).type
+        try:
+            column = table.column(i).cast(stored_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as error:
+            raise ValueError(
+                f"Feature '{field.name}' is stored as {stored_type} but is now {field.type}, "
+                f"rebuild the store to change its type ({error})"
+            ) from error
+        table = table.set_column(i, pa.field(field.name, stored_type), column)
+    return table
+
+
+def append_features(
+    root: str,
+    features: pd.DataFrame,
+    row_group_size: int = 128,
+    complete_before: Optional[str] = None
+) -> int:
+    """
+    Append the complete days of every asset that are newer than the last stored one.
+
+    The current day is held back: its CoinMetrics row has no values yet and its Binance
+    candle is still open. Stored days are never rewritten, so it is appended by the first
+    run of the next day. New columns are added to the store schema, older files read them
+    as nulls; stored columns keep their type.
+
+    Parameters:
+    root (str): Root directory of the store.
+    features (pd.DataFrame): Rows with 'dateTime', 'asset' and 'ticker' columns, e.g. the
+        output of join_coinmetrics_binance.
+    row_group_size (int): Maximum rows per Parquet row group.
+    complete_before (str): First day not stored yet (default is the current UTC day).
+
+    Returns:
+    int: Number of rows written.
+    """
+    os.makedirs(root, exist_ok=True)
+    last_day = read_store_manifest(root)
+    features = features.copy()
+    features['dateTime'] = pd.to_datetime(features['dateTime']).astype('datetime64[ns]')
+    features['asset'] = features['asset'].astype(str)
+    if complete_before is None:
+        complete_before = pd.Timestamp.now(tz='UTC').tz_localize(None).floor('D')
+
+    stored_last = features['asset'].map(last_day).astype('datetime64[ns]')
+    new_rows = stored_last.isna() | (features['dateTime'] > stored_last)
+    features = features[new_rows & (features['dateTime'] < pd.Timestamp(complete_before))]
+    if features.empty:
+        return 0
+
+    features = features.sort_values(['asset', 'dateTime'])
+    data_columns = [col for col in features.columns if col != 'asset']
+    table = pa.Table.from_pandas(features[data_columns], preserve_index=False)
+    schema = read_store_schema(root)
+    if schema is None:
+        schema = table.schema
+    else:
+        table = _cast_to_store(table, schema)
+        schema = pa.unify_schemas([schema, table.schema])
+
+    table = table.append_column('asset', pa.array(features['asset'], pa.string()))
+    table = table.append_column('year', pa.array(features['dateTime'].dt.year, pa.int32()))
+    table = table.append_column('month', pa.array(features['dateTime'].dt.month, pa.int32()))
+    n_partitions = len(features.groupby(['asset', features['dateTime'].dt.to_period('M')]))
+    # One file per touched partition, named after the append so that it never overwrites a part
+    ds.write_dataset(
+        table,
+        root,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template=f"part-{datetime.now().strftime('%Y%m%d%H%M%S%f')}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        max_partitions=max(1024, n_partitions),
+        max_open_files=max(1024, n_partitions + 1),
+        max_rows_per_group=row_group_size,
+        min_rows_per_group=0
+    )
+    n_rows = len(table)
+
+    # Data files first, then schema and manifest, so an interrupted append is re-run from the old state
+    pq.write_table(schema.empty_table(), os.path.join(root, SCHEMA_FILE))
+    for asset, asset_last in features.groupby('asset')['dateTime'].max().items():
+        last_day[asset] = asset_last.strftime('%Y-%m-%d')
+    with open(os.path.join(root, MANIFEST_FILE), 'w') as file:
+        json.dump({'last_day': last_day, 'updated': datetime.now().isoformat(timespec='seconds')}, file, indent=2)
+    logging.info(f"Appended {n_rows} rows to {root}")
+    return n_rows
+
+
+def compact_store(root: str, row_group_size: int = 128) -> int:
+    """
+    Merge the daily part files of every month partition into one file.
+
+    Parameters:
+    root (str): Root directory of the store.
+    row_group_size (int): Maximum rows per Parquet row group.
+
+    Returns:
+    int: Number of partitions rewritten.
+    """
+    schema = read_store_schema(root)
+    n_partitions = 0
+    for directory, _, files in os.walk(root):
+        parts = sorted(file for file in files if file.startswith('part-'))
+        if len(parts) < 2:
+            continue
+        paths = [os.path.join(directory, part) for part in parts]
+        table = ds.dataset(paths, schema=schema, format='parquet').to_table()
+        table = table.sort_by('dateTime')
+        merged = os.path.join(directory, f"{parts[0]}.tmp")
+        pq.write_table(table, merged, row_group_size=row_group_size)
+        for path in paths:
+            os.remove(path)
+        os.replace(merged, paths[0])
+        n_partitions += 1
+    return n_partitions
+
+
+def _month_filter(start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> Optional[ds.Expression]:
+    """
+    Filter on the year/month partition columns keeping the months overlapping [start, end).
+    """
+    year, month = ds.field('year'), ds.field('month')
+    expression = None
+    if start is not None:
+        expression = (year > start.year) | ((year == start.year) & (month >= start.month))
+    if end is not None:
+        last = end - pd.Timedelta(1, 'ns')
+        before_end = (year < last.year) | ((year == last.year) & (month <= last.month))
+        expression = before_end if expression is None else expression & before_end
+    return expression
+
+
+def read_features(
+    root: str,
+    columns: Optional[List[str]] = None,
+    assets: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Read a window of the store, pushing the asset and date predicates down to the scan.
+
+    Only the asset/month directories overlapping the window are listed and opened, row
+    groups are skipped on their 'dateTime' statistics, and only the requested columns are
+    decoded, so a training window never loads the full history.
+
+    Parameters:
+    root (str): Root directory of the store.
+    columns (List[str]): Feature columns to read, all of them if None.
+    assets (List[str]): CoinMetrics assets to read, all of them if None.
+    start (str): First day of the window (inclusive).
+    end (str): Last day of the window (exclusive).
+
+    Returns:
+    pd.DataFrame: Rows indexed by (dateTime, ticker) with an 'asset' column and the requested features.
+    """
+    schema = read_store_schema(root)
+    if schema is None:
+        raise FileNotFoundError(f"No feature store in {root}")
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    dataset = ds.dataset(
+        root,
+        schema=pa.unify_schemas([schema, PARTITIONING.schema]),
+        format='parquet',
+        partitioning=PARTITIONING
+    )
+    expression = _month_filter(start, end)
+    if assets is not None:
+        asset_filter = ds.field('asset').isin(assets)
+        expression = asset_filter if expression is None else expression & asset_filter
+    if start is not None:
+        expression = expression & (ds.field('dateTime') >= pa.scalar(start, pa.timestamp('ns')))
+    if end is not None:
+        expression = expression & (ds.field('dateTime') < pa.scalar(end, pa.timestamp('ns')))
+
+    feature_columns = columns if columns is not None else [col for col in schema.names if col not in KEY_COLUMNS]
+    table = dataset.to_table(columns=KEY_COLUMNS + feature_columns, filter=expression)
+    return table.to_pandas().sort_values(['dateTime', 'ticker']).set_index(['dateTime', 'ticker'])
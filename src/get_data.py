@@ -1,102 +1,31 @@
-import json
 import logging
-import sys
+import os
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import date, datetime, timedelta
 from os import environ
-from typing import List, Dict
+from typing import TYPE_CHECKING, Callable, Iterator, List, Optional, Tuple
 
-import numpy as np
 import pandas as pd
-from binance.client import Client
-from coinmetrics.api_client import CoinMetricsClient
+
+# get_metrics_names, get_asset_names and configure_logger live in src.config and are
+# re-exported here. The API clients, pyarrow and the feature store are imported by the
+# functions using them, so importing this module for its helpers stays cheap.
+from src.config import configure_logger, get_asset_names, get_metrics_names
+from src.instrumentation import result_rows, timed, track
+from src.kline_cache import cached_close_time, update_cached_klines, utc_now
+
+if TYPE_CHECKING:
+    from binance.client import Client
+    from coinmetrics.api_client import CoinMetricsClient
 
 ##########################################################################
 #####################    COINMETRICS DATA   ##############################
 ##########################################################################
-def get_metrics_names(file_path: str) -> List[str]:
-    """
-    Read metric names from a file and return them as a list.
-
-    Returns:
-    List[str]: A list containing metric names.
-
-    Raises:
-    FileNotFoundError: If the specified file is not found.
-    Exception: If an error occurs while reading the file.
-    """
-    # Initialize an empty list to store metric names
-    metric_names = []
-
-    try:
-        # Open the file in read mode
-        with open(file_path, 'r') as file:
-            # Read all lines from the file
-            lines = file.readlines()
-
-            # Remove leading and trailing whitespaces and add each line to the list
-            metric_names = [line.strip() for line in lines]
-
-    except FileNotFoundError:
-        # Handle file not found error
-        print(f"File '{file_path}' not found.")
-    except Exception as e:
-        # Handle other exceptions
-        print(f"An error occurred: {e}")
-
-    # Return the list of metric names
-    return metric_names
-
-
-def get_asset_names(file_path: str)-> List[str]:
-    """
-    Read metric names from a file and return them as a list.
-
-    Returns:
-    List[str]: A list containing asset names.
-
-    Raises:
-    FileNotFoundError: If the specified file is not found.
-    Exception: If an error occurs while reading the file.
-    """
-    # Initialize an empty list to store asset names
-    asset_names = []
-
-    try:
-        # Open the file in read mode
-        with open(file_path, 'r') as file:
-            # Read all lines from the file
-            lines = file.readlines()
-
-            # Remove leading and trailing whitespaces and add each line to the list
-            asset_names = [line.strip() for line in lines]
-
-    except FileNotFoundError:
-        # Handle file not found error
-        print(f"File '{file_path}' not found.")
-    except Exception as e:
-        # Handle other exceptions
-        print(f"An error occurred: {e}")
-
-    # Return the list of asset names
-    return asset_names
-
-
-def configure_logger() -> None:
-    """
-    Configure the logging format and level.
-
-    This function configures the logging format, level, and date format.
-
-    Returns:
-    None
-    """
-    logging.basicConfig(
-        format='%(asctime)s %(levelname)-8s %(message)s',
-        level=logging.INFO,
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-
-def initialize_coin_metrics_client(api_key: str = "") -> CoinMetricsClient:
+def initialize_coin_metrics_client(api_key: str = "") -> 'CoinMetricsClient':
     """
     Initialize the CoinMetricsClient with the provided API key.
 
@@ -117,12 +46,14 @@ def initialize_coin_metrics_client(api_key: str = "") -> CoinMetricsClient:
         logging.info("API key not found. Using an empty string.")
 
     # Initialize the CoinMetricsClient
+    from coinmetrics.api_client import CoinMetricsClient
     client = CoinMetricsClient(api_key)
 
     return client
 
+@timed(rows=result_rows)
 def fetch_asset_metrics(
-    client: CoinMetricsClient,
+    client: 'CoinMetricsClient',
     assets: List[str],
     metrics: List[str],
     start_time: str,
@@ -154,10 +85,196 @@ def fetch_asset_metrics(
 
     return metrics_data
 
+def split_time_windows(start_time: str, end_time: str, window_days: int) -> List[Tuple[str, str]]:
+    """
+    Split [start_time, end_time) into consecutive windows of window_days days.
+
+    Parameters:
+    start_time (str): Start date, e.g. '2015-07-30'.
+    end_time (str): End date (exclusive).
+    window_days (int): Length of every window in days.
+
+    Returns:
+    List[Tuple[str, str]]: (start, end) date strings of every window, end exclusive.
+    """
+    bounds = pd.date_range(start_time, end_time, freq=f"{window_days}D").append(pd.DatetimeIndex([end_time]))
+    bounds = bounds.unique().sort_values()
+    return [(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def split_metric_groups(metrics: List[str], metrics_per_group: int) -> List[List[str]]:
+    """
+    Split the metric list into groups of at most metrics_per_group metrics.
+    """
+    return [metrics[i:i + metrics_per_group] for i in range(0, len(metrics), metrics_per_group)]
+
+
+def iter_asset_metrics_chunks(
+    client: 'CoinMetricsClient',
+    assets: List[str],
+    metrics: List[str],
+    start_time: str,
+    end_time: str,
+    frequency: str = '1d',
+    metrics_per_group: int = 20,
+    window_days: int = 365,
+    max_workers: int = 4
+) -> Iterator[Tuple[int, Tuple[str, str], pd.DataFrame]]:
+    """
+    Fetch asset metrics by (metric group, time window) chunks in parallel.
+
+    At most 2 * max_workers chunks are in flight or waiting to be consumed at any time,
+    so the memory held by this generator is bounded by the chunk size and not by the
+    length of the history.
+
+    Parameters:
+    client (CoinMetricsClient): An instance of the CoinMetricsClient.
+    assets (List[str]): A list of asset symbols.
+    metrics (List[str]): A list of metric names.
+    start_time (str): Start date of the history.
+    end_time (str): End date of the history (exclusive).
+    frequency (str): The frequency of the data (default is '1d').
+    metrics_per_group (int): Number of metrics requested together.
+    window_days (int): Number of days requested together.
+    max_workers (int): Number of concurrent requests.
+
+    Yields:
+    Tuple[int, Tuple[str, str], pd.DataFrame]: Metric group index, time window and the fetched chunk.
+    """
+    chunks = [
+        (group_index, window, group)
+        for group_index, group in enumerate(split_metric_groups(metrics, metrics_per_group))
+        for window in split_time_windows(start_time, end_time, window_days)
+    ]
+    chunks.reverse()
+
+    def fetch_chunk(group: List[str], window: Tuple[str, str]) -> pd.DataFrame:
+        return client.get_asset_metrics(
+            assets=assets,
+            metrics=group,
+            frequency=frequency,
+            start_time=window[0],
+            end_time=window[1],
+            end_inclusive=False
+        ).to_dataframe()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        while chunks or pending:
+            while chunks and len(pending) < 2 * max_workers:
+                group_index, window, group = chunks.pop()
+                pending[executor.submit(fetch_chunk, group, window)] = (group_index, window)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                group_index, window = pending.pop(future)
+                logging.info(f"Metric group {group_index}, {window[0]} to {window[1]} fetched")
+                yield group_index, window, future.result()
+
+
+def write_asset_metrics_dataset(
+    client: 'CoinMetricsClient',
+    assets: List[str],
+    metrics: List[str],
+    start_time: str,
+    end_time: str,
+    output_dir: str,
+    frequency: str = '1d',
+    metrics_per_group: int = 20,
+    window_days: int = 365,
+    max_workers: int = 4
+) -> int:
+    """
+    Stream asset metrics into a Parquet dataset partitioned by metric group and asset.
+
+    Every chunk is written as soon as it arrives to
+    {output_dir}/metric_group={group}/asset={asset}/{window_start}.parquet
+    and then released, so peak memory is bounded by the chunk size. Groups are numbered
+    in the order of the metric list, so the groups of a previous run are removed first.
+
+    Parameters:
+    client (CoinMetricsClient): An instance of the CoinMetricsClient.
+    assets (List[str]): A list of asset symbols.
+    metrics (List[str]): A list of metric names.
+    start_time (str): Start date of the history.
+    end_time (str): End date of the history (exclusive).
+    output_dir (str): Root directory of the Parquet dataset.
+    frequency (str): The frequency of the data (default is '1d').
+    metrics_per_group (int): Number of metrics requested together.
+    window_days (int): Number of days requested together.
+    max_workers (int): Number of concurrent requests.
+
+    Returns:
+    int: Number of (asset, time) rows written, summed over metric groups.
+    """
+    # Another metric list or group size would leave stale files in the wrong groups
+    if os.path.isdir(output_dir):
+        for group_dir in os.listdir(output_dir):
+            if group_dir.startswith('metric_group='):
+                shutil.rmtree(os.path.join(output_dir, group_dir))
+
+    n_rows = 0
+    for group_index, window, chunk in iter_asset_metrics_chunks(
+        client, assets, metrics, start_time, end_time, frequency,
+        metrics_per_group, window_days, max_workers
+    ):
+        for asset, asset_chunk in chunk.groupby('asset'):
+            directory = os.path.join(output_dir, f"metric_group={group_index:03d}", f"asset={asset}")
+            os.makedirs(directory, exist_ok=True)
+            asset_chunk.drop(columns='asset').to_parquet(os.path.join(directory, f"{window[0]}.parquet"), index=False)
+            n_rows += len(asset_chunk)
+    return n_rows
+
+
+def read_asset_metrics_dataset(
+    output_dir: str,
+    assets: Optional[List[str]] = None,
+    metrics: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Load a dataset written by write_asset_metrics_dataset back into the get_asset_metrics layout.
+
+    Parameters:
+    output_dir (str): Root directory of the Parquet dataset.
+    assets (List[str]): Assets to load, all of them if None.
+    metrics (List[str]): Metrics to load, all of them if None.
+
+    Returns:
+    pd.DataFrame: One row per (asset, time) with one column per metric.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    filters = [('asset', 'in', assets)] if assets is not None else None
+    all_data = None
+    for group_dir in sorted(os.listdir(output_dir)):
+        group_path = os.path.join(output_dir, group_dir)
+        if not group_dir.startswith('metric_group=') or not os.path.isdir(group_path):
+            continue
+        # The dataset schema comes from one file, while a metric may only appear in later windows
+        dataset = ds.dataset(group_path, format='parquet', partitioning='hive')
+        schema = pa.unify_schemas([dataset.schema] + [fragment.physical_schema for fragment in dataset.get_fragments()])
+        wanted = [col for col in schema.names if metrics is None or col in metrics or col in ('asset', 'time')]
+        if len(wanted) <= 2:
+            continue
+        group_data = pq.read_table(
+            group_path, columns=wanted, filters=filters, schema=schema, partitioning='hive'
+        ).to_pandas()
+        group_data['asset'] = group_data['asset'].astype(str)
+        all_data = group_data if all_data is None else all_data.merge(group_data, how='outer', on=['asset', 'time'])
+    if all_data is None:
+        return pd.DataFrame(columns=['asset', 'time'])
+    columns = ['asset', 'time'] + [col for col in all_data.columns if col not in ('asset', 'time')]
+    return all_data[columns].sort_values(['asset', 'time']).reset_index(drop=True)
+
+
 def get_coinmetrics_data(
         days_before_today: int,
         file_path_metrics: str,
-        file_path_assets: str) -> pd.DataFrame:
+        file_path_assets: str,
+        compact: bool = False,
+        file_path_metadata: str = '../data/static/metric_metadata.csv',
+        history_dir: Optional[str] = None) -> pd.DataFrame:
     """
     Fetch asset metrics data from CoinMetrics.
 
@@ -167,6 +284,13 @@ def get_coinmetrics_data(
 
     Args:
     days_before_today (int): Number of days before today for the start time (default is 3).
+    file_path_metrics (str): Path of the metric names file.
+    file_path_assets (str): Path of the asset names file.
+    compact (bool): Apply the dtype policy of src.schema (float32/Int32 metrics, categorical
+        asset, int64 epoch time).
+    file_path_metadata (str): Path of the metric metadata file used when compact is True.
+    history_dir (str): Community dumps converted by src.convert_dumps. Assets found there
+        are read from it up to the last day of their dump, only later days come from the API.
 
     Returns:
     pd.DataFrame: A pandas DataFrame containing the fetched asset metrics data.
@@ -180,15 +304,89 @@ def get_coinmetrics_data(
     metrics = get_metrics_names(file_path_metrics)
 
     # Calculate the start time (3 days before today)
-    start_time = (datetime.datetime.now() - timedelta(days=days_before_today)).strftime('%Y-%m-%d')
+    start_time = (utc_now() - timedelta(days=days_before_today)).strftime('%Y-%m-%d')
 
     # Set the data fetching frequency
     frequency = '1d'
 
     # Fetch asset metrics data
-    metrics_data = fetch_asset_metrics(coin_metrics_client, assets, metrics, start_time, frequency)
+    manifest = {}
+    if history_dir is not None:
+        from src.convert_dumps import read_coinmetrics_history, read_dump_manifest
+        manifest = read_dump_manifest(history_dir)
+    covered = [asset for asset in assets if asset in manifest]
+    if covered:
+        # The last day of a dump is usually partial, it is fetched again from the API.
+        # Dumps end on different days, assets sharing an API start are fetched together.
+        asset_starts = {
+            asset: max(start_time, manifest[asset]['last_day']) if asset in manifest else start_time
+            for asset in assets
+        }
+        by_start = {}
+        for asset, api_start in asset_starts.items():
+            by_start.setdefault(api_start, []).append(asset)
+        frames = []
+        for api_start, group in sorted(by_start.items()):
+            dumped = [asset for asset in group if asset in manifest]
+            if dumped and api_start > start_time:
+                frames.append(read_coinmetrics_history(history_dir, dumped, metrics, start_time, api_start))
+            frames.append(fetch_asset_metrics(coin_metrics_client, group, metrics, api_start, frequency))
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            frames = [pd.DataFrame(columns=['asset', 'time'] + metrics)]
+        metrics_data = pd.concat(frames, ignore_index=True)
+        metrics_data = metrics_data.drop_duplicates(['asset', 'time'], keep='last')
+        metrics_data = metrics_data.sort_values(['asset', 'time']).reset_index(drop=True)
+    else:
+        metrics_data = fetch_asset_metrics(coin_metrics_client, assets, metrics, start_time, frequency)
+
+    if compact:
+        from src.schema import compact_coinmetrics_data
+        metrics_data = compact_coinmetrics_data(metrics_data, file_path_metrics, file_path_metadata)
 
     return metrics_data
+
+def download_coinmetrics_data(
+        days_before_today: int,
+        file_path_metrics: str,
+        file_path_assets: str,
+        output_dir: str,
+        metrics_per_group: int = 20,
+        window_days: int = 365,
+        max_workers: int = 4) -> int:
+    """
+    Stream asset metrics data from CoinMetrics into a partitioned Parquet dataset.
+
+    Streaming counterpart of get_coinmetrics_data for long histories: the request is
+    split by metric group and time window, chunks are fetched in parallel and written
+    as they arrive. Load the result with read_asset_metrics_dataset.
+
+    Args:
+    days_before_today (int): Number of days before today for the start time.
+    file_path_metrics (str): Path of the metric names file.
+    file_path_assets (str): Path of the asset names file.
+    output_dir (str): Root directory of the Parquet dataset.
+    metrics_per_group (int): Number of metrics requested together.
+    window_days (int): Number of days requested together.
+    max_workers (int): Number of concurrent requests.
+
+    Returns:
+    int: Number of rows written, summed over metric groups.
+    """
+    configure_logger()
+    coin_metrics_client = initialize_coin_metrics_client()
+
+    assets = get_asset_names(file_path_assets)
+    metrics = get_metrics_names(file_path_metrics)
+
+    start_time = (utc_now() - timedelta(days=days_before_today)).strftime('%Y-%m-%d')
+    end_time = (utc_now() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    return write_asset_metrics_dataset(
+        coin_metrics_client, assets, metrics, start_time, end_time, output_dir,
+        '1d', metrics_per_group, window_days, max_workers
+    )
+
 ##########################################################################
 #########################    BINANCE DATA   ##############################
 ##########################################################################
@@ -225,7 +423,58 @@ def get_trading_pairs(info: pd.DataFrame) -> List[str]:
             ticker_usdt.append(c['symbol'])
     return ticker_usdt
 
-def fetch_candlestick_data(client: Client, symbol: str, interval: str, days_back: int = 5000) -> pd.DataFrame:
+# Columns of fetch_candlestick_data, close only unless full is set
+KLINE_COLUMNS = ['dateTime', 'ticker', 'close']
+FULL_KLINE_COLUMNS = [
+    'dateTime', 'ticker', 'open', 'high', 'low', 'close', 'volume', 'closeTime',
+    'quoteAssetVolume', 'numberOfTrades', 'takerBuyBaseVol', 'takerBuyQuoteVol'
+]
+
+
+# Bytes of the response bodies received by the current thread, see count_received_bytes
+_received = threading.local()
+
+
+def _add_received_bytes(response, *args, **kwargs) -> None:
+    _received.bytes = getattr(_received, 'bytes', 0) + len(response.content)
+
+
+def count_received_bytes(client: 'Client') -> None:
+    """
+    Add a response hook counting the body size of every response to the requests session of the client.
+
+    The counter is per thread: the client sends its requests from the calling thread, so a
+    fetch reads the bytes it received as the difference of received_bytes around the call.
+
+    Parameters:
+    client (Client): An instance of the Binance Client.
+
+    Returns:
+    None
+    """
+    session = getattr(client, 'session', None)
+    if session is None:
+        return
+    hooks = session.hooks.setdefault('response', [])
+    if _add_received_bytes not in hooks:
+        hooks.append(_add_received_bytes)
+
+
+def received_bytes() -> int:
+    """
+    Bytes of the response bodies received by the current thread so far.
+    """
+    return getattr(_received, 'bytes', 0)
+
+
+def fetch_candlestick_data(
+    client: 'Client',
+    symbol: str,
+    interval: str,
+    days_back: int = 5000,
+    start_time: Optional[datetime] = None,
+    full: bool = False
+) -> pd.DataFrame:
     """
     Fetch historical candlestick data for a given trading pair.
 
@@ -234,13 +483,22 @@ def fetch_candlestick_data(client: Client, symbol: str, interval: str, days_back
     symbol (str): The trading pair symbol.
     interval (str): The candlestick interval (e.g., '1day', '1hour').
     days_back (int): Number of days back to fetch historical data (default is 2000).
+    start_time (datetime): Fetch candles opened from this naive UTC time on instead of days_back days ago.
+    full (bool): Keep the OHLCV, taker volume and trade count columns (FULL_KLINE_COLUMNS)
+        instead of the close only.
 
     Returns:
     pd.DataFrame: A DataFrame containing historical candlestick data.
     """
-    since_this_date = datetime.now() - timedelta(days=days_back)
-    until_this_date = datetime.now()
-    candle = client.futures_historical_klines(symbol, interval, str(since_this_date), str(until_this_date))
+    # Binance reads naive date strings as UTC
+    since_this_date = start_time if start_time is not None else utc_now() - timedelta(days=days_back)
+    until_this_date = utc_now()
+    count_received_bytes(client)
+    with track('get_data.fetch_candlestick_data') as measurement:
+        start_bytes = received_bytes()
+        candle = client.futures_historical_klines(symbol, interval, str(since_this_date), str(until_this_date))
+        measurement.rows = len(candle)
+        measurement.bytes = received_bytes() - start_bytes
     
     # Create a dataframe to label all the columns returned by Binance for later use
     columns_hist = ['dateTime', 'open', 'high', 'low', 'close', 'volume', 'closeTime',
@@ -264,34 +522,407 @@ def fetch_candlestick_data(client: Client, symbol: str, interval: str, days_back
         'takerBuyQuoteVol': 'float64',
         'ticker': 'str'
     })
-    df = df[['dateTime','ticker','close']]
+    df = df[FULL_KLINE_COLUMNS if full else KLINE_COLUMNS]
     return df
 
 
-def fetch_all_candlestick_data(client: Client, trading_pairs: List[str]) -> pd.DataFrame:
+# Binance futures allows 2400 request weight per minute per IP. A
+# futures_historical_klines page of up to 1500 candles costs 10 weight.
+BINANCE_WEIGHT_PER_MINUTE = 2400
+KLINES_REQUEST_WEIGHT = 10
+KLINES_PAGE_LIMIT = 1500
+RETRYABLE_STATUS_CODES = (418, 429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to stay under the Binance request-weight limit.
+
+    Parameters:
+    capacity (float): Maximum number of tokens the bucket can hold.
+    refill_rate (float): Number of tokens added per second.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+
+    def acquire(self, tokens: float = 1) -> None:
+        """
+        Block until the requested number of tokens is available, then consume them.
+
+        Parameters:
+        tokens (float): Number of tokens to consume.
+
+        Returns:
+        None
+        """
+        # A request heavier than the whole bucket would otherwise wait forever
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                shortfall_seconds = (tokens - self.tokens) / self.refill_rate
+            time.sleep(shortfall_seconds)
+
+    def drain(self, seconds: float) -> None:
+        """
+        Empty the bucket and pause refilling, used when the server asks us to back off.
+
+        Parameters:
+        seconds (float): Number of seconds during which no token is granted.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.tokens = -seconds * self.refill_rate
+            self.last_refill = time.monotonic()
+
+
+def binance_rate_limiter(weight_per_minute: int = BINANCE_WEIGHT_PER_MINUTE) -> TokenBucket:
+    """
+    Build a token bucket matching a Binance request-weight budget.
+
+    Parameters:
+    weight_per_minute (int): Request weight allowed per minute.
+
+    Returns:
+    TokenBucket: A bucket refilled at weight_per_minute / 60 tokens per second.
+    """
+    return TokenBucket(capacity=weight_per_minute, refill_rate=weight_per_minute / 60)
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After header of a Binance error response, if any.
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers['Retry-After'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _candles_per_day(interval: str) -> float:
+    """
+    Number of candles per day for a Binance interval string such as '1h' or '1d'.
+    """
+    units = {'m': 24 * 60, 'h': 24, 'd': 1, 'w': 1 / 7, 'M': 1 / 30}
+    return units[interval[-1]] / int(interval[:-1])
+
+
+def fetch_candlestick_data_with_retry(
+    client: 'Client',
+    symbol: str,
+    interval: str,
+    days_back: int = 5000,
+    rate_limiter: Optional[TokenBucket] = None,
+    max_retries: int = 5,
+    backoff_base: float = 1.0,
+    backoff_max: float = 60.0,
+    cache_dir: Optional[str] = None,
+    full: bool = False
+) -> pd.DataFrame:
+    """
+    Fetch candlestick data for one trading pair, throttled and retried with exponential backoff.
+
+    When cache_dir is given, only the candles opened after the last cached close time
+    are downloaded, closed candles are appended to the cache and the full history is returned.
+    The cache always holds the full columns, so close-only and full callers share it.
+
+    Parameters:
+    client (Client): An instance of the Binance Client.
+    symbol (str): The trading pair symbol.
+    interval (str): The candlestick interval (e.g., '1d', '1h').
+    days_back (int): Number of days back to fetch historical data (default is 5000).
+    rate_limiter (TokenBucket): Shared limiter charged with the weight of every kline page.
+    max_retries (int): Number of retries on 418/429/5xx responses before giving up.
+    backoff_base (float): Initial backoff in seconds, doubled at each retry.
+    backoff_max (float): Upper bound of a single backoff in seconds.
+    cache_dir (str): Root directory of the local kline cache (see src.kline_cache).
+    full (bool): Return FULL_KLINE_COLUMNS instead of KLINE_COLUMNS.
+
+    Returns:
+    pd.DataFrame: A DataFrame containing historical candlestick data.
+    """
+    start_time = None
+    if cache_dir is not None:
+        start_time = cached_close_time(cache_dir, symbol, interval)
+        if start_time is not None:
+            days_back = max(1, (utc_now() - start_time).days + 1)
+
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            # futures_historical_klines pages through the range, so charge every page up front
+            n_pages = max(1, -(-days_back * _candles_per_day(interval) // KLINES_PAGE_LIMIT))
+            rate_limiter.acquire(n_pages * KLINES_REQUEST_WEIGHT)
+        try:
+            candlestick_data = fetch_candlestick_data(
+                client, symbol, interval, days_back, start_time, full=full or cache_dir is not None
+            )
+            if cache_dir is not None:
+                candlestick_data = update_cached_klines(cache_dir, symbol, interval, candlestick_data)
+                if not full:
+                    candlestick_data = candlestick_data[KLINE_COLUMNS]
+            return candlestick_data
+        except Exception as e:
+            status_code = getattr(e, 'status_code', None)
+            if status_code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+                raise
+            delay = _retry_after_seconds(e)
+            if delay is None:
+                delay = min(backoff_max, backoff_base * 2 ** attempt) * (1 + random.random())
+            if rate_limiter is not None and status_code in (418, 429):
+                rate_limiter.drain(delay)
+            logging.warning(f"{symbol}: HTTP {status_code}, retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+
+def log_progress(symbol: str, done: int, total: int, error: Optional[Exception] = None) -> None:
+    """
+    Default progress callback of fetch_all_candlestick_data.
+
+    Parameters:
+    symbol (str): The trading pair that just finished.
+    done (int): Number of trading pairs finished so far.
+    total (int): Total number of trading pairs.
+    error (Exception): The error raised for this pair, if any.
+
+    Returns:
+    None
+    """
+    if error is None:
+        logging.info(f"[{done}/{total}] {symbol} fetched")
+    else:
+        logging.error(f"[{done}/{total}] {symbol} failed: {error}")
+
+
+def iter_candlestick_data(
+    client: 'Client',
+    trading_pairs: List[str],
+    interval: str = '1d',
+    days_back: int = 5000,
+    max_workers: int = 8,
+    rate_limiter: Optional[TokenBucket] = None,
+    max_retries: int = 5,
+    progress_callback: Optional[Callable] = log_progress,
+    cache_dir: Optional[str] = None,
+    full: bool = False
+) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Download candlestick data for all trading pairs and yield each one as soon as it is complete.
+
+    Trading pairs are downloaded concurrently by a bounded thread pool. All workers share
+    a token bucket so that the Binance request-weight limit is respected, and throttled
+    or failed requests are retried with exponential backoff. Pairs that still fail after
+    max_retries are reported through progress_callback and not yielded.
+
+    Parameters:
+    client (Client): An instance of the Binance Client.
+    trading_pairs (List[str]): A list of trading pair symbols.
+    interval (str): The candlestick interval (default is 1 day).
+    days_back (int): Number of days back to fetch historical data (default is 5000).
+    max_workers (int): Maximum number of concurrent downloads (1 gives the serial behaviour).
+    rate_limiter (TokenBucket): Shared limiter, defaults to the Binance futures weight budget.
+    max_retries (int): Number of retries per trading pair.
+    progress_callback (Callable): Called as progress_callback(symbol, done, total, error) after each pair.
+    cache_dir (str): Root directory of the local kline cache, only missing candles are downloaded when set.
+    full (bool): Keep the OHLCV, taker volume and trade count columns instead of the close only.
+
+    Yields:
+    Tuple[str, pd.DataFrame]: The trading pair and its candlestick data, in completion order.
+    """
+    if rate_limiter is None:
+        rate_limiter = binance_rate_limiter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                fetch_candlestick_data_with_retry,
+                client, symbol, interval, days_back, rate_limiter, max_retries,
+                cache_dir=cache_dir, full=full
+            ): symbol
+            for symbol in trading_pairs
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            symbol = futures[future]
+            error = future.exception()
+            if progress_callback is not None:
+                progress_callback(symbol, done, len(trading_pairs), error)
+            if error is None:
+                yield symbol, future.result()
+
+
+def compact_candlestick_data(
+    data: pd.DataFrame,
+    float_dtype: str = 'float32',
+    categorical_ticker: bool = True
+) -> pd.DataFrame:
+    """
+    Convert candlestick data to a compact dtype layout.
+
+    'ticker' becomes categorical, 'dateTime' and 'closeTime' become int64 epoch
+    milliseconds and every float column is cast to float_dtype.
+
+    Parameters:
+    data (pd.DataFrame): Candlestick data as returned by fetch_candlestick_data.
+    float_dtype (str): Dtype of the price and volume columns (default is 'float32').
+    categorical_ticker (bool): Convert 'ticker' to categorical, disable it before concatenating
+        several pairs since categoricals with different categories concatenate to object.
+
+    Returns:
+    pd.DataFrame: The same data with compact dtypes.
+    """
+    dtypes = {col: float_dtype for col in data.columns if pd.api.types.is_float_dtype(data[col])}
+    if categorical_ticker and 'ticker' in data.columns:
+        dtypes['ticker'] = 'category'
+    data = data.astype(dtypes)
+    for col in ['dateTime', 'closeTime']:
+        if col in data.columns and pd.api.types.is_datetime64_any_dtype(data[col]):
+            data[col] = data[col].dt.as_unit('ms').astype('int64')
+    return data
+
+
+def fetch_all_candlestick_data(
+    client: 'Client',
+    trading_pairs: List[str],
+    interval: str = '1d',
+    days_back: int = 5000,
+    max_workers: int = 8,
+    rate_limiter: Optional[TokenBucket] = None,
+    max_retries: int = 5,
+    progress_callback: Optional[Callable] = log_progress,
+    cache_dir: Optional[str] = None,
+    compact: bool = False,
+    float_dtype: str = 'float64',
+    full: bool = False
+) -> pd.DataFrame:
     """
     Fetch historical candlestick data for all trading pairs and concatenate the results.
 
+    See iter_candlestick_data for the concurrency, rate limiting and retry behaviour.
+    Per-pair results are collected and concatenated once, so the cost is linear in the
+    number of trading pairs.
+
     Parameters:
     client (Client): An instance of the Binance Client.
     trading_pairs (List[str]): A list of trading pair symbols.
+    interval (str): The candlestick interval (default is 1 day).
+    days_back (int): Number of days back to fetch historical data (default is 5000).
+    max_workers (int): Maximum number of concurrent downloads (1 gives the serial behaviour).
+    rate_limiter (TokenBucket): Shared limiter, defaults to the Binance futures weight budget.
+    max_retries (int): Number of retries per trading pair.
+    progress_callback (Callable): Called as progress_callback(symbol, done, total, error) after each pair.
+    cache_dir (str): Root directory of the local kline cache, only missing candles are downloaded when set.
+    compact (bool): Use a categorical 'ticker' and an int64 epoch-millisecond 'dateTime'.
+    float_dtype (str): Dtype of the price columns, 'float32' halves their memory.
+    full (bool): Keep the OHLCV, taker volume and trade count columns instead of the close
+        only, e.g. to resample a fine base interval with src.bars.
 
     Returns:
     pd.DataFrame: A DataFrame containing concatenated historical candlestick data for all trading pairs.
     """
-    all_data = pd.DataFrame()
-    
-    for symbol in trading_pairs:
-        candlestick_data = fetch_candlestick_data(client, symbol, Client.KLINE_INTERVAL_1DAY)
-        all_data = pd.concat([all_data, candlestick_data], ignore_index=True)
-    
+    results = {}
+    for symbol, candlestick_data in iter_candlestick_data(
+        client, trading_pairs, interval, days_back, max_workers,
+        rate_limiter, max_retries, progress_callback, cache_dir, full
+    ):
+        # Shrink every pair on arrival so the concatenation never holds the wide layout
+        if compact:
+            candlestick_data = compact_candlestick_data(candlestick_data, float_dtype, categorical_ticker=False)
+        elif float_dtype != 'float64':
+            candlestick_data = candlestick_data.astype({col: float_dtype for col in candlestick_data.select_dtypes('float64').columns})
+        results[symbol] = candlestick_data
+
+    # Keep the order of trading_pairs whatever the completion order was
+    frames = [results.pop(symbol) for symbol in trading_pairs if symbol in results]
+    if not frames:
+        return pd.DataFrame()
+    all_data = pd.concat(frames, ignore_index=True)
+    if compact:
+        all_data['ticker'] = all_data['ticker'].astype('category')
     return all_data
 
+
+def write_all_candlestick_data(
+    client: 'Client',
+    trading_pairs: List[str],
+    output_path: str,
+    interval: str = '1d',
+    days_back: int = 5000,
+    max_workers: int = 8,
+    rate_limiter: Optional[TokenBucket] = None,
+    max_retries: int = 5,
+    progress_callback: Optional[Callable] = log_progress,
+    cache_dir: Optional[str] = None,
+    float_dtype: str = 'float64',
+    full: bool = False
+) -> int:
+    """
+    Stream candlestick data for all trading pairs straight into a Parquet file.
+
+    Every trading pair is written as its own row group as soon as it is downloaded,
+    so peak memory is bounded by the largest single pair instead of the whole table.
+    The file uses the compact layout of compact_candlestick_data, with 'ticker'
+    stored as a dictionary-encoded string.
+
+    Parameters:
+    client (Client): An instance of the Binance Client.
+    trading_pairs (List[str]): A list of trading pair symbols.
+    output_path (str): Path of the Parquet file to write.
+    interval (str): The candlestick interval (default is 1 day).
+    days_back (int): Number of days back to fetch historical data (default is 5000).
+    max_workers (int): Maximum number of concurrent downloads.
+    rate_limiter (TokenBucket): Shared limiter, defaults to the Binance futures weight budget.
+    max_retries (int): Number of retries per trading pair.
+    progress_callback (Callable): Called as progress_callback(symbol, done, total, error) after each pair.
+    cache_dir (str): Root directory of the local kline cache.
+    float_dtype (str): Dtype of the price columns.
+    full (bool): Keep the OHLCV, taker volume and trade count columns instead of the close only.
+
+    Returns:
+    int: Number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    n_rows = 0
+    try:
+        for symbol, candlestick_data in iter_candlestick_data(
+            client, trading_pairs, interval, days_back, max_workers,
+            rate_limiter, max_retries, progress_callback, cache_dir, full
+        ):
+            candlestick_data = compact_candlestick_data(candlestick_data, float_dtype, categorical_ticker=False)
+            table = pa.Table.from_pandas(candlestick_data, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema, use_dictionary=['ticker'])
+            writer.write_table(table.cast(writer.schema))
+            n_rows += len(candlestick_data)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_rows
+
 def get_binance_data(pairs: List[str])-> pd.DataFrame:
       # Read API keys from the file
     api_key, api_secret = read_api_keys()
 
     # Initialize Binance client
+    from binance.client import Client
     client = Client(api_key, api_secret)
 
     # Get trading pairs information
@@ -309,35 +940,48 @@ def get_binance_data(pairs: List[str])-> pd.DataFrame:
     
     return binance_data
 
-def get_data():
+def get_data(
+        store_root: str = '../data/feature_store',
+        file_path_symbol_map: str = '../data/static/symbol_map.csv') -> pd.DataFrame:
+    """
+    Fetch the latest CoinMetrics and Binance data, join them and append the new days to the feature store.
+
+    Parameters:
+    store_root (str): Root directory of the feature store.
+    file_path_symbol_map (str): CSV mapping CoinMetrics assets to Binance tickers.
+
+    Returns:
+    pd.DataFrame: The joined rows fetched by this run, indexed by (dateTime, ticker).
+    """
+    from binance.client import Client
+
+    from src.feature_store import append_features, join_coinmetrics_binance, read_symbol_map
+
     # Read API keys from the file
     api_key, api_secret = read_api_keys()
 
     # Initialize Binance client
     client = Client(api_key, api_secret)
 
-    # Get trading pairs information
+    # Only the pairs mapped to a CoinMetrics asset can be joined
+    symbol_map = read_symbol_map(file_path_symbol_map)
     info = pd.DataFrame.from_dict(client.get_exchange_info()['symbols'])
-    print(info)
-    trading_pairs = get_trading_pairs(info)
+    trading_pairs = [pair for pair in get_trading_pairs(info) if pair in set(symbol_map['ticker'])]
 
     # Get coinmetrics_data
     file_path_metrics = '../data/static/metrics.txt'
-    file_path_assets = '../data/statis/assets.txt'
+    file_path_assets = '../data/static/assets.txt'
     days_before_today = 3
-    coinmetrics_data = (
-        get_coinmetrics_data(
-            days_before_today,
-            file_path_metrics,
-            file_path_assets
-        )
-        .rename(columns={'time':'dateTime','asset':'ticker'})
+    coinmetrics_data = get_coinmetrics_data(
+        days_before_today,
+        file_path_metrics,
+        file_path_assets
     )
     # Get binance data
-    binance_data = fetch_all_candlestick_data(client, trading_pairs)
-    all_data = coinmetrics_data.merge(binance_data, how='inner',on=['dateTime','ticker']).set_index(['dateTime','ticker'])
-    all_data.to_parquet('../data/all_data.parquet')
-    return all_data
+    binance_data = fetch_all_candlestick_data(client, trading_pairs, days_back=days_before_today)
+    all_data = join_coinmetrics_binance(coinmetrics_data, binance_data, symbol_map)
+    append_features(store_root, all_data)
+    return all_data.set_index(['dateTime', 'ticker'])
 
 
 
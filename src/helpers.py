@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+from typing import List, Dict, Optional
+
+import pandas as pd
+
+##########################################################################
+########################    CONTENT HASHING   ############################
+##########################################################################
+def hash_frame(frame: pd.DataFrame) -> str:
+    """
+    SHA-256 of the content of a DataFrame: values, index, column names and dtypes.
+
+    Parameters:
+    frame (pd.DataFrame): Frame to hash.
+
+    Returns:
+    str: Hex digest, equal for frames with equal content.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(col) for col in frame.columns]).encode())
+    digest.update(json.dumps([str(dtype) for dtype in frame.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """
+    SHA-256 of a file, read in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_payload(payload: Dict) -> str:
+    """
+    SHA-256 of a JSON-serialisable dict, independent of the key order.
+    """
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+##########################################################################
+##########################    STAGE CACHE   ##############################
+##########################################################################
+# Layout of the cache:
+#   {cache_dir}/{stage}/{key}.parquet    output of the stage for the inputs hashed in key
+#   {cache_dir}/{stage}/{key}.json       content hash of that output and run statistics
+#   {cache_dir}/{stage}/{key}/           working directory of the stage (models, ...)
+class StageCache:
+    """
+    DataFrame outputs of pipeline stages, stored by stage and input key.
+
+    Parameters:
+    cache_dir (str): Root directory of the cache.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, stage: str, key: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, stage, f"{key}{extension}")
+
+    def workdir(self, stage: str, key: str) -> str:
+        """
+        Directory for the files a stage writes besides its output, created if needed.
+        """
+        path = self._path(stage, key, '')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def has(self, stage: str, key: str) -> bool:
+        # The metadata file is written last, after the output
+        return os.path.exists(self._path(stage, key, '.json'))
+
+    def load(self, stage: str, key: str) -> pd.DataFrame:
+        return pd.read_parquet(self._path(stage, key, '.parquet'))
+
+    def metadata(self, stage: str, key: str) -> Dict:
+        with open(self._path(stage, key, '.json')) as file:
+            return json.load(file)
+
+    def store(self, stage: str, key: str, output: pd.DataFrame, metadata: Optional[Dict] = None) -> Dict:
+        """
+        Store the output of a stage and return its metadata, including its content hash.
+        """
+        os.makedirs(os.path.join(self.cache_dir, stage), exist_ok=True)
+        output.to_parquet(self._path(stage, key, '.parquet'))
+        metadata = dict(metadata or {}, content_hash=hash_frame(output), rows=len(output))
+        with open(self._path(stage, key, '.json'), 'w') as file:
+            json.dump(metadata, file, indent=2, default=str)
+        return metadata
+
+    def keys(self, stage: str) -> List[str]:
+        directory = os.path.join(self.cache_dir, stage)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+
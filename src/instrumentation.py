@@ -0,0 +1,378 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import psutil
+
+##########################################################################
+###########################    MEMORY   ##################################
+##########################################################################
+def peak_rss_bytes() -> int:
+    """
+    Peak resident set size of the current process in bytes.
+    """
+    if sys.platform == 'win32':
+        return psutil.Process().memory_info().peak_wset
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss_bytes() -> int:
+    """
+    Current resident set size of the current process in bytes.
+    """
+    return psutil.Process().memory_info().rss
+
+
+class RSSSampler:
+    """
+    Context manager sampling the resident set size in a background thread.
+
+    ru_maxrss is a process-wide high-water mark, so it cannot isolate the peak of one
+    section of code. The sampler records the highest RSS seen while the block runs.
+
+    Parameters:
+    interval (float): Sampling period in seconds.
+    """
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.peak = 0
+        self.start_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        process = psutil.Process()
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> 'RSSSampler':
+        self.start_rss = current_rss_bytes()
+        self.peak = self.start_rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+    @property
+    def peak_increase_bytes(self) -> int:
+        return self.peak - self.start_rss
+
+
+##########################################################################
+##########################    METRICS   ##################################
+##########################################################################
+# Upper bounds of the latency histogram buckets in milliseconds, the last bucket is unbounded
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1_000, 2_000, 5_000, 10_000, 30_000, 60_000]
+
+
+class OperationMetrics:
+    """
+    Latency samples, histogram and counters of one instrumented operation.
+
+    Calls, total, mean, maximum and histogram cover every call; the percentiles cover
+    the last `sample_capacity` calls, kept in a preallocated ring so that a long-running
+    process uses constant memory per operation.
+    """
+
+    def __init__(self, name: str, sample_capacity: int = 10000):
+        self.name = name
+        self.latencies_ms = np.empty(sample_capacity)
+        self.calls = 0
+        self.total_ms = 0.0
+        self.max_ms = np.nan
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.peak_rss_bytes = 0
+
+    def add(self, seconds: float, rows: int = 0, n_bytes: int = 0, error: bool = False, rss: int = 0) -> None:
+        latency_ms = seconds * 1000
+        self.latencies_ms[self.calls % len(self.latencies_ms)] = latency_ms
+        self.calls += 1
+        self.total_ms += latency_ms
+        self.max_ms = latency_ms if self.calls == 1 else max(self.max_ms, latency_ms)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.errors += int(error)
+        self.rows += int(rows)
+        self.bytes += int(n_bytes)
+        self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+
+    def summary(self) -> Dict:
+        latencies = pd.Series(self.latencies_ms[:min(self.calls, len(self.latencies_ms))], dtype='float64')
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ['inf']
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_s': round(self.total_ms / 1000, 6),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else np.nan,
+            'p50_ms': round(latencies.quantile(0.5), 3),
+            'p95_ms': round(latencies.quantile(0.95), 3),
+            'max_ms': round(self.max_ms, 3),
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'peak_rss_mb': round(self.peak_rss_bytes / 2**20, 1),
+            'histogram': {label: count for label, count in zip(labels, self.histogram) if count},
+        }
+
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of OperationMetrics, one per operation name.
+    """
+
+    def __init__(self):
+        self.operations = {}
+        self.lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, rows: int = 0, n_bytes: int = 0, error: bool = False) -> None:
+        rss = peak_rss_bytes()
+        with self.lock:
+            if name not in self.operations:
+                self.operations[name] = OperationMetrics(name)
+            self.operations[name].add(seconds, rows, n_bytes, error, rss)
+
+    def summaries(self) -> List[Dict]:
+        with self.lock:
+            return [self.operations[name].summary() for name in sorted(self.operations)]
+
+    def reset(self) -> None:
+        with self.lock:
+            self.operations = {}
+
+
+METRICS = MetricsRegistry()
+
+
+def record(name: str, seconds: float, rows: int = 0, n_bytes: int = 0, error: bool = False) -> None:
+    """
+    Record one measurement taken elsewhere, e.g. the fit time returned by a worker process.
+    """
+    METRICS.record(name, seconds, rows, n_bytes, error)
+
+
+##########################################################################
+#########################    PROFILING   #################################
+##########################################################################
+# Profiling is off unless ROBINHOOD_PROFILE is set:
+#   ROBINHOOD_PROFILE=cprofile|pyinstrument   profiler to use
+#   ROBINHOOD_PROFILE_TARGETS=name1,name2     operations to profile (default is all)
+#   ROBINHOOD_PROFILE_DIR=profiles            output directory
+# Only one operation is profiled at a time, calls overlapping a capture in progress
+# (nested or concurrent) run unprofiled.
+_profile_lock = threading.Lock()
+
+
+def _profile_mode(name: str) -> Optional[str]:
+    mode = os.environ.get('ROBINHOOD_PROFILE')
+    if not mode:
+        return None
+    if mode not in ('cprofile', 'pyinstrument'):
+        raise ValueError(f"ROBINHOOD_PROFILE must be 'cprofile' or 'pyinstrument', not '{mode}'")
+    targets = os.environ.get('ROBINHOOD_PROFILE_TARGETS')
+    if targets and name not in targets.split(','):
+        return None
+    return mode
+
+
+@contextmanager
+def capture_profile(name: str, mode: Optional[str] = None) -> Iterator[None]:
+    """
+    Profile the block with cProfile or pyinstrument and write the result to ROBINHOOD_PROFILE_DIR.
+
+    Parameters:
+    name (str): Operation name, used in the output file name.
+    mode (str): 'cprofile' or 'pyinstrument', read from the environment if None.
+    """
+    mode = mode or _profile_mode(name)
+    if mode is None or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    directory = os.environ.get('ROBINHOOD_PROFILE_DIR', 'profiles')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}")
+    try:
+        if mode == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(f"{path}.prof")
+        else:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{path}.html", 'w') as file:
+                    file.write(profiler.output_html())
+        logging.info(f"Profile of {name} written to {path}")
+    finally:
+        _profile_lock.release()
+
+
+##########################################################################
+#####################    DECORATORS AND CONTEXTS   #######################
+##########################################################################
+class Measurement:
+    """
+    Counters filled in by the instrumented block, recorded when it exits.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+
+@contextmanager
+def track(name: str) -> Iterator[Measurement]:
+    """
+    Time a block and record it under name; set .rows and .bytes on the yielded measurement.
+
+    Parameters:
+    name (str): Operation name, e.g. 'get_data.fetch_candlestick_data'.
+
+    Yields:
+    Measurement: Counters of the block.
+    """
+    measurement = Measurement()
+    error = False
+    start = time.perf_counter()
+    try:
+        with capture_profile(name):
+            yield measurement
+    except BaseException:
+        error = True
+        raise
+    finally:
+        METRICS.record(name, time.perf_counter() - start, measurement.rows, measurement.bytes, error)
+
+
+def result_rows(result, args, kwargs) -> int:
+    """
+    Rows of the returned frame.
+    """
+    return len(result) if result is not None else 0
+
+
+def argument_rows(position: int) -> Callable:
+    """
+    rows callable counting the rows of a positional argument (1 for the frame of a method).
+    """
+
+    def rows(result, args, kwargs) -> int:
+        return len(args[position]) if len(args) > position else 0
+
+    return rows
+
+
+# Rows of the first positional argument, for frame-checking functions returning None
+input_rows = argument_rows(0)
+
+
+def timed(name: Optional[str] = None, rows: Optional[Callable] = None) -> Callable:
+    """
+    Decorator recording every call of a function under name ('{module}.{function}' by default).
+
+    Parameters:
+    name (str): Operation name.
+    rows (Callable): rows(result, args, kwargs) -> rows processed by the call, e.g.
+        result_rows, input_rows or argument_rows(1).
+
+    Returns:
+    Callable: The decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        operation = name or f"{func.__module__.split('.')[-1]}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(operation) as measurement:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    measurement.rows = rows(result, args, kwargs)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+##########################################################################
+###########################    EXPORT   ##################################
+##########################################################################
+def export_jsonl(path: str, run_id: Optional[str] = None) -> int:
+    """
+    Append one JSON line per operation, sorted by name, so that two runs can be diffed.
+
+    Parameters:
+    path (str): JSON-lines file.
+    run_id (str): Identifier of the run (default is the current time).
+
+    Returns:
+    int: Number of lines written.
+    """
+    run_id = run_id or datetime.now().isoformat(timespec='seconds')
+    summaries = METRICS.summaries()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a') as file:
+        for summary in summaries:
+            file.write(json.dumps(dict(summary, run_id=run_id)) + '\n')
+    return len(summaries)
+
+
+def read_metrics_jsonl(path: str) -> pd.DataFrame:
+    """
+    Load a JSON-lines metrics file, one row per (run_id, operation).
+    """
+    return pd.read_json(path, lines=True)
+
+
+def compare_runs(
+    baseline: pd.DataFrame,
+    candidate: pd.DataFrame,
+    metric: str = 'p50_ms',
+    threshold: float = 0.2
+) -> pd.DataFrame:
+    """
+    Operations whose metric grew by more than threshold between two runs.
+
+    Parameters:
+    baseline (pd.DataFrame): Rows of the reference run (read_metrics_jsonl, one run_id).
+    candidate (pd.DataFrame): Rows of the new run.
+    metric (str): Column compared, e.g. 'p50_ms', 'p95_ms' or 'peak_rss_mb'.
+    threshold (float): Relative increase flagged as a regression (0.2 is +20%).
+
+    Returns:
+    pd.DataFrame: name, baseline, candidate and relative change of the regressions.
+    """
+    merged = baseline[['name', metric]].merge(candidate[['name', metric]], on='name', suffixes=('_baseline', '_candidate'))
+    merged['change'] = merged[f"{metric}_candidate"] / merged[f"{metric}_baseline"] - 1
+    return merged[merged['change'] > threshold].sort_values('change', ascending=False).reset_index(drop=True)
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import pandas as pd
+
+##########################################################################
+######################    LOCAL KLINE CACHE   ############################
+##########################################################################
+# Layout of the cache:
+#   {cache_dir}/interval={interval}/symbol={symbol}/part-{first_open_ms}.parquet
+#   {cache_dir}/interval={interval}/symbol={symbol}/_manifest.json
+# The manifest records the close time of the last candle held, so that a refresh
+# only asks Binance for the candles opened after it, and the cached columns. Caches
+# written before the full kline columns were kept have no 'columns' entry and are
+# treated as empty, so they are downloaded again with every column. Every refresh adds
+# a part; past max_parts they are merged into one part-{first_open_ms}-{last_open_ms} file.
+# Binance open and close times are kept as naive UTC datetimes.
+MANIFEST_FILE = '_manifest.json'
+
+
+def utc_now() -> datetime:
+    """
+    Current time as a naive UTC datetime, comparable with the cached candle times.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def interval_to_timedelta(interval: str) -> timedelta:
+    """
+    Convert a Binance interval string such as '1h', '4h' or '1d' to a timedelta.
+
+    Parameters:
+    interval (str): The candlestick interval.
+
+    Returns:
+    timedelta: Duration of one candle.
+
+    Raises:
+    ValueError: If the interval is not expressed in minutes, hours, days or weeks.
+    """
+    units = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+    try:
+        return timedelta(**{units[interval[-1]]: int(interval[:-1])})
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported interval '{interval}'")
+
+
+def symbol_cache_dir(cache_dir: str, symbol: str, interval: str) -> str:
+    """
+    Directory holding the cached candles of one (symbol, interval) partition.
+    """
+    return os.path.join(cache_dir, f"interval={interval}", f"symbol={symbol}")
+
+
+def read_manifest(cache_dir: str, symbol: str, interval: str) -> dict:
+    """
+    Read the manifest of a (symbol, interval) partition.
+
+    Parameters:
+    cache_dir (str): Root directory of the kline cache.
+    symbol (str): The trading pair symbol.
+    interval (str): The candlestick interval.
+
+    Returns:
+    dict: The manifest, empty if nothing is cached yet or if the cache holds the close only.
+    """
+    manifest_path = os.path.join(symbol_cache_dir(cache_dir, symbol, interval), MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    return manifest if 'columns' in manifest else {}
+
+
+def cached_close_time(cache_dir: str, symbol: str, interval: str) -> Optional[datetime]:
+    """
+    Close time of the last candle held in the cache.
+
+    Parameters:
+    cache_dir (str): Root directory of the kline cache.
+    symbol (str): The trading pair symbol.
+    interval (str): The candlestick interval.
+
+    Returns:
+    Optional[datetime]: Close time of the last cached candle, None if the partition is empty.
+    """
+    manifest = read_manifest(cache_dir, symbol, interval)
+    if 'last_close_time_ms' not in manifest:
+        return None
+    return pd.to_datetime(manifest['last_close_time_ms'], unit='ms').to_pydatetime()
+
+
+def read_cached_klines(cache_dir: str, symbol: str, interval: str) -> pd.DataFrame:
+    """
+    Load every cached candle of a (symbol, interval) partition.
+
+    Parameters:
+    cache_dir (str): Root directory of the kline cache.
+    symbol (str): The trading pair symbol.
+    interval (str): The candlestick interval.
+
+    Returns:
+    pd.DataFrame: Cached candles sorted by dateTime, empty if nothing is cached.
+    """
+    manifest = read_manifest(cache_dir, symbol, interval)
+    directory = symbol_cache_dir(cache_dir, symbol, interval)
+    parts = [pd.read_parquet(os.path.join(directory, part)) for part in manifest.get('parts', [])]
+    if not parts:
+        return pd.DataFrame()
+    return pd.concat(parts, ignore_index=True)
+
+
+def _write_manifest(directory: str, manifest: dict) -> None:
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path + '.tmp', 'w') as file:
+        json.dump(manifest, file)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def compact_klines(cache_dir: str, symbol: str, interval: str) -> int:
+    """
+    Merge the parts of a (symbol, interval) partition into one file.
+
+    The merged part is written and listed in the manifest before the old parts are
+    removed, so an interrupted compaction leaves orphan files but a valid cache.
+
+    Parameters:
+    cache_dir (str): Root directory of the kline cache.
+    symbol (str): The trading pair symbol.
+    interval (str): The candlestick interval.
+
+    Returns:
+    int: Number of parts merged, 0 if there was nothing to merge.
+    """
+    manifest = read_manifest(cache_dir, symbol, interval)
+    parts = manifest.get('parts', [])
+    if len(parts) < 2:
+        return 0
+    directory = symbol_cache_dir(cache_dir, symbol, interval)
+    klines = read_cached_klines(cache_dir, symbol, interval).sort_values('dateTime')
+    first_open_ms = int(klines['dateTime'].iloc[0].value // 10**6)
+    last_open_ms = int(klines['dateTime'].iloc[-1].value // 10**6)
+    merged = f"part-{first_open_ms}-{last_open_ms}.parquet"
+    klines.to_parquet(os.path.join(directory, merged), index=False)
+    _write_manifest(directory, dict(manifest, parts=[merged]))
+    for part in parts:
+        if part != merged:
+            os.remove(os.path.join(directory, part))
+    return len(parts)
+
+
+def append_klines(
+    cache_dir: str,
+    symbol: str,
+    interval: str,
+    klines: pd.DataFrame,
+    now: datetime = None,
+    max_parts: int = 30
+) -> int:
+    """
+    Append the closed candles of klines to the cache.
+
+    Candles that are still open at `now` are not persisted, since Binance keeps
+    updating them until their close time. Candles opened before the last cached
+    close time are ignored so that overlapping downloads never create duplicates.
+    The partition is compacted once it holds more than max_parts parts.
+
+    Parameters:
+    cache_dir (str): Root directory of the kline cache.
+    symbol (str): The trading pair symbol.
+    interval (str): The candlestick interval.
+    klines (pd.DataFrame): Candles with a datetime 'dateTime' open time column.
+    now (datetime): Reference time deciding which candles are closed (default is the current UTC time).
+    max_parts (int): Number of parts above which the partition is compacted.
+
+    Returns:
+    int: Number of candles written.
+    """
+    if now is None:
+        now = utc_now()
+    step = interval_to_timedelta(interval)
+    manifest = read_manifest(cache_dir, symbol, interval)
+    last_close = cached_close_time(cache_dir, symbol, interval)
+
+    close_time = klines['dateTime'] + step
+    new_rows = close_time <= now
+    if last_close is not None:
+        new_rows &= klines['dateTime'] >= last_close
+    new_klines = klines[new_rows].sort_values('dateTime')
+    if new_klines.empty:
+        return 0
+
+    directory = symbol_cache_dir(cache_dir, symbol, interval)
+    os.makedirs(directory, exist_ok=True)
+    first_open_ms = int(new_klines['dateTime'].iloc[0].value // 10**6)
+    part = f"part-{first_open_ms}.parquet"
+    new_klines.to_parquet(os.path.join(directory, part), index=False)
+
+    # The manifest is rewritten last, so an interrupted append leaves an orphan part but a valid cache
+    last_close_ms = int((new_klines['dateTime'].iloc[-1] + step).value // 10**6)
+    manifest = {
+        'symbol': symbol,
+        'interval': interval,
+        'parts': manifest.get('parts', []) + [part],
+        'rows': manifest.get('rows', 0) + len(new_klines),
+        'last_close_time_ms': last_close_ms,
+        'columns': list(new_klines.columns)
+    }
+    _write_manifest(directory, manifest)
+    logging.info(f"{symbol} {interval}: {len(new_klines)} candles appended to cache")
+    if len(manifest['parts']) > max_parts:
+        compact_klines(cache_dir, symbol, interval)
+    return len(new_klines)
+
+
+def update_cached_klines(cache_dir: str, symbol: str, interval: str, klines: pd.DataFrame, now: datetime = None) -> pd.DataFrame:
+    """
+    Append freshly downloaded candles to the cache and return the full history.
+
+    Parameters:
+    cache_dir (str): Root directory of the kline cache.
+    symbol (str): The trading pair symbol.
+    interval (str): The candlestick interval.
+    klines (pd.DataFrame): Candles downloaded since the last cached close time.
+    now (datetime): Reference time deciding which candles are closed (default is the current UTC time).
+
+    Returns:
+    pd.DataFrame: Cached candles followed by the downloaded candles that are still open.
+    """
+    append_klines(cache_dir, symbol, interval, klines, now)
+    cached = read_cached_klines(cache_dir, symbol, interval)
+    last_close = cached_close_time(cache_dir, symbol, interval)
+    still_open = klines if last_close is None else klines[klines['dateTime'] >= last_close]
+    if cached.empty:
+        return still_open.reset_index(drop=True)
+    return pd.concat([cached, still_open], ignore_index=True)
@@ -0,0 +1,367 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.config import configure_logger
+from src.helpers import StageCache, hash_payload
+from src.instrumentation import RSSSampler, export_jsonl, record
+
+##########################################################################
+#########################    DAG SCHEDULER   #############################
+##########################################################################
+class Stage:
+    """
+    One step of the pipeline.
+
+    A stage is re-run only when its key changes. The key hashes the stage name, its
+    version, its parameters and the content hash of every dependency output, plus the
+    current UTC day for stages reading external sources.
+
+    Parameters:
+    name (str): Stage name, also its cache directory.
+    func (Callable): func(inputs, params, workdir) -> pd.DataFrame, where inputs maps every
+        dependency name to its output.
+    deps (List[str]): Names of the stages whose outputs are inputs of this one.
+    params (Dict): JSON-serialisable parameters, part of the key.
+    version (str): Bump to invalidate cached outputs after a code change.
+    daily (bool): Include the UTC day in the key (stages fetching external data).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        deps: Sequence[str] = (),
+        params: Optional[Dict] = None,
+        version: str = '1',
+        daily: bool = False
+    ):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.params = params or {}
+        self.version = version
+        self.daily = daily
+
+    def key(self, input_hashes: Dict[str, str], today: str) -> str:
+        payload = {
+            'stage': self.name,
+            'version': self.version,
+            'params': self.params,
+            'inputs': input_hashes,
+            'day': today if self.daily else None,
+        }
+        return hash_payload(payload)
+
+
+def topological_order(stages: List[Stage]) -> List[Stage]:
+    """
+    Stages sorted so that every stage comes after its dependencies.
+
+    Raises:
+    ValueError: On an unknown dependency or a cycle.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    order, visiting, done = [], set(), set()
+
+    def visit(stage: Stage) -> None:
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Dependency cycle through stage '{stage.name}'")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+def run_pipeline(
+    stages: List[Stage],
+    cache: StageCache,
+    max_workers: int = 2,
+    force: Sequence[str] = ()
+) -> pd.DataFrame:
+    """
+    Run a DAG of stages, independent stages concurrently, skipping the cached ones.
+
+    Cached outputs are only read from disk when a downstream stage has to run. A failed
+    stage marks every stage depending on it as skipped.
+
+    Parameters:
+    stages (List[Stage]): Stages of the pipeline.
+    cache (StageCache): Cache of stage outputs.
+    max_workers (int): Maximum number of stages running at the same time.
+    force (Sequence[str]): Names of stages re-run even when cached.
+
+    Returns:
+    pd.DataFrame: One row per stage with status ('cached', 'ran', 'failed', 'skipped'),
+    wall time, peak RSS increase, output rows and key. Peak RSS is process-wide, so it
+    includes the stages running concurrently.
+    """
+    stages = topological_order(stages)
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+    keys, content_hashes, outputs, report = {}, {}, {}, {}
+
+    def output_of(name: str) -> pd.DataFrame:
+        if name not in outputs:
+            outputs[name] = cache.load(name, keys[name])
+        return outputs[name]
+
+    def execute(stage: Stage, key: str) -> Dict:
+        inputs = {dep: output_of(dep) for dep in stage.deps}
+        with RSSSampler() as sampler:
+            start = time.perf_counter()
+            output = stage.func(inputs, stage.params, cache.workdir(stage.name, key))
+            seconds = time.perf_counter() - start
+        statistics = {'seconds': seconds, 'peak_rss_mb': sampler.peak_increase_bytes / 2**20}
+        record(f"pipeline.{stage.name}", seconds, rows=len(output))
+        metadata = cache.store(stage.name, key, output, dict(statistics, finished=datetime.now().isoformat()))
+        outputs[stage.name] = output
+        return metadata
+
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for stage in list(pending):
+                if any(dep in running or dep in [s.name for s in pending] for dep in stage.deps):
+                    continue
+                pending.remove(stage)
+                if any(report[dep]['status'] in ('failed', 'skipped') for dep in stage.deps):
+                    report[stage.name] = {'stage': stage.name, 'status': 'skipped'}
+                    continue
+                key = stage.key({dep: content_hashes[dep] for dep in stage.deps}, today)
+                keys[stage.name] = key
+                if cache.has(stage.name, key) and stage.name not in force:
+                    metadata = cache.metadata(stage.name, key)
+                    content_hashes[stage.name] = metadata['content_hash']
+                    report[stage.name] = {
+                        'stage': stage.name, 'status': 'cached', 'seconds': 0.0,
+                        'peak_rss_mb': 0.0, 'rows': metadata['rows'], 'key': key[:12]
+                    }
+                    logging.info(f"{stage.name}: cached ({key[:12]})")
+                    continue
+                logging.info(f"{stage.name}: running ({key[:12]})")
+                running[stage.name] = executor.submit(execute, stage, key)
+
+            if not running:
+                continue
+            done, _ = wait(running.values(), return_when=FIRST_COMPLETED)
+            for name in [name for name, future in running.items() if future in done]:
+                future = running.pop(name)
+                try:
+                    metadata = future.result()
+                except Exception as e:
+                    logging.error(f"{name}: failed: {e}")
+                    report[name] = {'stage': name, 'status': 'failed', 'error': str(e)}
+                    continue
+                content_hashes[name] = metadata['content_hash']
+                report[name] = {
+                    'stage': name, 'status': 'ran', 'seconds': metadata['seconds'],
+                    'peak_rss_mb': metadata['peak_rss_mb'], 'rows': metadata['rows'], 'key': keys[name][:12]
+                }
+                logging.info(f"{name}: done in {metadata['seconds']:.2f}s")
+
+    columns = ['stage', 'status', 'seconds', 'peak_rss_mb', 'rows', 'key']
+    return pd.DataFrame([report[stage.name] for stage in stages]).reindex(columns=columns + ['error']).dropna(axis=1, how='all')
+
+
+##########################################################################
+########################    PIPELINE STAGES   ############################
+##########################################################################
+# Checks after which an asset's CoinMetrics rows are unusable for training
+BLOCKING_CHECKS = ['not_empty', 'not_all_nan', 'no_duplicates', 'dates_sorted']
+
+
+def fetch_binance_stage(inputs: Dict, params: Dict, workdir: str) -> pd.DataFrame:
+    from binance.client import Client
+
+    from src.feature_store import read_symbol_map
+    from src.get_data import fetch_all_candlestick_data, read_api_keys
+
+    pairs = params['pairs'] or list(read_symbol_map(params['symbol_map'])['ticker'])
+    client = Client(*read_api_keys(params['api_keys']))
+    return fetch_all_candlestick_data(
+        client, pairs, interval=params['interval'], days_back=params['days_back'], cache_dir=params['kline_cache_dir']
+    )
+
+
+def fetch_coinmetrics_stage(inputs: Dict, params: Dict, workdir: str) -> pd.DataFrame:
+    from src.get_data import get_coinmetrics_data
+
+    return get_coinmetrics_data(
+        params['days_back'], params['metrics'], params['assets'], compact=True, file_path_metadata=params['metadata']
+    )
+
+
+def quality_checks_stage(inputs: Dict, params: Dict, workdir: str) -> pd.DataFrame:
+    from src.data_quality_checks import check_data_quality
+
+    report = check_data_quality(inputs['fetch_coinmetrics'], params['metrics'], file_path_metadata=params['metadata'])
+    logging.info(f"Quality checks: {int((~report['passed']).sum())} failed out of {len(report)}")
+    return report
+
+
+def preprocess_stage(inputs: Dict, params: Dict, workdir: str) -> pd.DataFrame:
+    from src.feature_store import read_symbol_map
+    from src.preprocesing import COINMETRICS_RATIO_FEATURES, DEFAULT_FEATURES, FeatureEngine, coinmetrics_to_wide
+
+    report = inputs['quality_checks']
+    blocked = report[report['check'].isin(BLOCKING_CHECKS) & ~report['passed']]['asset'].unique()
+    if len(blocked):
+        logging.warning(f"Ignoring the CoinMetrics data of {sorted(blocked)} (blocking quality checks failed)")
+    coinmetrics = inputs['fetch_coinmetrics']
+    coinmetrics = coinmetrics[~coinmetrics['asset'].astype(str).isin(blocked)]
+
+    close = inputs['fetch_binance'].pivot_table(index='dateTime', columns='ticker', values='close', observed=True)
+    symbol_map = read_symbol_map(params['symbol_map']).set_index('asset')['ticker'].to_dict()
+    metrics = sorted({feature[side] for feature in COINMETRICS_RATIO_FEATURES for side in ('numerator', 'denominator')})
+    wide = coinmetrics_to_wide(coinmetrics, metrics, symbol_map, close.index, close.columns)
+    return FeatureEngine(close, wide).compute(DEFAULT_FEATURES + COINMETRICS_RATIO_FEATURES)
+
+
+def default_classifiers() -> Dict[str, object]:
+    """
+    Classifiers of running_strat.ipynb.
+    """
+    from sklearn.ensemble import AdaBoostClassifier
+    from sklearn.neural_network import MLPClassifier
+
+    return {
+        'Neural Net': MLPClassifier(alpha=1, max_iter=1000, random_state=42),
+        'AdaBoost': AdaBoostClassifier(random_state=42),
+    }
+
+
+def training_rows(features: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows usable for training: a known target and finite features.
+    """
+    features = features.replace([np.inf, -np.inf], np.nan)
+    return features[features['target'].notna()].dropna()
+
+
+def train_stage(inputs: Dict, params: Dict, workdir: str) -> pd.DataFrame:
+    from src.train_models import train_walk_forward
+
+    rows = training_rows(inputs['preprocess'])
+    X = rows.drop(columns='target')
+    y = (rows['target'] > 0).astype(int)
+    classifiers = default_classifiers()
+    return train_walk_forward(
+        X, y, list(classifiers), list(classifiers.values()), n_folds=params['n_folds'],
+        n_jobs=params['n_jobs'], artifacts_dir=os.path.join(workdir, 'models')
+    )
+
+
+def predict_stage(inputs: Dict, params: Dict, workdir: str) -> pd.DataFrame:
+    from src.prediction_service import PredictionService
+
+    results = inputs['train']
+    last_fold = results[results['fold'] == results['fold'].max()]
+    features = inputs['preprocess'].drop(columns='target').replace([np.inf, -np.inf], np.nan)
+    latest = features[features.index.get_level_values(0) == features.index.get_level_values(0).max()].dropna()
+    service = PredictionService(dict(zip(last_fold['model'], last_fold['artifact_path'])))
+    return service.predict(latest)
+
+
+def monitor_stage(inputs: Dict, params: Dict, workdir: str) -> pd.DataFrame:
+    from src.monitoring import update_monitor
+
+    # Freshness of the CoinMetrics publications; their levels trend, so drift is judged on the features
+    coinmetrics_report = update_monitor(
+        os.path.join(params['state_dir'], 'coinmetrics.npz'), inputs['fetch_coinmetrics'],
+        checks=['eod_completion_fresh', 'metrics_fresh']
+    )
+    features = inputs['preprocess'].drop(columns='target').replace([np.inf, -np.inf], np.nan)
+    time_column, ticker_column = features.index.names
+    features_report = update_monitor(
+        os.path.join(params['state_dir'], 'features.npz'), features.reset_index(),
+        entity_column=ticker_column, time_column=time_column,
+        checks=['metrics_fresh', 'no_distribution_shift', 'no_mean_shift']
+    )
+    report = pd.concat([coinmetrics_report, features_report], ignore_index=True)
+    logging.info(f"Monitoring: {int((~report['passed']).sum())} failed out of {len(report)}")
+    return report
+
+
+def build_pipeline(args: argparse.Namespace) -> List[Stage]:
+    """
+    fetch_binance and fetch_coinmetrics -> quality_checks -> preprocess -> train -> predict,
+    and monitor after preprocess.
+    """
+    return [
+        Stage('fetch_binance', fetch_binance_stage, params={
+            'pairs': args.pairs, 'symbol_map': args.symbol_map, 'api_keys': args.api_keys,
+            'interval': args.interval, 'days_back': args.binance_days, 'kline_cache_dir': args.kline_cache_dir
+        }, daily=True),
+        Stage('fetch_coinmetrics', fetch_coinmetrics_stage, params={
+            'days_back': args.coinmetrics_days, 'metrics': args.metrics, 'assets': args.assets, 'metadata': args.metadata
+        }, daily=True),
+        Stage('quality_checks', quality_checks_stage, ['fetch_coinmetrics'], {
+            'metrics': args.metrics, 'metadata': args.metadata
+        }),
+        Stage('preprocess', preprocess_stage, ['fetch_binance', 'fetch_coinmetrics', 'quality_checks'], {
+            'symbol_map': args.symbol_map
+        }),
+        Stage('train', train_stage, ['preprocess'], {
+            'n_folds': args.n_folds, 'n_jobs': args.n_jobs,
+            'classifiers': {name: repr(clf) for name, clf in default_classifiers().items()}
+        }),
+        Stage('predict', predict_stage, ['preprocess', 'train']),
+        Stage('monitor', monitor_stage, ['fetch_coinmetrics', 'preprocess'], {'state_dir': args.monitor_dir}, daily=True),
+    ]
+
+
+# Default paths do not depend on the working directory the pipeline is started from
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = REPO_ROOT / 'data'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the daily pipeline, skipping the stages whose inputs did not change.")
+    parser.add_argument('--cache-dir', default=str(DATA_DIR / 'pipeline_cache'))
+    parser.add_argument('--force', action='append', default=[], help="Re-run this stage even if cached, repeatable")
+    parser.add_argument('--max-workers', type=int, default=2, help="Stages running at the same time")
+    parser.add_argument('--pairs', nargs='*', default=[], help="Binance pairs (default is every mapped ticker)")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--binance-days', type=int, default=2000)
+    parser.add_argument('--coinmetrics-days', type=int, default=2000)
+    parser.add_argument('--kline-cache-dir', default=str(DATA_DIR / 'klines'))
+    parser.add_argument('--api-keys', default=str(REPO_ROOT / 'src' / 'ID' / 'test.txt'))
+    parser.add_argument('--symbol-map', default=str(DATA_DIR / 'static' / 'symbol_map.csv'))
+    parser.add_argument('--metrics', default=str(DATA_DIR / 'static' / 'metrics.txt'))
+    parser.add_argument('--assets', default=str(DATA_DIR / 'static' / 'assets.txt'))
+    parser.add_argument('--metadata', default=str(DATA_DIR / 'static' / 'metric_metadata.csv'))
+    parser.add_argument('--monitor-dir', default=str(DATA_DIR / 'monitor'), help="Freshness and drift monitor states")
+    parser.add_argument('--n-folds', type=int, default=5)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--metrics-file', default=None, help="Append the run's instrumentation metrics to this JSON-lines file")
+    args = parser.parse_args(argv)
+
+    configure_logger()
+    report = run_pipeline(build_pipeline(args), StageCache(args.cache_dir), args.max_workers, args.force)
+    print(report.to_string(index=False))
+    if args.metrics_file is not None:
+        export_jsonl(args.metrics_file)
+    return int((report['status'] == 'failed').any())
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+##########################################################################
+##########################    MODEL STORE   ##############################
+##########################################################################
+# A stored model is a directory:
+#   {path}/model.joblib    fitted model and scaler statistics, uncompressed so that
+#                          every NumPy array can be memory-mapped
+#   {path}/manifest.json   format version, serializer, model class, library versions, checksum
+# Prediction workers loading the same directory with mmap_mode='r' share one copy
+# of the weights through the page cache instead of each unpickling its own.
+# Models made of many small arrays (AdaBoost trees) load several times slower through
+# joblib than through pickle and gain nothing from mmap, so below MMAP_THRESHOLD bytes
+# they are stored as {path}/model.pkl instead.
+FORMAT_VERSION = 1
+MODEL_FILES = {'joblib': 'model.joblib', 'pickle': 'model.pkl'}
+MANIFEST_FILE = 'manifest.json'
+MMAP_THRESHOLD = 2**20
+
+
+def file_sha256(path: str) -> str:
+    """
+    SHA-256 of a file, read in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(2**20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_model(
+    model,
+    path: str,
+    scaler_mean: Optional[np.ndarray] = None,
+    scaler_scale: Optional[np.ndarray] = None
+) -> str:
+    """
+    Store a fitted model and its scaler statistics in the versioned, memory-mappable format.
+
+    Models whose pickle is smaller than MMAP_THRESHOLD are stored with pickle instead of joblib.
+
+    Parameters:
+    model (object): Fitted estimator.
+    path (str): Directory of the stored model, created if needed.
+    scaler_mean (np.ndarray): Mean of the StandardScaler fitted with the model, if any.
+    scaler_scale (np.ndarray): Scale of the StandardScaler fitted with the model, if any.
+
+    Returns:
+    str: The directory of the stored model.
+    """
+    # Already loaded by the fitted model, imported here to keep prediction startup free of it
+    import sklearn
+
+    os.makedirs(path, exist_ok=True)
+    payload = {'model': model, 'scaler_mean': scaler_mean, 'scaler_scale': scaler_scale}
+    pickled = pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    serializer = 'joblib' if len(pickled) >= MMAP_THRESHOLD else 'pickle'
+    model_path = os.path.join(path, MODEL_FILES[serializer])
+    if serializer == 'joblib':
+        import joblib
+
+        # compress=0 keeps the arrays as raw buffers, a requirement of mmap_mode
+        joblib.dump(payload, model_path, compress=0)
+    else:
+        with open(model_path, 'wb') as file:
+            file.write(pickled)
+    for other in set(MODEL_FILES.values()) - {MODEL_FILES[serializer]}:
+        if os.path.exists(os.path.join(path, other)):
+            os.remove(os.path.join(path, other))
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'serializer': serializer,
+        'model_class': f"{type(model).__module__}.{type(model).__name__}",
+        'sklearn_version': sklearn.__version__,
+        'numpy_version': np.__version__,
+        'has_scaler': scaler_mean is not None,
+        'sha256': file_sha256(model_path),
+        'created': datetime.now().isoformat(timespec='seconds')
+    }
+    with open(os.path.join(path, MANIFEST_FILE), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return path
+
+
+def read_manifest(path: str) -> dict:
+    """
+    Read and validate the manifest of a stored model.
+
+    Parameters:
+    path (str): Directory of the stored model.
+
+    Returns:
+    dict: The manifest.
+
+    Raises:
+    ValueError: If the model was stored with an unsupported format version.
+    """
+    with open(os.path.join(path, MANIFEST_FILE)) as file:
+        manifest = json.load(file)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported model format version {manifest.get('format_version')}")
+    return manifest
+
+
+def model_file(path: str, manifest: Optional[dict] = None) -> str:
+    """
+    Path of the serialized model inside a stored model directory.
+    """
+    manifest = manifest or read_manifest(path)
+    return os.path.join(path, MODEL_FILES[manifest['serializer']])
+
+
+def is_stored_model(path: str) -> bool:
+    """
+    Whether path is a model directory written by export_model.
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def load_model(
+    path: str,
+    mmap_mode: Optional[str] = 'r',
+    verify_checksum: bool = False
+) -> Tuple[object, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Load a model stored by export_model, memory-mapping its arrays by default.
+
+    Parameters:
+    path (str): Directory of the stored model.
+    mmap_mode (str): joblib mmap_mode, 'r' shares the weights read-only between processes,
+        None loads private copies. Ignored for models stored with pickle.
+    verify_checksum (bool): Check the model file against the manifest checksum (reads the whole file).
+
+    Returns:
+    Tuple[object, Optional[np.ndarray], Optional[np.ndarray]]: The model and its scaler mean and scale.
+
+    Raises:
+    ValueError: If the format version or the checksum does not match.
+    """
+    manifest = read_manifest(path)
+    model_path = model_file(path, manifest)
+    if verify_checksum and file_sha256(model_path) != manifest['sha256']:
+        raise ValueError(f"{path}: checksum mismatch")
+    if manifest['serializer'] == 'joblib':
+        import joblib
+
+        payload = joblib.load(model_path, mmap_mode=mmap_mode)
+    else:
+        with open(model_path, 'rb') as file:
+            payload = pickle.load(file)
+    return payload['model'], payload['scaler_mean'], payload['scaler_scale']
+
+
+def load_any_model(path: str, mmap_mode: Optional[str] = 'r') -> Tuple[object, Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Load a stored model directory, or a legacy pickle file written by pickle.dump.
+
+    Legacy pickles hold either the bare model or a dict with 'model', 'scaler_mean'
+    and 'scaler_scale' keys.
+
+    Parameters:
+    path (str): Stored model directory or pickle file.
+    mmap_mode (str): joblib mmap_mode used for stored model directories.
+
+    Returns:
+    Tuple[object, Optional[np.ndarray], Optional[np.ndarray]]: The model and its scaler mean and scale.
+    """
+    if is_stored_model(path):
+        return load_model(path, mmap_mode)
+    with open(path, 'rb') as file:
+        loaded = pickle.load(file)
+    if isinstance(loaded, dict) and 'model' in loaded:
+        return loaded['model'], loaded.get('scaler_mean'), loaded.get('scaler_scale')
+    return loaded, None, None
@@ -0,0 +1,576 @@
+import logging
+import os
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data_quality_checks import REPORT_COLUMNS
+
+##########################################################################
+#######################    MERGEABLE MOMENTS   ###########################
+##########################################################################
+# Running mean and variance are kept as (weight, mean, M2) triples: Welford's update
+# generalised to batches by Chan et al., so the statistics of the new rows of a day
+# are computed on their own and merged into the state without the earlier rows.
+# Weights are row counts, or exponentially decayed counts for the live statistics.
+
+
+def group_moments(
+    values: np.ndarray,
+    codes: np.ndarray,
+    n_groups: int,
+    weights: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Weight, mean and M2 (sum of weighted squared deviations) of the values of every group.
+
+    Parameters:
+    values (np.ndarray): Values without NaN.
+    codes (np.ndarray): Group of every value, in [0, n_groups).
+    n_groups (int): Number of groups.
+    weights (np.ndarray): Weight of every value, 1 if None.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray, np.ndarray]: (n_groups,) weight, mean and M2, mean NaN for empty groups.
+    """
+    weights = np.ones(len(values)) if weights is None else weights
+    weight = np.bincount(codes, weights, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(codes, weights * values, minlength=n_groups) / weight
+    m2 = np.bincount(codes, weights * (values - mean[codes]) ** 2, minlength=n_groups)
+    return weight, mean, m2
+
+
+def merge_moments(
+    weight_a: np.ndarray,
+    mean_a: np.ndarray,
+    m2_a: np.ndarray,
+    weight_b: np.ndarray,
+    mean_b: np.ndarray,
+    m2_b: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Moments of the union of two sets of values from the moments of each (Chan et al.).
+    """
+    weight = weight_a + weight_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        share_b = np.where(weight > 0, weight_b / weight, 0.0)
+        mean = np.where(weight_a > 0, mean_a + delta * share_b, mean_b)
+        m2 = np.where(
+            (weight_a > 0) & (weight_b > 0),
+            m2_a + m2_b + delta ** 2 * weight_a * share_b,
+            np.where(weight_a > 0, m2_a, m2_b)
+        )
+    return weight, mean, m2
+
+
+##########################################################################
+##########################    DRIFT MONITOR   ############################
+##########################################################################
+EOD_COMPLETION_COLUMN = 'AssetEODCompletionTime'
+MISSING_TIME = np.iinfo('int64').min
+DAY_NS = 86_400 * 10**9
+
+
+def monitored_metrics(data: pd.DataFrame, entity_column: str = 'asset', time_column: str = 'time') -> List[str]:
+    """
+    Numeric columns of the data.
+
+    AssetEODCompletionTime is only used for freshness, it is excluded explicitly because
+    compact data stores it as Int64 nanoseconds rather than as a timestamp.
+    """
+    return [
+        column for column in data.columns
+        if column not in (entity_column, time_column, EOD_COMPLETION_COLUMN)
+        and pd.api.types.is_numeric_dtype(data[column]) and not pd.api.types.is_bool_dtype(data[column])
+    ]
+
+
+def _epoch_ns(times: pd.Series) -> np.ndarray:
+    return pd.to_datetime(times, utc=True).to_numpy(dtype='datetime64[ns]').astype('int64')
+
+
+class DriftMonitor:
+    """
+    Streaming summary state of every (asset, metric), for freshness and drift checks.
+
+    For every (asset, metric) it holds:
+    - the reference moments and histogram of the training window, frozen by fit_reference.
+      The histogram edges are deciles of that window, so every reference bin holds about
+      a tenth of its values;
+    - live moments and a histogram on the same edges, the quantile sketch, of the rows
+      after the reference. They decay with a half-life in days, so they describe the
+      recent weeks rather than everything since training;
+    - the time of the last non-null value.
+    update only scans the last lookback_days of every asset and folds the values newer
+    than that time, so feeding it the full fetched window every day costs O(new rows).
+    Revisions of values already folded are ignored. The last row of CoinMetrics data is
+    all NaN until the day is complete, and its values are folded when they are published.
+
+    Parameters:
+    metrics (List[str]): Monitored numeric columns.
+    n_bins (int): Bins of the histograms, decile edges for 10.
+    halflife_days (float): Half-life of the live statistics, no decay if None.
+    lookback_days (int): Days before the newest value of an asset still scanned for late values.
+    entity_column (str): Column of the asset (or ticker for model features).
+    time_column (str): Column of the UTC day.
+    """
+
+    def __init__(
+        self,
+        metrics: List[str],
+        n_bins: int = 10,
+        halflife_days: Optional[float] = 30.0,
+        lookback_days: int = 7,
+        entity_column: str = 'asset',
+        time_column: str = 'time'
+    ):
+        self.metrics = list(metrics)
+        self.n_bins = n_bins
+        self.halflife_days = halflife_days
+        self.lookback_days = lookback_days
+        self.entity_column = entity_column
+        self.time_column = time_column
+        self.entities = []
+        self.arrays = {}
+        self.live_time = MISSING_TIME
+        # Whether the data has an AssetEODCompletionTime column to check
+        self.tracks_completion = False
+        self._resize(0)
+
+    # Arrays of shape (entities, metrics[, bins]) and their fill values
+    _FIELDS = {
+        'edges': np.nan, 'ref_weight': 0.0, 'ref_mean': np.nan, 'ref_m2': 0.0, 'ref_hist': 0.0,
+        'live_weight': 0.0, 'live_weight2': 0.0, 'live_mean': np.nan, 'live_m2': 0.0, 'live_hist': 0.0,
+        'live_hist_sum': 0.0, 'last_updated': MISSING_TIME,
+    }
+
+    def _shape(self, field: str, n_entities: int) -> tuple:
+        if field == 'edges':
+            return (n_entities, len(self.metrics), self.n_bins - 1)
+        if field in ('ref_hist', 'live_hist', 'live_hist_sum'):
+            return (n_entities, len(self.metrics), self.n_bins)
+        return (n_entities, len(self.metrics))
+
+    def _resize(self, n_entities: int) -> None:
+        for field, fill in self._FIELDS.items():
+            grown = np.full(self._shape(field, n_entities), fill, dtype='int64' if field == 'last_updated' else 'float64')
+            if field in self.arrays:
+                grown[:len(self.arrays[field])] = self.arrays[field]
+            self.arrays[field] = grown
+        completion = np.full(n_entities, MISSING_TIME, dtype='int64')
+        if 'completed_day' in self.arrays:
+            completion[:len(self.arrays['completed_day'])] = self.arrays['completed_day']
+        self.arrays['completed_day'] = completion
+
+    def _entity_codes(self, entities: pd.Series) -> np.ndarray:
+        values = entities.astype(str).to_numpy()
+        known = set(self.entities)
+        new = [entity for entity in pd.unique(values) if entity not in known]
+        if new:
+            self.entities += new
+            self._resize(len(self.entities))
+        return pd.Index(self.entities).get_indexer(values)
+
+    def _row_weights(self, times: np.ndarray) -> np.ndarray:
+        """
+        Decay the live statistics to the newest time and return the weights of the new rows.
+        """
+        newest = max(self.live_time, int(times.max()))
+        if self.halflife_days is None:
+            self.live_time = newest
+            return np.ones(len(times))
+        halflife_ns = self.halflife_days * DAY_NS
+        if self.live_time != MISSING_TIME and newest > self.live_time:
+            factor = 0.5 ** ((newest - self.live_time) / halflife_ns)
+            for field in ('live_weight', 'live_m2', 'live_hist', 'live_hist_sum'):
+                self.arrays[field] *= factor
+            self.arrays['live_weight2'] *= factor ** 2
+        self.live_time = newest
+        return 0.5 ** ((newest - times) / halflife_ns)
+
+    def _bins(self, values: np.ndarray, codes: np.ndarray, metric: int) -> np.ndarray:
+        # Edges differ per asset, a value's bin is the number of its asset's edges below it
+        return (values[:, None] > self.arrays['edges'][codes, metric]).sum(axis=1)
+
+    def _metric_values(self, data: pd.DataFrame, metric: str) -> np.ndarray:
+        return data[metric].to_numpy(dtype='float64', na_value=np.nan)
+
+    def fit_reference(self, data: pd.DataFrame, start: Optional[str] = None, end: Optional[str] = None) -> 'DriftMonitor':
+        """
+        Set the reference statistics from the training window and start the live state after it.
+
+        Parameters:
+        data (pd.DataFrame): Rows with the entity, time and metric columns.
+        start (str): First day of the training window (inclusive), all rows if None.
+        end (str): Last day of the training window (exclusive), all rows if None.
+
+        Returns:
+        DriftMonitor: The monitor.
+        """
+        times = pd.to_datetime(data[self.time_column], utc=True)
+        window = np.ones(len(data), dtype=bool)
+        if start is not None:
+            window &= (times >= pd.Timestamp(start, tz='UTC')).to_numpy()
+        if end is not None:
+            window &= (times < pd.Timestamp(end, tz='UTC')).to_numpy()
+        data = data[window]
+        codes = self._entity_codes(data[self.entity_column])
+        times = _epoch_ns(data[self.time_column])
+        quantiles = np.linspace(0, 1, self.n_bins + 1)[1:-1]
+
+        for metric_index, metric in enumerate(self.metrics):
+            values = self._metric_values(data, metric)
+            known = ~np.isnan(values)
+            metric_codes, metric_values = codes[known], values[known]
+            weight, mean, m2 = group_moments(metric_values, metric_codes, len(self.entities))
+            self.arrays['ref_weight'][:, metric_index] = weight
+            self.arrays['ref_mean'][:, metric_index] = mean
+            self.arrays['ref_m2'][:, metric_index] = m2
+
+            if len(metric_values):
+                edges = pd.Series(metric_values).groupby(metric_codes).quantile(quantiles).unstack()
+                self.arrays['edges'][edges.index.to_numpy(), metric_index] = edges.to_numpy()
+                bins = self._bins(metric_values, metric_codes, metric_index)
+                self.arrays['ref_hist'][:, metric_index] = np.bincount(
+                    metric_codes * self.n_bins + bins, minlength=len(self.entities) * self.n_bins
+                ).reshape(len(self.entities), self.n_bins)
+                np.maximum.at(self.arrays['last_updated'][:, metric_index], metric_codes, times[known])
+        self._update_completion(data, codes)
+        return self
+
+    def _update_completion(self, data: pd.DataFrame, codes: np.ndarray) -> None:
+        if EOD_COMPLETION_COLUMN not in data.columns:
+            return
+        self.tracks_completion = True
+        completed = data[EOD_COMPLETION_COLUMN].notna().to_numpy()
+        # A day is complete once CoinMetrics publishes its completion time
+        days = _epoch_ns(data[self.time_column]) // DAY_NS * DAY_NS
+        np.maximum.at(self.arrays['completed_day'], codes[completed], days[completed])
+
+    def update(self, data: pd.DataFrame) -> int:
+        """
+        Fold the values published since the last update into the live state.
+
+        Parameters:
+        data (pd.DataFrame): Rows with the entity, time and metric columns, e.g. the output
+            of get_coinmetrics_data; rows already folded are skipped.
+
+        Returns:
+        int: Number of values folded.
+        """
+        if data.empty:
+            return 0
+        codes = self._entity_codes(data[self.entity_column])
+        times = _epoch_ns(data[self.time_column])
+        # Only the last lookback_days before the newest value of an asset can hold new values
+        newest = self.arrays['last_updated'].max(axis=1)
+        since = np.where(newest == MISSING_TIME, MISSING_TIME, newest - self.lookback_days * DAY_NS)
+        candidate = times > since[codes]
+        if not candidate.any():
+            return 0
+        data, codes, times = data[candidate], codes[candidate], times[candidate]
+        weights = self._row_weights(times)
+        n_entities = len(self.entities)
+        folded = 0
+
+        for metric_index, metric in enumerate(self.metrics):
+            values = self._metric_values(data, metric)
+            new = ~np.isnan(values) & (times > self.arrays['last_updated'][codes, metric_index])
+            if not new.any():
+                continue
+            metric_codes, metric_values, metric_weights = codes[new], values[new], weights[new]
+            merged = merge_moments(
+                self.arrays['live_weight'][:, metric_index], self.arrays['live_mean'][:, metric_index],
+                self.arrays['live_m2'][:, metric_index],
+                *group_moments(metric_values, metric_codes, n_entities, metric_weights)
+            )
+            for field, values_merged in zip(('live_weight', 'live_mean', 'live_m2'), merged):
+                self.arrays[field][:, metric_index] = values_merged
+            self.arrays['live_weight2'][:, metric_index] += np.bincount(metric_codes, metric_weights ** 2, minlength=n_entities)
+
+            bins = self._bins(metric_values, metric_codes, metric_index)
+            cells = metric_codes * self.n_bins + bins
+            self.arrays['live_hist'][:, metric_index] += np.bincount(
+                cells, metric_weights, minlength=n_entities * self.n_bins
+            ).reshape(n_entities, self.n_bins)
+            self.arrays['live_hist_sum'][:, metric_index] += np.bincount(
+                cells, metric_weights * metric_values, minlength=n_entities * self.n_bins
+            ).reshape(n_entities, self.n_bins)
+            np.maximum.at(self.arrays['last_updated'][:, metric_index], metric_codes, times[new])
+            folded += int(new.sum())
+        self._update_completion(data, codes)
+        return folded
+
+    def _frame(self, values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(values, index=pd.Index(self.entities, name=self.entity_column), columns=self.metrics)
+
+    def psi(self, epsilon: float = 1e-4) -> pd.DataFrame:
+        """
+        Population stability index of the live histogram against the reference, per (asset, metric).
+
+        Returns:
+        pd.DataFrame: Assets x metrics, NaN without a reference or live values.
+        """
+        reference, live = self.arrays['ref_hist'], self.arrays['live_hist']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            expected = np.maximum(reference / reference.sum(axis=-1, keepdims=True), epsilon)
+            actual = np.maximum(live / live.sum(axis=-1, keepdims=True), epsilon)
+        psi = ((actual - expected) * np.log(actual / expected)).sum(axis=-1)
+        empty = (reference.sum(axis=-1) == 0) | (live.sum(axis=-1) == 0)
+        return self._frame(np.where(empty, np.nan, psi))
+
+    def effective_rows(self) -> pd.DataFrame:
+        """
+        Effective number of live values per (asset, metric), (sum of weights)^2 / sum of squared weights.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rows = self.arrays['live_weight'] ** 2 / self.arrays['live_weight2']
+        return self._frame(np.where(self.arrays['live_weight2'] > 0, rows, 0.0))
+
+    def psi_noise(self) -> pd.DataFrame:
+        """
+        Expected PSI of two samples of the same distribution, (bins - 1) * (1 / live rows + 1 / reference rows).
+
+        About 0.1 for the ~90 effective rows of a 30-day half-life, so a fixed threshold
+        alone would flag stable metrics.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            noise = (self.n_bins - 1) * (1 / self.effective_rows().to_numpy() + 1 / self.arrays['ref_weight'])
+        return self._frame(noise)
+
+    def mean_shift(self) -> pd.DataFrame:
+        """
+        Live mean minus reference mean in reference standard deviations, per (asset, metric).
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            reference_std = np.sqrt(self.arrays['ref_m2'] / (self.arrays['ref_weight'] - 1))
+            shift = (self.arrays['live_mean'] - self.arrays['ref_mean']) / reference_std
+        return self._frame(np.where(np.isfinite(shift), shift, np.nan))
+
+    def moments(self, which: str = 'live') -> Dict[str, pd.DataFrame]:
+        """
+        Weight, mean and variance of the 'live' or 'ref' statistics, per (asset, metric).
+        """
+        weight = self.arrays[f"{which}_weight"]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = self.arrays[f"{which}_m2"] / weight
+        return {
+            'weight': self._frame(weight),
+            'mean': self._frame(self.arrays[f"{which}_mean"]),
+            'variance': self._frame(np.where(weight > 0, variance, np.nan)),
+        }
+
+    def quantiles(self, probabilities: Tuple[float, ...] = (0.05, 0.5, 0.95)) -> Dict[float, pd.DataFrame]:
+        """
+        Approximate live quantiles, interpolated in the histogram bins.
+
+        The outer bins are open, their values are taken as uniform over the interval
+        centred on their decayed mean, so an old extreme value fades like the histogram.
+
+        Returns:
+        Dict[float, pd.DataFrame]: Probability to assets x metrics quantiles.
+        """
+        hist = self.arrays['live_hist']
+        inner = self.arrays['edges']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bin_mean = self.arrays['live_hist_sum'] / hist
+            lowest = np.fmin(2 * bin_mean[..., 0] - inner[..., 0], inner[..., 0])
+            highest = np.fmax(2 * bin_mean[..., -1] - inner[..., -1], inner[..., -1])
+        edges = np.concatenate([lowest[..., None], inner, highest[..., None]], axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cdf = np.cumsum(hist, axis=-1) / hist.sum(axis=-1, keepdims=True)
+        result = {}
+        for probability in probabilities:
+            bin_index = np.minimum((cdf < probability).sum(axis=-1), self.n_bins - 1)
+            below = np.take_along_axis(np.concatenate([np.zeros_like(cdf[..., :1]), cdf], axis=-1), bin_index[..., None], -1)[..., 0]
+            above = np.take_along_axis(cdf, bin_index[..., None], -1)[..., 0]
+            low = np.take_along_axis(edges, bin_index[..., None], -1)[..., 0]
+            high = np.take_along_axis(edges, bin_index[..., None] + 1, -1)[..., 0]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                share = np.where(above > below, (probability - below) / (above - below), 0.0)
+            result[probability] = self._frame(np.where(hist.sum(axis=-1) > 0, low + share * (high - low), np.nan))
+        return result
+
+    def last_updated(self) -> pd.DataFrame:
+        """
+        UTC time of the last non-null value of every (asset, metric), NaT if none.
+        """
+        # MISSING_TIME is the int64 value of NaT
+        frame = self._frame(self.arrays['last_updated'].astype('datetime64[ns]'))
+        return frame.apply(lambda column: column.dt.tz_localize('UTC'))
+
+    def report(
+        self,
+        as_of: Optional[str] = None,
+        max_completion_lag_days: int = 2,
+        max_metric_lag_days: int = 3,
+        psi_threshold: float = 0.25,
+        mean_shift_threshold: float = 1.0,
+        min_live_rows: float = 20.0,
+        checks: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Freshness and drift checks in the format of src.data_quality_checks.
+
+        Checks:
+        - eod_completion_fresh: the last day with an AssetEODCompletionTime is at most
+          max_completion_lag_days before as_of (passes when the data has no such column);
+        - metrics_fresh: every metric was updated at most max_metric_lag_days before the
+          asset's most recent metric;
+        - no_distribution_shift: PSI of the live histogram against the reference, less the
+          PSI expected from sampling noise alone (psi_noise), at most psi_threshold;
+        - no_mean_shift: live mean within mean_shift_threshold reference standard deviations.
+        The drift checks skip the metrics with fewer than min_live_rows effective live values.
+
+        Parameters:
+        as_of (str): Day of the check, today (UTC) if None.
+        max_completion_lag_days (int): Allowed age of the last complete day.
+        max_metric_lag_days (int): Allowed delay of a metric behind its asset.
+        psi_threshold (float): PSI flagged as drift, 0.25 is the usual 'significant shift'.
+        mean_shift_threshold (float): Mean shift flagged as drift, in reference standard deviations.
+        min_live_rows (float): Effective live values needed before judging drift.
+        checks (List[str]): Checks to report, all of them if None.
+
+        Returns:
+        pd.DataFrame: One row per (asset, check) with columns asset, check, passed and detail.
+        """
+        if not self.entities:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        as_of_day = (pd.Timestamp.now(tz='UTC') if as_of is None else pd.Timestamp(as_of, tz='UTC')).floor('D')
+        index = pd.Index(self.entities, name=self.entity_column)
+
+        completed = self.arrays['completed_day']
+        completion_lag = (as_of_day.value - completed) // DAY_NS
+        has_completion = completed != MISSING_TIME
+        completion_passed = has_completion & (completion_lag <= max_completion_lag_days)
+        completion_detail = np.where(
+            has_completion,
+            [f"Last complete day is {lag} days old" for lag in completion_lag],
+            f"No {EOD_COMPLETION_COLUMN} published"
+        )
+        if not self.tracks_completion:
+            completion_passed = np.ones(len(self.entities), dtype=bool)
+            completion_detail = np.full(len(self.entities), '')
+
+        last_updated = self.arrays['last_updated']
+        updated = last_updated != MISSING_TIME
+        newest = np.where(updated, last_updated, MISSING_TIME).max(axis=1, initial=MISSING_TIME)
+        metric_lag = np.where(updated, (newest[:, None] - last_updated) // DAY_NS, np.inf)
+        stale = metric_lag > max_metric_lag_days
+
+        live_enough = self.effective_rows().to_numpy() >= min_live_rows
+        psi = self.psi().to_numpy()
+        shift = self.mean_shift().to_numpy()
+        drifted = live_enough & (psi - self.psi_noise().to_numpy() > psi_threshold)
+        shifted = live_enough & (np.abs(shift) > mean_shift_threshold)
+
+        def listing(flags: np.ndarray, values: Optional[np.ndarray] = None, label: str = '') -> List[str]:
+            details = []
+            for row in range(len(self.entities)):
+                columns = np.flatnonzero(flags[row])
+                if values is None:
+                    details.append(f"{label}{[self.metrics[col] for col in columns]}" if len(columns) else '')
+                else:
+                    details.append(", ".join(f"{self.metrics[col]}={values[row, col]:.2f}" for col in columns))
+            return details
+
+        all_checks = {
+            'eod_completion_fresh': (completion_passed, completion_detail),
+            'metrics_fresh': (~stale.any(axis=1), listing(stale, label='Stale metrics: ')),
+            'no_distribution_shift': (~drifted.any(axis=1), listing(drifted, psi)),
+            'no_mean_shift': (~shifted.any(axis=1), listing(shifted, shift)),
+        }
+        report = []
+        for check, (passed, detail) in all_checks.items():
+            if checks is not None and check not in checks:
+                continue
+            passed = np.asarray(passed, dtype=bool)
+            report.append(pd.DataFrame({
+                'asset': index.to_numpy(),
+                'check': check,
+                'passed': passed,
+                'detail': np.where(passed, '', np.asarray(detail, dtype=object)),
+            }))
+        report = pd.concat(report).sort_values(['asset'], kind='stable').reset_index(drop=True)
+        for row in report[~report['passed']].itertuples():
+            logging.info(f"{row.asset}: {row.check} failed: {row.detail}")
+        return report[REPORT_COLUMNS]
+
+    def save(self, path: str) -> None:
+        """
+        Persist the state to a .npz file.
+        """
+        np.savez(
+            path,
+            metrics=np.array(self.metrics, dtype=str),
+            entities=np.array(self.entities, dtype=str),
+            settings=np.array([self.n_bins, np.nan if self.halflife_days is None else self.halflife_days, self.lookback_days]),
+            columns=np.array([self.entity_column, self.time_column], dtype=str),
+            live_time=np.array(self.live_time),
+            tracks_completion=np.array(self.tracks_completion),
+            **self.arrays
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'DriftMonitor':
+        """
+        Load a state persisted with save.
+        """
+        with np.load(path) as saved:
+            n_bins, halflife_days, lookback_days = saved['settings'].tolist()
+            entity_column, time_column = saved['columns'].tolist()
+            monitor = cls(
+                saved['metrics'].tolist(), int(n_bins), None if np.isnan(halflife_days) else halflife_days,
+                int(lookback_days), entity_column, time_column
+            )
+            monitor.entities = saved['entities'].tolist()
+            monitor.arrays = {field: saved[field] for field in list(cls._FIELDS) + ['completed_day']}
+            monitor.live_time = int(saved['live_time'])
+            monitor.tracks_completion = bool(saved['tracks_completion'])
+        return monitor
+
+
+def update_monitor(
+    state_path: str,
+    data: pd.DataFrame,
+    metrics: Optional[List[str]] = None,
+    entity_column: str = 'asset',
+    time_column: str = 'time',
+    halflife_days: Optional[float] = 30.0,
+    **report_options
+) -> pd.DataFrame:
+    """
+    Daily step of the pipeline: load the monitor, fold the new rows, save it and report.
+
+    The first run, without a state file, takes the data as the training window.
+
+    Parameters:
+    state_path (str): .npz file of the monitor state.
+    data (pd.DataFrame): Rows with the entity, time and metric columns.
+    metrics (List[str]): Monitored columns, every numeric column if None.
+    entity_column (str): Column of the asset (or ticker).
+    time_column (str): Column of the UTC day.
+    halflife_days (float): Half-life of the live statistics of a new monitor.
+    **report_options: Options of DriftMonitor.report, e.g. checks or psi_threshold.
+
+    Returns:
+    pd.DataFrame: One row per (asset, check) with columns asset, check, passed and detail.
+    """
+    if os.path.exists(state_path):
+        monitor = DriftMonitor.load(state_path)
+        folded = monitor.update(data)
+    else:
+        metrics = metrics or monitored_metrics(data, entity_column, time_column)
+        monitor = DriftMonitor(metrics, halflife_days=halflife_days, entity_column=entity_column, time_column=time_column)
+        monitor.fit_reference(data)
+        folded = 0
+    directory = os.path.dirname(state_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    monitor.save(state_path)
+    logging.info(f"Monitor {os.path.basename(state_path)}: {folded} new values folded")
+    return monitor.report(**report_options)
+
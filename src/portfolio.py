@@ -0,0 +1,189 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src.backtest import to_matrix
+
+##########################################################################
+#######################    PORTFOLIO CONSTRUCTION   ######################
+##########################################################################
+# Same layout as src.backtest: arrays of shape (..., T, N) with T periods, N tickers and
+# any number of leading axes for variants (thresholds, search candidates, ...).
+# weights[..., t, n] is the position held over period t, sized with information
+# available at t (the rolling volatilities of src.preprocesing include the return of t),
+# so they go straight into run_backtest.
+
+
+def probability_scores(up_probability: np.ndarray) -> np.ndarray:
+    """
+    Directional score in [-1, 1] from the probability of an up move.
+
+    Equal to predict_proba(X).dot([-1, 1]) of the notebooks for a binary classifier.
+    """
+    return 2.0 * np.asarray(up_probability, dtype='float64') - 1.0
+
+
+def inverse_vol_weights(
+    scores: np.ndarray,
+    volatility: np.ndarray,
+    target_vol: float = 0.02,
+    vol_floor: float = 0.005
+) -> np.ndarray:
+    """
+    Scale every score by target_vol / volatility, so each position carries the same risk.
+
+    Parameters:
+    scores (np.ndarray): (..., T, N) directional scores, broadcast against volatility.
+    volatility (np.ndarray): (T, N) rolling volatility of the period returns, e.g. vol_20D.
+    target_vol (float): Volatility of a position with a score of 1.
+    vol_floor (float): Lower bound of the volatility, so quiet tickers do not get huge positions.
+
+    Returns:
+    np.ndarray: (..., T, N) weights, 0 where the score or the volatility is missing.
+    """
+    volatility = np.maximum(np.asarray(volatility, dtype='float64'), vol_floor)
+    weights = np.asarray(scores, dtype='float64') * (target_vol / volatility)
+    return np.nan_to_num(weights, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def apply_exposure_caps(
+    weights: np.ndarray,
+    max_position: Optional[float] = None,
+    max_gross: Optional[float] = None,
+    max_net: Optional[float] = None
+) -> np.ndarray:
+    """
+    Clip positions per ticker, cap the net exposure, then scale down to the gross cap.
+
+    The net cap shrinks only the side in excess (the longs when too long), leaving the
+    other side unchanged. The gross cap scales every position of the period by the same
+    factor, which cannot break the net cap.
+
+    Parameters:
+    weights (np.ndarray): (..., T, N) weights.
+    max_position (float): Maximum absolute weight per ticker.
+    max_gross (float): Maximum sum of absolute weights per period.
+    max_net (float): Maximum absolute sum of weights per period.
+
+    Returns:
+    np.ndarray: (..., T, N) weights within the caps.
+    """
+    weights = np.nan_to_num(np.asarray(weights, dtype='float64'))
+    if max_position is not None:
+        weights = np.clip(weights, -max_position, max_position)
+    if max_net is None and max_gross is None:
+        return weights
+
+    # Both caps come down to one scale for the longs and one for the shorts of every period
+    longs = np.maximum(weights, 0.0).sum(axis=-1, keepdims=True)
+    shorts = longs - weights.sum(axis=-1, keepdims=True)
+    long_scale = np.ones_like(longs)
+    short_scale = np.ones_like(shorts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if max_net is not None:
+            long_scale = np.where(longs - shorts > max_net, (shorts + max_net) / longs, 1.0)
+            short_scale = np.where(shorts - longs > max_net, (longs + max_net) / shorts, 1.0)
+        if max_gross is not None:
+            gross = longs * long_scale + shorts * short_scale
+            gross_scale = np.where(gross > max_gross, max_gross / gross, 1.0)
+            long_scale = long_scale * gross_scale
+            short_scale = short_scale * gross_scale
+    return weights * np.where(weights > 0, long_scale, short_scale)
+
+
+def limit_turnover(
+    weights: np.ndarray,
+    max_turnover: float,
+    initial: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Move from the held positions towards the target weights by at most max_turnover per period.
+
+    When the trades towards the target add up to more than max_turnover, all of them
+    are scaled by the same factor. The held positions then lie between the previous
+    positions and the target, so they respect any gross, net or position cap both satisfy.
+    The positions depend on the previous period, so this loops over time; every step is
+    vectorized over the tickers and the leading variant axes.
+
+    Parameters:
+    weights (np.ndarray): (..., T, N) target weights.
+    max_turnover (float): Maximum sum of absolute trades per period.
+    initial (np.ndarray): (..., N) positions held before the first period (default is flat).
+
+    Returns:
+    np.ndarray: (..., T, N) held positions.
+    """
+    targets = np.nan_to_num(np.asarray(weights, dtype='float64'))
+    positions = np.empty_like(targets)
+    held = np.zeros_like(targets[..., 0, :]) if initial is None else np.broadcast_to(initial, targets[..., 0, :].shape).astype('float64')
+    for t in range(targets.shape[-2]):
+        trade = targets[..., t, :] - held
+        turnover = np.abs(trade).sum(axis=-1, keepdims=True)
+        held = held + trade * np.minimum(1.0, max_turnover / np.where(turnover > 0, turnover, 1.0))
+        positions[..., t, :] = held
+    return positions
+
+
+def build_portfolio(
+    scores: np.ndarray,
+    volatility: np.ndarray,
+    target_vol: float = 0.02,
+    vol_floor: float = 0.005,
+    max_position: Optional[float] = None,
+    max_gross: Optional[float] = 1.0,
+    max_net: Optional[float] = None,
+    max_turnover: Optional[float] = None,
+    initial: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Position weights of the whole universe from model scores and rolling volatilities.
+
+    Inverse-volatility sizing, then the position, net and gross caps, then the turnover limit.
+
+    Parameters:
+    scores (np.ndarray): (..., T, N) directional scores in [-1, 1], see probability_scores.
+    volatility (np.ndarray): (T, N) rolling volatility, e.g. the vol_20D feature.
+    target_vol (float): Volatility of a position with a score of 1.
+    vol_floor (float): Lower bound of the volatility.
+    max_position (float): Maximum absolute weight per ticker.
+    max_gross (float): Maximum sum of absolute weights per period.
+    max_net (float): Maximum absolute sum of weights per period.
+    max_turnover (float): Maximum sum of absolute trades per period, no limit if None.
+    initial (np.ndarray): (..., N) positions held before the first period.
+
+    Returns:
+    np.ndarray: (..., T, N) weights, ready for src.backtest.run_backtest.
+    """
+    weights = inverse_vol_weights(scores, volatility, target_vol, vol_floor)
+    weights = apply_exposure_caps(weights, max_position, max_gross, max_net)
+    if max_turnover is not None:
+        weights = limit_turnover(weights, max_turnover, initial)
+    return weights
+
+
+def portfolio_weights(
+    up_probability: pd.Series,
+    features: pd.DataFrame,
+    vol_column: str = 'vol_20D',
+    **limits
+) -> pd.DataFrame:
+    """
+    (time x ticker) weights from the long model output and the preprocessing features.
+
+    Parameters:
+    up_probability (pd.Series): Probability of an up move indexed by (time, ticker),
+        e.g. predict_proba(X)[:, 1] on the rows of the features.
+    features (pd.DataFrame): Output of FeatureEngine.compute, indexed by (time, ticker).
+    vol_column (str): Rolling volatility feature used for sizing.
+    **limits: target_vol, vol_floor, max_position, max_gross, max_net, max_turnover of build_portfolio.
+
+    Returns:
+    pd.DataFrame: Weights indexed by time with one column per ticker, 0 where there is no prediction.
+    """
+    scores = to_matrix(up_probability)
+    volatility = to_matrix(features[vol_column]).reindex(index=scores.index, columns=scores.columns)
+    weights = build_portfolio(
+        probability_scores(scores.to_numpy(dtype='float64')), volatility.to_numpy(dtype='float64'), **limits
+    )
+    return pd.DataFrame(weights, index=scores.index, columns=scores.columns)
@@ -1,34 +1,44 @@
 import pandas as pd
-import pickle
 
-def load_models(model_paths):
+from src.instrumentation import argument_rows, timed
+from src.model_store import load_any_model
+
+def load_models(model_paths, mmap_mode='r'):
     """
-    Load models from pickle files.
+    Load models from model directories (src.model_store) or legacy pickle files.
 
     Parameters:
-    model_paths (List[str]): List of file paths for the pickle files.
+    model_paths (List[str]): List of model directories or pickle file paths.
+    mmap_mode (str): Memory-map the arrays of model directories ('r'), None to copy them.
 
     Returns:
-    List[object]: List of loaded models.
+    List[Tuple[object, np.ndarray, np.ndarray]]: List of loaded models with the scaler mean
+    and scale they were trained with, None for models stored without them.
     """
     loaded_models = []
     for model_path in model_paths:
-        with open(model_path, 'rb') as file:
-            loaded_models.append(pickle.load(file))
+        loaded_models.append(load_any_model(model_path, mmap_mode))
     return loaded_models
 
+@timed(rows=argument_rows(1))
 def make_predictions(models, data):
     """
     Make predictions using loaded models and input data.
 
+    The features of models stored with a scaler are standardized with its mean and scale,
+    as they were during training.
+
     Parameters:
-    models (List[object]): List of loaded models.
+    models (List[Tuple[object, np.ndarray, np.ndarray]]): Loaded models from load_models.
     data (pd.DataFrame): Input data for prediction.
 
     Returns:
     List[pd.Series]: List of prediction results.
     """
-    predictions = [model.predict(data) for model in models]
+    predictions = []
+    for model, scaler_mean, scaler_scale in models:
+        features = data if scaler_mean is None else (data.to_numpy(dtype='float64') - scaler_mean) / scaler_scale
+        predictions.append(model.predict(features))
     return predictions
 
 def main():
@@ -46,11 +56,14 @@ def main():
     # Make predictions
     predictions = make_predictions(models, data)
 
-    # Create a DataFrame with predictions
-    predictions_df = pd.DataFrame({"Model": [f"Model {i+1}" for i in range(len(models))], "Prediction": predictions})
+    # Create a DataFrame with one prediction column per model, aligned on the input rows
+    predictions_df = pd.DataFrame(
+        {f"Model {i+1}": prediction for i, prediction in enumerate(predictions)},
+        index=data.index
+    )
 
     # Save predictions to a CSV file
-    predictions_df.to_csv(output_path, index=False)
+    predictions_df.to_csv(output_path)
     print(f"Predictions saved to {output_path}")
     return predictions_df
 
@@ -0,0 +1,276 @@
+import argparse
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.config import configure_logger
+from src.instrumentation import argument_rows, timed
+from src.model_store import MANIFEST_FILE, file_sha256, is_stored_model, load_any_model, read_manifest
+
+##########################################################################
+#########################    MODEL REGISTRY   ############################
+##########################################################################
+class LoadedModel:
+    """
+    A model held by the registry with the scaler statistics it was trained with, if any.
+
+    Parameters:
+    model (object): Fitted estimator.
+    scaler_mean (np.ndarray): Mean subtracted from the features, None if not stored with the model.
+    scaler_scale (np.ndarray): Scale dividing the features, None if not stored with the model.
+    signature (Tuple): File signature the model was loaded from.
+    """
+
+    def __init__(self, model, scaler_mean=None, scaler_scale=None, signature: Tuple = ()):
+        self.model = model
+        self.scaler_mean = scaler_mean
+        self.scaler_scale = scaler_scale
+        self.signature = signature
+
+
+class ModelRegistry:
+    """
+    In-memory registry of models, loaded lazily and kept warm between requests.
+
+    A model is reloaded when its file changes, detected by (mtime, size) or by the
+    SHA-256 of its content, and the least recently used model is evicted when more
+    than max_models are held.
+
+    Parameters:
+    max_models (int): Maximum number of models kept in memory.
+    validation (str): 'mtime' (cheap stat call) or 'hash' (content checksum; read from the
+        manifest for model directories, computed from the file for legacy pickles).
+    loader (Callable): Function loading (model, scaler_mean, scaler_scale) from a path.
+    """
+
+    def __init__(self, max_models: int = 8, validation: str = 'mtime', loader=load_any_model):
+        if validation not in ('mtime', 'hash'):
+            raise ValueError(f"Unknown validation '{validation}'")
+        self.max_models = max_models
+        self.validation = validation
+        self.loader = loader
+        self.models = OrderedDict()
+        self.lock = threading.Lock()
+        self.loads = 0
+
+    def signature(self, path: str) -> Tuple:
+        """
+        Signature of a model file, a different signature triggers a reload.
+        """
+        if is_stored_model(path):
+            if self.validation == 'hash':
+                return (read_manifest(path)['sha256'],)
+            # export_model rewrites the manifest last, after the model file
+            path = os.path.join(path, MANIFEST_FILE)
+        elif self.validation == 'hash':
+            return (file_sha256(path),)
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path: str) -> LoadedModel:
+        """
+        Return the model stored at path, loading it only if it is not held or has changed.
+
+        Parameters:
+        path (str): Model directory (src.model_store) or pickle file.
+
+        Returns:
+        LoadedModel: The warm model.
+        """
+        signature = self.signature(path)
+        with self.lock:
+            cached = self.models.get(path)
+            if cached is not None and cached.signature == signature:
+                self.models.move_to_end(path)
+                return cached
+
+        start = time.perf_counter()
+        model, scaler_mean, scaler_scale = self.loader(path)
+        loaded = LoadedModel(model, scaler_mean, scaler_scale, signature)
+        logging.info(f"Loaded {path} in {time.perf_counter() - start:.3f}s")
+
+        with self.lock:
+            self.loads += 1
+            self.models[path] = loaded
+            self.models.move_to_end(path)
+            while len(self.models) > self.max_models:
+                evicted, _ = self.models.popitem(last=False)
+                logging.info(f"Evicted {evicted}")
+        return loaded
+
+    def loaded_paths(self) -> List[str]:
+        with self.lock:
+            return list(self.models)
+
+
+##########################################################################
+#######################    BATCHED PREDICTIONS   #########################
+##########################################################################
+class PredictionService:
+    """
+    Batched predictions of several models on one shared, pre-scaled feature array.
+
+    The frame is converted to a float64 NumPy array once. Models sharing the same scaler
+    statistics (or the service-wide scaler) get the same scaled array, so the scaling is
+    done once per distinct scaler instead of once per model.
+
+    Parameters:
+    model_paths (Dict[str, str]): Model name to model directory or pickle file.
+    registry (ModelRegistry): Registry holding the warm models.
+    scaler_path (str): Pickled fitted scaler applied to models stored without scaler statistics.
+    feature_columns (List[str]): Columns of the input frame, in training order (default is all columns).
+    """
+
+    def __init__(
+        self,
+        model_paths: Dict[str, str],
+        registry: Optional[ModelRegistry] = None,
+        scaler_path: Optional[str] = None,
+        feature_columns: Optional[List[str]] = None
+    ):
+        self.model_paths = model_paths
+        self.registry = registry or ModelRegistry(max_models=max(8, len(model_paths)))
+        self.feature_columns = feature_columns
+        self.scaler_mean = None
+        self.scaler_scale = None
+        if scaler_path is not None:
+            with open(scaler_path, 'rb') as file:
+                scaler = pickle.load(file)
+            self.scaler_mean, self.scaler_scale = scaler.mean_, scaler.scale_
+
+    def warm_up(self) -> None:
+        """
+        Load every model ahead of the first request.
+        """
+        for path in self.model_paths.values():
+            self.registry.get(path)
+
+    @timed(rows=argument_rows(1))
+    def predict(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        Run every model on the frame.
+
+        Parameters:
+        frame (pd.DataFrame): Features, one row per (time, asset).
+
+        Returns:
+        pd.DataFrame: Indexed like frame, with '{model}' predictions and, for classifiers,
+        '{model}_proba' probabilities of the last class.
+        """
+        features = frame if self.feature_columns is None else frame[self.feature_columns]
+        values = features.to_numpy(dtype='float64')
+
+        scaled = {}
+        predictions = {}
+        for name, path in self.model_paths.items():
+            loaded = self.registry.get(path)
+            mean, scale = loaded.scaler_mean, loaded.scaler_scale
+            if mean is None:
+                mean, scale = self.scaler_mean, self.scaler_scale
+            # Models of the same fold loaded separately hold equal statistics in distinct arrays
+            key = None if mean is None else (np.asarray(mean).tobytes(), np.asarray(scale).tobytes())
+            if key not in scaled:
+                scaled[key] = values if mean is None else (values - mean) / scale
+            X = scaled[key]
+
+            predictions[name] = loaded.model.predict(X)
+            if hasattr(loaded.model, 'predict_proba'):
+                predictions[f"{name}_proba"] = loaded.model.predict_proba(X)[:, -1]
+        return pd.DataFrame(predictions, index=frame.index)
+
+
+##########################################################################
+#########################    HTTP STAND-IN   #############################
+##########################################################################
+def make_handler(service: PredictionService):
+    """
+    Request handler class bound to a PredictionService.
+
+    POST /predict takes and returns a DataFrame in pandas 'split' JSON orientation
+    ({"columns": [...], "index": [...], "data": [[...], ...]}); GET /health lists the warm models.
+    """
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: str) -> None:
+            body = payload.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            if self.path != '/health':
+                self._send_json(404, json.dumps({'error': 'not found'}))
+                return
+            self._send_json(200, json.dumps({'models': service.registry.loaded_paths()}))
+
+        def do_POST(self) -> None:
+            if self.path != '/predict':
+                self._send_json(404, json.dumps({'error': 'not found'}))
+                return
+            start = time.perf_counter()
+            try:
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                payload = json.loads(body)
+                frame = pd.DataFrame(payload['data'], columns=payload['columns'], index=payload.get('index'))
+                predictions = service.predict(frame)
+            except Exception as e:
+                logging.error(f"Prediction failed: {e}")
+                self._send_json(400, json.dumps({'error': str(e)}))
+                return
+            self._send_json(200, predictions.to_json(orient='split'))
+            logging.info(f"{len(frame)} rows predicted in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        def log_message(self, format, *args) -> None:
+            # Requests are already logged by do_POST
+            pass
+
+    return PredictionHandler
+
+
+def serve(service: PredictionService, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Build the local prediction server, call serve_forever() on the result to run it.
+
+    Parameters:
+    service (PredictionService): The service answering the requests.
+    host (str): Interface to bind.
+    port (int): Port to bind, 0 picks a free one.
+
+    Returns:
+    ThreadingHTTPServer: The bound server.
+    """
+    return ThreadingHTTPServer((host, port), make_handler(service))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Long-lived batched prediction server.")
+    parser.add_argument('--model', action='append', required=True, help="name=path of a model file, repeatable")
+    parser.add_argument('--scaler', default=None, help="Pickled fitted scaler for models stored without one")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-models', type=int, default=8)
+    parser.add_argument('--validation', choices=['mtime', 'hash'], default='mtime')
+    args = parser.parse_args(argv)
+
+    configure_logger()
+    model_paths = dict(model.split('=', 1) for model in args.model)
+    service = PredictionService(model_paths, ModelRegistry(args.max_models, args.validation), args.scaler)
+    service.warm_up()
+    server = serve(service, args.host, args.port)
+    logging.info(f"Serving {list(model_paths)} on http://{args.host}:{server.server_port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
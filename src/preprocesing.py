@@ -1,5 +1,11 @@
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
 import pandas as pd
 
+from src.instrumentation import input_rows, result_rows, timed
+
+@timed(rows=input_rows)
 def preprocessing(data):
     """
     Perform preprocessing on financial data.
@@ -22,3 +28,377 @@ def preprocessing(data):
 # Assuming you have a DataFrame called 'financial_data'
 # preprocessed_data = preprocessing(financial_data)
 # print(preprocessed_data)
+
+##########################################################################
+####################    MULTI-ASSET FEATURE ENGINE   #####################
+##########################################################################
+# Features are declared as dicts. Supported kinds:
+#   {'kind': 'returns'}                                  -> 'returns'
+#   {'kind': 'target'}                                   -> 'target', next period return
+#   {'kind': 'volatility', 'window': 20}                 -> 'vol_20D'
+#   {'kind': 'zscore', 'window': 20}                     -> 'zscore_20D', (return - rolling mean) / rolling std
+#   {'kind': 'ratio', 'numerator': 'CapMrktCurUSD',
+#    'denominator': 'CapRealUSD', 'lag': 1}              -> 'CapMrktCurUSD_CapRealUSD_lag1'
+#   {'kind': 'metric', 'metric': 'AdrActCnt', 'lag': 1}  -> 'AdrActCnt_lag1'
+# An optional 'name' key overrides the column name.
+DEFAULT_FEATURES = [
+    {'kind': 'returns'},
+    {'kind': 'volatility', 'window': 10},
+    {'kind': 'volatility', 'window': 20},
+    {'kind': 'volatility', 'window': 60},
+    {'kind': 'zscore', 'window': 20},
+    {'kind': 'target'},
+]
+# Lagged valuation ratios, require the CoinMetrics matrices (see coinmetrics_to_wide)
+COINMETRICS_RATIO_FEATURES = [
+    {'kind': 'ratio', 'numerator': 'CapMrktCurUSD', 'denominator': 'CapRealUSD', 'lag': 1},
+    {'kind': 'ratio', 'numerator': 'FlowInExUSD', 'denominator': 'FlowOutExUSD', 'lag': 1},
+    {'kind': 'ratio', 'numerator': 'TxTfrValAdjUSD', 'denominator': 'CapMrktCurUSD', 'lag': 1},
+]
+
+
+def feature_name(feature: Dict) -> str:
+    """
+    Column name of a declared feature.
+    """
+    if 'name' in feature:
+        return feature['name']
+    kind = feature['kind']
+    if kind in ('returns', 'target'):
+        return kind
+    if kind == 'volatility':
+        return f"vol_{feature['window']}D"
+    if kind == 'zscore':
+        return f"zscore_{feature['window']}D"
+    if kind == 'ratio':
+        return f"{feature['numerator']}_{feature['denominator']}_lag{feature.get('lag', 1)}"
+    if kind == 'metric':
+        return f"{feature['metric']}_lag{feature.get('lag', 1)}"
+    raise ValueError(f"Unknown feature kind '{kind}'")
+
+
+def simple_returns(close: np.ndarray) -> np.ndarray:
+    """
+    Period-over-period returns of a (time x ticker) price matrix, NaN on the first row.
+
+    Missing prices are not forward filled, a return next to a missing price is NaN.
+    """
+    returns = np.full(close.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = close[1:] / close[:-1] - 1
+    return returns
+
+
+def shift_rows(values: np.ndarray, periods: int) -> np.ndarray:
+    """
+    Shift a (time x ticker) matrix by periods rows, filling with NaN like DataFrame.shift.
+    """
+    shifted = np.full(values.shape, np.nan)
+    if periods > 0:
+        shifted[periods:] = values[:-periods]
+    elif periods < 0:
+        shifted[:periods] = values[-periods:]
+    else:
+        shifted[:] = values
+    return shifted
+
+
+class RollingSums:
+    """
+    Prefix sums of a (time x ticker) matrix, shared by every rolling window.
+
+    The prefix sums of the values, of their squares and of the non-NaN counts are
+    computed once. Any window sum is then the difference of two prefix rows, so adding
+    a window costs O(time x ticker) without recomputing the sums, and the window
+    statistics are cached as well.
+
+    Parameters:
+    values (np.ndarray): (time x ticker) matrix, NaN for missing values.
+    """
+
+    def __init__(self, values: np.ndarray):
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        zeros = np.zeros((1, values.shape[1]))
+        self.prefix_sum = np.vstack([zeros, np.cumsum(filled, axis=0)])
+        self.prefix_sum_sq = np.vstack([zeros, np.cumsum(filled ** 2, axis=0)])
+        self.prefix_count = np.vstack([zeros, np.cumsum(valid, axis=0)])
+        self.cache = {}
+
+    def window(self, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Rolling sum, sum of squares and count over the last `window` rows.
+
+        Parameters:
+        window (int): Window length in rows.
+
+        Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Sum, sum of squares and count, each (time x ticker).
+        """
+        key = ('window', window)
+        if key not in self.cache:
+            n_rows = self.prefix_sum.shape[0] - 1
+            end = np.arange(1, n_rows + 1)
+            start = np.maximum(end - window, 0)
+            self.cache[key] = tuple(
+                prefix[end] - prefix[start]
+                for prefix in (self.prefix_sum, self.prefix_sum_sq, self.prefix_count)
+            )
+        return self.cache[key]
+
+    def mean(self, window: int) -> np.ndarray:
+        """
+        Rolling mean, NaN unless the window holds `window` non-NaN values (like rolling(window).mean()).
+        """
+        key = ('mean', window)
+        if key not in self.cache:
+            total, _, count = self.window(window)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.cache[key] = np.where(count >= window, total / count, np.nan)
+        return self.cache[key]
+
+    def std(self, window: int, ddof: int = 1) -> np.ndarray:
+        """
+        Rolling standard deviation, NaN unless the window is full (like rolling(window).std()).
+        """
+        key = ('std', window, ddof)
+        if key not in self.cache:
+            total, total_sq, count = self.window(window)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                variance = (total_sq - total ** 2 / count) / (count - ddof)
+            # Differences of prefix sums can leave tiny negative variances
+            variance = np.maximum(variance, 0.0)
+            self.cache[key] = np.where(count >= window, np.sqrt(variance), np.nan)
+        return self.cache[key]
+
+
+def coinmetrics_to_wide(
+    coinmetrics_data: pd.DataFrame,
+    metrics: List[str],
+    symbol_map: Dict[str, str],
+    index: pd.Index,
+    columns: pd.Index
+) -> Dict[str, np.ndarray]:
+    """
+    Pivot CoinMetrics metrics to (time x ticker) matrices aligned on a price matrix.
+
+    Parameters:
+    coinmetrics_data (pd.DataFrame): CoinMetrics data with 'asset', 'time' and metric columns.
+    metrics (List[str]): Metrics to pivot.
+    symbol_map (Dict[str, str]): CoinMetrics asset to Binance ticker, e.g. {'eth': 'ETHUSDT'}.
+    index (pd.Index): Dates of the price matrix (naive UTC days).
+    columns (pd.Index): Tickers of the price matrix.
+
+    Returns:
+    Dict[str, np.ndarray]: One float (time x ticker) matrix per metric, NaN where unavailable.
+    """
+    data = coinmetrics_data[coinmetrics_data['asset'].isin(symbol_map)]
+    data = data.assign(
+        ticker=data['asset'].map(symbol_map),
+        time=pd.to_datetime(data['time'], utc=True).dt.tz_localize(None).dt.floor('D')
+    )
+    wide = {}
+    for metric in metrics:
+        pivoted = data.pivot_table(index='time', columns='ticker', values=metric, aggfunc='last')
+        wide[metric] = pivoted.reindex(index=index, columns=columns).to_numpy(dtype='float64', na_value=np.nan)
+    return wide
+
+
+class FeatureEngine:
+    """
+    Compute declared features for every ticker at once on a wide (time x ticker) matrix.
+
+    Returns and their rolling prefix sums are computed once and reused by every
+    volatility and z-score window.
+
+    Parameters:
+    close (pd.DataFrame): (time x ticker) close prices, e.g.
+        binance_data.pivot_table(index='dateTime', columns='ticker', values='close').
+    coinmetrics (Dict[str, np.ndarray]): (time x ticker) CoinMetrics matrices aligned on close,
+        see coinmetrics_to_wide.
+    """
+
+    def __init__(self, close: pd.DataFrame, coinmetrics: Optional[Dict[str, np.ndarray]] = None):
+        self.index = close.index
+        self.columns = close.columns
+        self.close = close.to_numpy(dtype='float64', na_value=np.nan)
+        self.coinmetrics = coinmetrics or {}
+        self.returns = simple_returns(self.close)
+        self.rolling = RollingSums(self.returns)
+
+    def compute_feature(self, feature: Dict) -> np.ndarray:
+        """
+        (time x ticker) matrix of one declared feature.
+        """
+        kind = feature['kind']
+        if kind == 'returns':
+            return self.returns
+        if kind == 'target':
+            return shift_rows(self.returns, -1)
+        if kind == 'volatility':
+            return self.rolling.std(feature['window'])
+        if kind == 'zscore':
+            window = feature['window']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return (self.returns - self.rolling.mean(window)) / self.rolling.std(window)
+        if kind == 'ratio':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                ratio = self.coinmetrics[feature['numerator']] / self.coinmetrics[feature['denominator']]
+            return shift_rows(ratio, feature.get('lag', 1))
+        if kind == 'metric':
+            return shift_rows(self.coinmetrics[feature['metric']], feature.get('lag', 1))
+        raise ValueError(f"Unknown feature kind '{kind}'")
+
+    def compute_wide(self, features: List[Dict] = DEFAULT_FEATURES) -> Dict[str, np.ndarray]:
+        """
+        Compute every declared feature as a (time x ticker) matrix.
+
+        Parameters:
+        features (List[Dict]): Declared features.
+
+        Returns:
+        Dict[str, np.ndarray]: Feature name to (time x ticker) matrix.
+        """
+        return {feature_name(feature): self.compute_feature(feature) for feature in features}
+
+    @timed(rows=result_rows)
+    def compute(self, features: List[Dict] = DEFAULT_FEATURES, dropna_returns: bool = True) -> pd.DataFrame:
+        """
+        Compute every declared feature in the long (time, ticker) layout used for training.
+
+        Parameters:
+        features (List[Dict]): Declared features.
+        dropna_returns (bool): Drop rows without a return (first row, missing prices).
+
+        Returns:
+        pd.DataFrame: One row per (time, ticker) and one column per feature.
+        """
+        wide = self.compute_wide(features)
+        index = pd.MultiIndex.from_product([self.index, self.columns], names=[self.index.name or 'dateTime', 'ticker'])
+        long = pd.DataFrame({name: values.reshape(-1) for name, values in wide.items()}, index=index)
+        if dropna_returns:
+            long = long[~np.isnan(self.returns.reshape(-1))]
+        return long
+
+
+##########################################################################
+####################    INCREMENTAL (ONLINE) UPDATES   ###################
+##########################################################################
+class OnlineFeatureState:
+    """
+    Rolling state of the price features, updated one bar at a time.
+
+    Holds, for every ticker, the last close and a ring buffer of the last max(windows)
+    returns. A new bar costs O(window) per ticker: the window sums are recomputed from
+    the buffer rather than carried as running sums, so no floating-point drift builds
+    up across daily runs. The state is persisted between runs with save / load.
+
+    Parameters:
+    tickers (List[str]): Tickers followed by the state, new ones are added on the fly.
+    windows (Tuple[int, ...]): Rolling windows of the volatility and z-score features.
+    """
+
+    def __init__(self, tickers: List[str], windows: Tuple[int, ...] = (10, 20, 60)):
+        self.tickers = list(tickers)
+        self.windows = sorted(windows)
+        self.capacity = max(self.windows)
+        self.buffer = np.full((len(self.tickers), self.capacity), np.nan)
+        self.last_close = np.full(len(self.tickers), np.nan)
+        self.position = 0
+        self.last_time = None
+
+    def _add_tickers(self, tickers: List[str]) -> None:
+        new_tickers = [ticker for ticker in tickers if ticker not in set(self.tickers)]
+        if new_tickers:
+            self.tickers += new_tickers
+            self.buffer = np.vstack([self.buffer, np.full((len(new_tickers), self.capacity), np.nan)])
+            self.last_close = np.concatenate([self.last_close, np.full(len(new_tickers), np.nan)])
+
+    def update(self, time: pd.Timestamp, close: pd.Series) -> pd.DataFrame:
+        """
+        Fold one bar into the state and return its features.
+
+        Parameters:
+        time (pd.Timestamp): Open time of the bar, must be after the last bar seen.
+        close (pd.Series): Close price of the bar per ticker, tickers without a bar get NaN.
+
+        Returns:
+        pd.DataFrame: One row per ticker with 'returns', 'vol_{w}D' and 'zscore_{w}D' columns.
+
+        Raises:
+        ValueError: If the bar is not after the last bar seen.
+        """
+        if self.last_time is not None and pd.Timestamp(time) <= self.last_time:
+            raise ValueError(f"Bar {time} is not after the last bar {self.last_time}")
+        self._add_tickers(list(close.index))
+        prices = close.reindex(self.tickers).to_numpy(dtype='float64', na_value=np.nan)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = prices / self.last_close - 1
+        self.buffer[:, self.position] = returns
+        self.position = (self.position + 1) % self.capacity
+        self.last_close = prices
+        self.last_time = pd.Timestamp(time)
+
+        features = {'returns': returns}
+        for window in self.windows:
+            # Last `window` returns, most recent first
+            recent = self.buffer[:, (self.position - 1 - np.arange(window)) % self.capacity]
+            full = ~np.isnan(recent).any(axis=1)
+            mean = np.where(full, recent.mean(axis=1), np.nan)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                std = np.where(full, recent.std(axis=1, ddof=1), np.nan)
+                features[f"vol_{window}D"] = std
+                features[f"zscore_{window}D"] = (returns - mean) / std
+        return pd.DataFrame(features, index=pd.Index(self.tickers, name='ticker'))
+
+    @classmethod
+    def from_history(cls, close: pd.DataFrame, windows: Tuple[int, ...] = (10, 20, 60)) -> 'OnlineFeatureState':
+        """
+        Build the state from a (time x ticker) close history, e.g. on the first run.
+
+        Parameters:
+        close (pd.DataFrame): (time x ticker) close prices.
+        windows (Tuple[int, ...]): Rolling windows of the volatility and z-score features.
+
+        Returns:
+        OnlineFeatureState: The state after the last row of close.
+        """
+        state = cls(list(close.columns), windows)
+        values = close.to_numpy(dtype='float64', na_value=np.nan)
+        returns = simple_returns(values)[-state.capacity:]
+        # Lay the last returns out in ring order, oldest first
+        state.buffer[:, :len(returns)] = returns.T
+        state.position = len(returns) % state.capacity
+        state.last_close = values[-1] if len(values) else state.last_close
+        state.last_time = pd.Timestamp(close.index[-1]) if len(close) else None
+        return state
+
+    def save(self, path: str) -> None:
+        """
+        Persist the state to a .npz file.
+        """
+        np.savez(
+            path,
+            tickers=np.array(self.tickers, dtype=str),
+            windows=np.array(self.windows),
+            buffer=self.buffer,
+            last_close=self.last_close,
+            position=self.position,
+            last_time=np.array('' if self.last_time is None else self.last_time.isoformat())
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'OnlineFeatureState':
+        """
+        Load a state persisted with save.
+        """
+        with np.load(path) as saved:
+            state = cls(saved['tickers'].tolist(), saved['windows'].tolist())
+            state.buffer = saved['buffer']
+            state.last_close = saved['last_close']
+            state.position = int(saved['position'])
+            last_time = str(saved['last_time'])
+        state.last_time = pd.Timestamp(last_time) if last_time else None
+        return state
+
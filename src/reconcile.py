@@ -0,0 +1,422 @@
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Iterator, List, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from src.config import configure_logger, get_metrics_names
+
+# Default paths do not depend on the working directory the module is run from
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = REPO_ROOT / 'data'
+
+##########################################################################
+##################    DUMP VS API RECONCILIATION   #######################
+##########################################################################
+# Metrics published as timestamps rather than numbers, compared for equality
+NON_NUMERIC_METRICS = ['AssetEODCompletionTime']
+
+
+def metric_column_types(metrics: List[str]) -> Dict[str, pa.DataType]:
+    """
+    Explicit Arrow types of the metric columns, so that the CSV reader never infers them.
+
+    Parameters:
+    metrics (List[str]): Metric names, as read from data/static/metrics.txt.
+
+    Returns:
+    Dict[str, pa.DataType]: Arrow type of every metric and of the 'asset' and 'time' columns.
+    """
+    column_types = {metric: pa.float64() for metric in metrics}
+    for metric in NON_NUMERIC_METRICS:
+        if metric in column_types:
+            column_types[metric] = pa.string()
+    column_types['asset'] = pa.string()
+    column_types['time'] = pa.string()
+    return column_types
+
+
+def _metrics_csv_options(metrics: List[str]) -> pv.ConvertOptions:
+    return pv.ConvertOptions(
+        column_types=metric_column_types(metrics),
+        include_columns=['asset', 'time'] + metrics,
+        include_missing_columns=True
+    )
+
+
+def _normalize_keys(table: pa.Table, asset: Optional[str]) -> pa.Table:
+    """
+    UTC day in 'time' and, for files without an 'asset' column, the given asset ('' if None).
+    """
+    # Dumps use '2015-07-30', API exports '2015-07-30 00:00:00+00:00': align both on the UTC day
+    days = pd.to_datetime(table.column('time').to_pandas(), utc=True, format='mixed').dt.floor('D')
+    table = table.set_column(table.schema.get_field_index('time'), 'time', pa.array(days))
+    if table.column('asset').null_count == len(table):
+        table = table.set_column(table.schema.get_field_index('asset'), 'asset', pa.array([asset or ''] * len(table), pa.string()))
+    return table
+
+
+def read_metrics_csv(file_path: str, metrics: List[str], asset: Optional[str] = None) -> pa.Table:
+    """
+    Read a CoinMetrics CSV (API export or community dump) with pyarrow and explicit types.
+
+    Parameters:
+    file_path (str): Path of the CSV file.
+    metrics (List[str]): Metrics to read, missing ones come back as null columns.
+    asset (str): Asset name used when the file has no 'asset' column (community dumps).
+
+    Returns:
+    pa.Table: Table with 'asset', 'time' (UTC day) and one column per metric.
+    """
+    return _normalize_keys(pv.read_csv(file_path, convert_options=_metrics_csv_options(metrics)), asset)
+
+
+def iter_metrics_csv(
+    file_path: str,
+    metrics: List[str],
+    asset: Optional[str] = None,
+    block_size: int = 1 << 24
+) -> Iterator[pa.Table]:
+    """
+    Read a CoinMetrics CSV batch by batch, like read_metrics_csv.
+
+    Parameters:
+    file_path (str): Path of the CSV file.
+    metrics (List[str]): Metrics to read, missing ones come back as null columns.
+    asset (str): Asset name used when the file has no 'asset' column (community dumps).
+    block_size (int): Bytes of CSV parsed per batch.
+
+    Yields:
+    pa.Table: Consecutive rows with 'asset', 'time' (UTC day) and one column per metric.
+    """
+    reader = pv.open_csv(
+        file_path, read_options=pv.ReadOptions(block_size=block_size), convert_options=_metrics_csv_options(metrics)
+    )
+    for batch in reader:
+        if batch.num_rows:
+            yield _normalize_keys(pa.Table.from_batches([batch]), asset)
+
+
+def _keys(table: pa.Table) -> pd.MultiIndex:
+    return pd.MultiIndex.from_frame(table.select(['asset', 'time']).to_pandas())
+
+
+def _rows_before(table: pa.Table, key: Tuple[str, pd.Timestamp]) -> int:
+    """
+    Number of rows of a table sorted by (asset, time) whose key is before key.
+    """
+    keys = table.select(['asset', 'time']).to_pandas()
+    return int(((keys['asset'] < key[0]) | ((keys['asset'] == key[0]) & (keys['time'] < key[1]))).sum())
+
+
+def iter_key_windows(left: Iterator[pa.Table], right: Iterator[pa.Table]) -> Iterator[Tuple[pa.Table, pa.Table]]:
+    """
+    Merge two streams of tables sorted by (asset, time) into windows of the same keys.
+
+    The stream that is behind is read first, and the rows of both streams before the
+    last key read on each side are released together, so only a couple of batches per
+    side are held at a time.
+
+    Parameters:
+    left (Iterator[pa.Table]): Batches sorted by (asset, time), e.g. iter_metrics_csv.
+    right (Iterator[pa.Table]): Batches sorted by (asset, time), with the schema of left.
+
+    Yields:
+    Tuple[pa.Table, pa.Table]: Rows of both streams in the same (asset, time) range.
+
+    Raises:
+    ValueError: If a stream is not sorted by (asset, time).
+    """
+    streams = [left, right]
+    held = [None, None]
+    last = [None, None]
+    done = [False, False]
+    while not all(done):
+        side = min((i for i in (0, 1) if not done[i]), key=lambda i: (last[i] is not None, last[i] or ()))
+        batch = next(streams[side], None)
+        if batch is None:
+            done[side] = True
+            continue
+        keys = _keys(batch)
+        if not keys.is_monotonic_increasing or (last[side] is not None and keys[0] < last[side]):
+            raise ValueError("Reconciled files must be sorted by asset and time")
+        held[side] = batch if held[side] is None else pa.concat_tables([held[side], batch])
+        last[side] = keys[-1]
+
+        # Rows before the last key read on every open stream cannot appear later on either side
+        open_last = [last[i] for i in (0, 1) if not done[i]]
+        if None in open_last:
+            continue
+        watermark = min(open_last)
+        window = []
+        for i in (0, 1):
+            if held[i] is None:
+                window.append(batch.schema.empty_table())
+                continue
+            position = _rows_before(held[i], watermark)
+            window.append(held[i].slice(0, position))
+            held[i] = held[i].slice(position)
+        if len(window[0]) or len(window[1]):
+            yield tuple(window)
+
+    if held[0] is not None or held[1] is not None:
+        schema = (held[0] if held[0] is not None else held[1]).schema
+        yield tuple(table if table is not None else schema.empty_table() for table in held)
+
+
+def align_keys(left: pa.Table, right: pa.Table) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """
+    Outer-join the (asset, time) keys of two tables.
+
+    Parameters:
+    left (pa.Table): First table.
+    right (pa.Table): Second table.
+
+    Returns:
+    Tuple[pd.DataFrame, np.ndarray, np.ndarray]: The joined keys and, for every joined row,
+    its row position in left and in right (-1 when the row is missing on that side).
+    """
+    left_keys = left.select(['asset', 'time']).to_pandas()
+    right_keys = right.select(['asset', 'time']).to_pandas()
+    left_keys['left_position'] = np.arange(len(left_keys))
+    right_keys['right_position'] = np.arange(len(right_keys))
+    keys = left_keys.merge(right_keys, how='outer', on=['asset', 'time'], sort=True)
+    left_position = keys.pop('left_position').fillna(-1).astype('int64').to_numpy()
+    right_position = keys.pop('right_position').fillna(-1).astype('int64').to_numpy()
+    return keys, left_position, right_position
+
+
+def _take(table: pa.Table, metric: str, positions: np.ndarray) -> np.ndarray:
+    """
+    Values of one column at the given positions, NaN (or None) where the position is -1.
+    """
+    column = table.column(metric)
+    if len(column) == 0:
+        # A window can hold rows of one file only
+        taken = pa.nulls(len(positions), column.type)
+    else:
+        taken = column.take(pa.array(np.where(positions >= 0, positions, 0)))
+    if pa.types.is_floating(column.type):
+        values = taken.to_numpy(zero_copy_only=False).astype('float64')
+        values[positions < 0] = np.nan
+    else:
+        values = np.array(taken.to_pylist(), dtype=object)
+        values[positions < 0] = None
+    return values
+
+
+def compare_metric(
+    left: np.ndarray,
+    right: np.ndarray,
+    rtol: Union[float, np.ndarray],
+    atol: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Element-wise comparison of a (rows x metrics) block from both sources.
+
+    Two missing values match, a value missing on one side only is a mismatch, and two
+    numbers match when |left - right| <= atol + rtol * |right|.
+
+    Parameters:
+    left (np.ndarray): Values of the first source.
+    right (np.ndarray): Values of the second source.
+    rtol (Union[float, np.ndarray]): Relative tolerance, or one tolerance per metric column.
+    atol (float): Absolute tolerance.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray, np.ndarray]: Mismatch mask, mask of values present on
+    one side only, and absolute differences (NaN where not comparable).
+    """
+    if left.dtype == object:
+        left_missing = pd.isna(left)
+        right_missing = pd.isna(right)
+        mismatch = (left_missing != right_missing) | (~left_missing & ~right_missing & (left != right))
+        return mismatch, left_missing != right_missing, np.full(left.shape, np.nan)
+    left_missing = np.isnan(left)
+    right_missing = np.isnan(right)
+    one_sided = left_missing != right_missing
+    abs_diff = np.abs(left - right)
+    with np.errstate(invalid='ignore'):
+        mismatch = one_sided | (abs_diff > atol + rtol * np.abs(right))
+    return mismatch, one_sided, abs_diff
+
+
+def _compare_window(
+    dump: pa.Table,
+    api: pa.Table,
+    metrics: List[str],
+    rtol: float,
+    atol: float,
+    tolerances: Dict[str, float],
+    metrics_per_chunk: int,
+    end_date: Optional[str]
+) -> Tuple[List[Dict], pd.DataFrame]:
+    """
+    Per-metric and per-date statistics of one window of rows of both files.
+    """
+    keys, dump_position, api_position = align_keys(dump, api)
+    if end_date is not None:
+        keep = (keys['time'] < pd.Timestamp(end_date, tz='UTC')).to_numpy()
+        keys, dump_position, api_position = keys[keep].reset_index(drop=True), dump_position[keep], api_position[keep]
+    both_present = (dump_position >= 0) & (api_position >= 0)
+
+    per_metric = []
+    mismatches_per_row = np.zeros(len(keys), dtype='int64')
+    for start in range(0, len(metrics), metrics_per_chunk):
+        chunk = metrics[start:start + metrics_per_chunk]
+        # Numeric metrics are compared as one block, timestamp metrics one at a time
+        numeric = [metric for metric in chunk if metric not in NON_NUMERIC_METRICS]
+        block_groups = ([numeric] if numeric else []) + [[m] for m in chunk if m in NON_NUMERIC_METRICS]
+        blocks = [
+            (
+                group,
+                np.column_stack([_take(dump, metric, dump_position) for metric in group]),
+                np.column_stack([_take(api, metric, api_position) for metric in group])
+            )
+            for group in block_groups
+        ]
+        for block_metrics, dump_values, api_values in blocks:
+            block_rtol = np.array([tolerances.get(metric, rtol) for metric in block_metrics])
+            mismatch, one_sided, abs_diff = compare_metric(dump_values, api_values, block_rtol, atol)
+            # Rows absent from one file are reported per date, not as metric mismatches
+            mismatch &= both_present[:, None]
+            one_sided &= both_present[:, None]
+            compared = both_present[:, None] & ~pd.isna(dump_values) & ~pd.isna(api_values)
+            mismatches_per_row += mismatch.sum(axis=1)
+            max_abs_diff = np.nanmax(np.where(compared, abs_diff, np.nan), axis=0, initial=-np.inf)
+            for k, metric in enumerate(block_metrics):
+                per_metric.append({
+                    'metric': metric,
+                    'compared': int(compared[:, k].sum()),
+                    'mismatches': int(mismatch[:, k].sum()),
+                    'missing_on_one_side': int(one_sided[:, k].sum()),
+                    'max_abs_diff': max_abs_diff[k] if np.isfinite(max_abs_diff[k]) else np.nan,
+                    'first_mismatch': keys['time'][mismatch[:, k]].min() if mismatch[:, k].any() else pd.NaT,
+                })
+
+    per_date = keys.assign(
+        in_dump=dump_position >= 0,
+        in_api=api_position >= 0,
+        mismatching_metrics=mismatches_per_row
+    )
+    return per_metric, per_date
+
+
+def reconcile_metrics(
+    dump_path: str,
+    api_path: str,
+    file_path_metrics: str = str(DATA_DIR / 'static' / 'metrics.txt'),
+    asset: Optional[str] = None,
+    rtol: float = 1e-9,
+    atol: float = 0.0,
+    tolerances: Optional[Dict[str, float]] = None,
+    metrics_per_chunk: int = 16,
+    end_date: Optional[str] = None,
+    block_size: int = 1 << 24
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Compare a CoinMetrics community dump with an API export, aligned on (asset, time).
+
+    Both CSVs are streamed with pyarrow and explicit types, and compared window by
+    window over the same (asset, time) range, so memory is bounded by a few CSV blocks
+    and not by the length of the history. Within a window the metrics are compared
+    chunk by chunk as (rows x metrics_per_chunk) NumPy blocks. Both files must be sorted
+    by asset and time, as the dumps and get_coinmetrics_data exports are.
+
+    Parameters:
+    dump_path (str): Path of the community dump CSV.
+    api_path (str): Path of the API export CSV.
+    file_path_metrics (str): Path of the metric names file.
+    asset (str): Asset name used for files without an 'asset' column.
+    rtol (float): Default relative tolerance.
+    atol (float): Default absolute tolerance.
+    tolerances (Dict[str, float]): Relative tolerance overrides per metric.
+    metrics_per_chunk (int): Number of metrics compared at a time.
+    end_date (str): Ignore days on or after this date (the dump's last day is usually partial).
+    block_size (int): Bytes of CSV parsed at a time from each file.
+
+    Returns:
+    Tuple[pd.DataFrame, pd.DataFrame]: Per-metric statistics, and per-date statistics
+    (number of mismatching metrics and whether the row exists on each side).
+    """
+    tolerances = tolerances or {}
+    metrics = get_metrics_names(file_path_metrics)
+    windows = iter_key_windows(
+        iter_metrics_csv(dump_path, metrics, asset, block_size), iter_metrics_csv(api_path, metrics, asset, block_size)
+    )
+    per_metric, per_date = [], []
+    for dump, api in windows:
+        window_metrics, window_dates = _compare_window(
+            dump, api, metrics, rtol, atol, tolerances, metrics_per_chunk, end_date
+        )
+        per_metric.extend(window_metrics)
+        per_date.append(window_dates)
+        if len(window_dates):
+            logging.info(f"Compared {window_dates['asset'].iloc[-1]} up to {window_dates['time'].iloc[-1]:%Y-%m-%d}")
+
+    if not per_date:
+        # Both files are empty, every metric is reported as not compared
+        empty = read_metrics_csv(dump_path, metrics, asset)
+        per_metric, per_date = _compare_window(empty, empty, metrics, rtol, atol, tolerances, metrics_per_chunk, end_date)
+        return pd.DataFrame(per_metric), per_date
+    per_metric = pd.DataFrame(per_metric).groupby('metric', sort=False).agg(
+        compared=('compared', 'sum'),
+        mismatches=('mismatches', 'sum'),
+        missing_on_one_side=('missing_on_one_side', 'sum'),
+        max_abs_diff=('max_abs_diff', 'max'),
+        first_mismatch=('first_mismatch', 'min'),
+    ).reset_index()
+    return per_metric, pd.concat(per_date, ignore_index=True)
+
+
+def parse_tolerances(values: List[str]) -> Dict[str, float]:
+    """
+    Parse 'Metric=tolerance' command line values.
+    """
+    tolerances = {}
+    for value in values:
+        metric, tolerance = value.split('=')
+        tolerances[metric] = float(tolerance)
+    return tolerances
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Reconcile a CoinMetrics dump CSV with an API export CSV.")
+    parser.add_argument('dump_path', help="Community dump CSV, e.g. data/dynamic/eth_dump.csv")
+    parser.add_argument('api_path', help="API export CSV, e.g. data/dynamic/eth_coinmetrics_20150730_20240121.csv")
+    parser.add_argument('--metrics', default=str(DATA_DIR / 'static' / 'metrics.txt'), help="Metric names file")
+    parser.add_argument('--asset', default=None, help="Asset of files without an 'asset' column")
+    parser.add_argument('--rtol', type=float, default=1e-9, help="Default relative tolerance")
+    parser.add_argument('--atol', type=float, default=0.0, help="Absolute tolerance")
+    parser.add_argument('--tolerance', action='append', default=[], help="Per-metric relative tolerance, Metric=value")
+    parser.add_argument('--metrics-per-chunk', type=int, default=16)
+    parser.add_argument('--end-date', default=None, help="Ignore days on or after this date")
+    parser.add_argument('--output-dir', default=None, help="Write per_metric.csv and per_date.csv there")
+    args = parser.parse_args(argv)
+
+    configure_logger()
+    per_metric, per_date = reconcile_metrics(
+        args.dump_path, args.api_path, args.metrics, args.asset, args.rtol, args.atol,
+        parse_tolerances(args.tolerance), args.metrics_per_chunk, args.end_date
+    )
+
+    mismatching = per_metric[per_metric['mismatches'] > 0].sort_values('mismatches', ascending=False)
+    print(f"Rows only in dump: {int((per_date['in_dump'] & ~per_date['in_api']).sum())}")
+    print(f"Rows only in API: {int((per_date['in_api'] & ~per_date['in_dump']).sum())}")
+    print(f"Metrics with mismatches: {len(mismatching)} / {len(per_metric)}")
+    if not mismatching.empty:
+        print(mismatching.to_string(index=False))
+
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+        per_metric.to_csv(os.path.join(args.output_dir, 'per_metric.csv'), index=False)
+        per_date.to_csv(os.path.join(args.output_dir, 'per_date.csv'), index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import logging
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from src.config import read_metric_metadata
+
+##########################################################################
+#########################    DTYPE POLICY   ##############################
+##########################################################################
+# Every metric of data/static/metrics.txt has a kind in data/static/metric_metadata.csv:
+#   count      integer counters, nullable Int32 when every value fits, Int64 otherwise,
+#              nullable Float64 when some value is fractional
+#   float      float32 (NaN for missing values), 7 significant digits are enough for features,
+#              nullable Float64 when some value is beyond the float32 range
+#   level      slowly moving levels (supplies, realised caps) kept in float64: their daily
+#              changes are often below float32 resolution and pct_change would be noise
+#   timestamp  nullable Int64 nanoseconds since the epoch
+# Metrics missing from the metadata file are treated as 'float'. The metadata is read by
+# src.config.read_metric_metadata, re-exported here.
+# 'asset' becomes categorical and 'time' int64 nanoseconds since the epoch, which
+# pd.to_datetime reads back unchanged.
+COMPACT_TYPES = ['Int32', 'Int64', 'float32', 'Float64', 'float64']
+FLOAT32_MAX = float(np.finfo('float32').max)
+INT32_MIN, INT32_MAX = np.iinfo('int32').min, np.iinfo('int32').max
+
+
+def _to_epoch_ns(values: pd.Series) -> pd.Series:
+    """
+    Nanoseconds since the epoch of timestamps (datetimes or strings), nullable Int64.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype('Int64')
+    times = pd.to_datetime(values, utc=True, format='mixed')
+    return pd.Series(times.astype('int64'), index=values.index).where(times.notna()).astype('Int64')
+
+
+def compact_dtype(values: pd.Series, kind: str) -> str:
+    """
+    Smallest safe dtype of a metric column given its kind and its values.
+
+    Parameters:
+    values (pd.Series): Metric values.
+    kind (str): One of src.config.METRIC_KINDS.
+
+    Returns:
+    str: Target dtype name.
+    """
+    if kind == 'timestamp':
+        return 'Int64'
+    if kind == 'level':
+        return 'float64'
+    numeric = pd.to_numeric(values, errors='coerce').astype('float64')
+    if kind == 'count':
+        fits_int32 = numeric.dropna().between(INT32_MIN, INT32_MAX).all()
+        is_integral = (numeric.dropna() % 1 == 0).all()
+        if is_integral:
+            return 'Int32' if fits_int32 else 'Int64'
+        return 'Float64'
+    # Values beyond the float32 range would become inf
+    return 'float32' if (numeric.abs().max(skipna=True) or 0) < FLOAT32_MAX else 'Float64'
+
+
+def apply_dtype_policy(
+    coinmetrics_data: pd.DataFrame,
+    metric_kinds: Dict[str, str],
+    date_column: str = 'time'
+) -> pd.DataFrame:
+    """
+    Downcast a CoinMetrics frame following the dtype policy.
+
+    Parameters:
+    coinmetrics_data (pd.DataFrame): CoinMetrics data with 'asset', date and metric columns.
+    metric_kinds (Dict[str, str]): Output of read_metric_metadata.
+    date_column (str): Name of the date column.
+
+    Returns:
+    pd.DataFrame: A new frame with categorical 'asset', int64 epoch dates and compact metrics.
+    Columns that are neither metrics nor keys are left unchanged.
+    """
+    columns = {}
+    for col in coinmetrics_data.columns:
+        values = coinmetrics_data[col]
+        if col == 'asset':
+            columns[col] = values.astype('category')
+        elif col == date_column:
+            columns[col] = _to_epoch_ns(values).astype('int64')
+        elif col in metric_kinds:
+            kind = metric_kinds[col]
+            if kind == 'timestamp':
+                columns[col] = _to_epoch_ns(values)
+            else:
+                dtype = compact_dtype(values, kind)
+                numeric = values if pd.api.types.is_numeric_dtype(values) else pd.to_numeric(values, errors='coerce')
+                if dtype in ('float32', 'Float64', 'float64'):
+                    # Nullable floats hold missing values as pd.NA, numpy floats as NaN
+                    numeric = numeric.astype('Float64').to_numpy(dtype='float64', na_value=np.nan)
+                columns[col] = pd.Series(numeric, index=values.index).astype(dtype)
+        else:
+            columns[col] = values
+    return pd.DataFrame(columns, index=coinmetrics_data.index)
+
+
+def epoch_to_datetime(values: pd.Series) -> pd.Series:
+    """
+    Convert an int64 epoch 'time' column back to UTC timestamps.
+    """
+    return pd.to_datetime(values, unit='ns', utc=True)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Memory used by every column before and after the dtype policy.
+
+    Parameters:
+    before (pd.DataFrame): Frame as downloaded.
+    after (pd.DataFrame): Frame returned by apply_dtype_policy.
+
+    Returns:
+    pd.DataFrame: One row per column plus a 'total' row with dtypes, bytes before and
+    after, and the bytes saved.
+    """
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_before': before.memory_usage(deep=True, index=False),
+        'bytes_after': after.memory_usage(deep=True, index=False),
+    })
+    report.loc['total'] = ['', '', report['bytes_before'].sum(), report['bytes_after'].sum()]
+    report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+    return report
+
+
+def compact_coinmetrics_data(
+    coinmetrics_data: pd.DataFrame,
+    file_path_metrics: str = '../data/static/metrics.txt',
+    file_path_metadata: str = '../data/static/metric_metadata.csv',
+    date_column: str = 'time'
+) -> pd.DataFrame:
+    """
+    Apply the dtype policy of the metrics and metadata files, logging the memory saved.
+
+    Parameters:
+    coinmetrics_data (pd.DataFrame): CoinMetrics data as returned by get_coinmetrics_data.
+    file_path_metrics (str): Path of the metric names file.
+    file_path_metadata (str): Path of the metric metadata file.
+    date_column (str): Name of the date column.
+
+    Returns:
+    pd.DataFrame: The compact frame.
+    """
+    metric_kinds = read_metric_metadata(file_path_metrics, file_path_metadata)
+    compact = apply_dtype_policy(coinmetrics_data, metric_kinds, date_column)
+    total = memory_report(coinmetrics_data, compact).loc['total']
+    logging.info(
+        f"CoinMetrics frame: {total['bytes_before'] / 2**20:.1f}MB -> {total['bytes_after'] / 2**20:.1f}MB "
+        f"({total['bytes_saved'] / 2**20:.1f}MB saved)"
+    )
+    return compact
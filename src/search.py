@@ -0,0 +1,395 @@
+import argparse
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# sklearn is imported by the functions using it, like in src.train_models
+from src.config import configure_logger
+from src.helpers import hash_frame, hash_payload
+from src.instrumentation import record
+from src.train_models import fit_scaler_statistics, walk_forward_folds
+
+##########################################################################
+#######################    SEARCH SPACES   ###############################
+##########################################################################
+def default_search_spaces() -> Dict[str, Tuple[object, Dict[str, List]]]:
+    """
+    Base estimator and parameter grid of the classifiers of running_strat.ipynb.
+    """
+    from sklearn.ensemble import AdaBoostClassifier
+    from sklearn.neural_network import MLPClassifier
+
+    return {
+        'Neural Net': (
+            MLPClassifier(max_iter=1000, random_state=42),
+            {'alpha': [0.01, 0.1, 1, 10], 'hidden_layer_sizes': [(32,), (100,), (64, 32)]}
+        ),
+        'AdaBoost': (
+            AdaBoostClassifier(random_state=42),
+            {'n_estimators': [25, 50, 100, 200], 'learning_rate': [0.1, 0.5, 1.0]}
+        ),
+    }
+
+
+def _json_params(params: Dict) -> Dict:
+    # Tuples (hidden_layer_sizes) come back from JSON as lists
+    return {key: list(value) if isinstance(value, tuple) else value for key, value in params.items()}
+
+
+def _estimator_params(params: Dict) -> Dict:
+    return {key: tuple(value) if isinstance(value, list) else value for key, value in params.items()}
+
+
+##########################################################################
+#####################    SHARED FOLD MATRICES   ##########################
+##########################################################################
+# Layout of the search cache:
+#   {cache_dir}/data/{data_key}/fold{k}_{X_train,y_train,X_test,y_test}.npy
+#       train and test rows of every walk-forward fold, scaled with the statistics of
+#       the fold's training rows, memory-mapped read-only by the workers
+#   {cache_dir}/data/{data_key}/_complete   written once every fold is on disk
+#   {cache_dir}/trials.jsonl   one line per finished (model, params, fold) fit
+# data_key hashes the features, the target, the fold split and the dtype, so a search
+# on the same data reuses the matrices and the scores of earlier runs.
+FOLD_PARTS = ['X_train', 'y_train', 'X_test', 'y_test']
+COMPLETE_FILE = '_complete'
+TRIALS_FILE = 'trials.jsonl'
+
+
+def fold_path(data_dir: str, fold: int, part: str) -> str:
+    return os.path.join(data_dir, f"fold{fold:02d}_{part}.npy")
+
+
+def prepare_fold_matrices(
+    X: pd.DataFrame,
+    y: pd.Series,
+    cache_dir: str,
+    n_folds: int = 5,
+    mode: str = 'expanding',
+    train_periods: Optional[int] = None,
+    gap: int = 1,
+    time_level: Union[int, str] = 0,
+    dtype: str = 'float32'
+) -> str:
+    """
+    Write the pre-scaled train and test matrices of every walk-forward fold as .npy files.
+
+    Every fit of the search reads them memory-mapped instead of receiving a pickled copy
+    and scaling it again. Nothing is written when the matrices of the same data exist.
+
+    Parameters:
+    X (pd.DataFrame): Features indexed by (time, asset, ...).
+    y (pd.Series): Target aligned on X.
+    cache_dir (str): Root directory of the search cache.
+    n_folds (int): Number of walk-forward folds.
+    mode (str): 'expanding' or 'rolling' training windows.
+    train_periods (int): Length of the rolling training window in distinct times.
+    gap (int): Distinct times dropped between train and test (1 for a next period target).
+    time_level (Union[int, str]): Index level holding the time.
+    dtype (str): dtype of the stored features (see src.schema).
+
+    Returns:
+    str: Directory of the fold matrices.
+    """
+    data_key = hash_payload({
+        'X': hash_frame(X),
+        'y': hash_frame(y.to_frame()),
+        'folds': [n_folds, mode, train_periods, gap, str(time_level)],
+        'dtype': dtype,
+    })
+    data_dir = os.path.join(cache_dir, 'data', data_key[:16])
+    if os.path.exists(os.path.join(data_dir, COMPLETE_FILE)):
+        return data_dir
+    os.makedirs(data_dir, exist_ok=True)
+
+    folds = walk_forward_folds(X.index.get_level_values(time_level), n_folds, mode, train_periods, gap)
+    X_values = np.ascontiguousarray(X.to_numpy(dtype=dtype, na_value=np.nan))
+    y_values = np.asarray(y)
+    for fold, (train, test) in enumerate(folds):
+        mean, scale = fit_scaler_statistics(X_values, train)
+        for part, rows in (('train', train), ('test', test)):
+            # Scaled straight into the memory-mapped file, without a second in-memory copy
+            matrix = np.lib.format.open_memmap(fold_path(data_dir, fold, f"X_{part}"), mode='w+', dtype=dtype, shape=(len(rows), X_values.shape[1]))
+            np.subtract(X_values[rows], mean, out=matrix)
+            np.divide(matrix, scale, out=matrix)
+            matrix.flush()
+            del matrix
+            np.save(fold_path(data_dir, fold, f"y_{part}"), y_values[rows])
+
+    with open(os.path.join(data_dir, COMPLETE_FILE), 'w') as file:
+        json.dump({'n_folds': n_folds, 'rows': len(X), 'features': list(map(str, X.columns))}, file)
+    return data_dir
+
+
+# Fold matrices opened by this worker process, by (data_dir, fold)
+_open_folds = {}
+
+
+def load_fold(data_dir: str, fold: int) -> Tuple[np.ndarray, ...]:
+    """
+    Read-only memory maps of X_train, y_train, X_test and y_test of one fold.
+    """
+    key = (data_dir, fold)
+    if key not in _open_folds:
+        _open_folds[key] = tuple(np.load(fold_path(data_dir, fold, part), mmap_mode='r') for part in FOLD_PARTS)
+    return _open_folds[key]
+
+
+##########################################################################
+#########################    RESULTS CACHE   #############################
+##########################################################################
+def trial_key(data_dir: str, name: str, estimator, params: Dict, fold: int, scoring: str) -> str:
+    """
+    Key of one (model, params, fold) fit; it changes with the data, the base estimator or the scoring.
+    """
+    return hash_payload({
+        'data': os.path.basename(data_dir),
+        'model': name,
+        'estimator': repr(estimator),
+        'params': _json_params(params),
+        'fold': fold,
+        'scoring': scoring,
+    })
+
+
+def read_trials(cache_dir: str) -> Dict[str, Dict]:
+    """
+    Finished trials of the search cache by key, skipping a line cut by an interruption.
+    """
+    path = os.path.join(cache_dir, TRIALS_FILE)
+    trials = {}
+    if not os.path.exists(path):
+        return trials
+    with open(path) as file:
+        for line in file:
+            try:
+                trial = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            trials[trial['key']] = trial
+    return trials
+
+
+def _score_trial(
+    key: str,
+    name: str,
+    estimator,
+    params: Dict,
+    fold: int,
+    data_dir: str,
+    scoring: str
+) -> Dict:
+    """
+    Fit one (model, params, fold) trial on the memory-mapped fold matrices.
+    """
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+
+    X_train, y_train, X_test, y_test = load_fold(data_dir, fold)
+    clf = clone(estimator).set_params(**params)
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    return {
+        'key': key,
+        'model': name,
+        'params': _json_params(params),
+        'fold': fold,
+        'score': float(get_scorer(scoring)(clf, X_test, y_test)),
+        'n_train': len(y_train),
+        'fit_seconds': fit_seconds,
+    }
+
+
+##########################################################################
+#######################    SUCCESSIVE HALVING   ###########################
+##########################################################################
+def rung_folds(n_folds: int, min_folds: int = 1, eta: int = 3) -> List[List[int]]:
+    """
+    Folds evaluated at every rung: min_folds, min_folds * eta, ... up to all of them.
+
+    Every rung takes the most recent folds, so each one extends the previous rung and
+    only the new folds are fitted for the surviving candidates.
+    """
+    counts = []
+    count = min_folds
+    while count < n_folds:
+        counts.append(count)
+        count *= eta
+    counts.append(n_folds)
+    return [list(range(n_folds - count, n_folds)) for count in counts]
+
+
+def search_walk_forward(
+    X: pd.DataFrame,
+    y: pd.Series,
+    search_spaces: Optional[Dict[str, Tuple[object, Dict[str, List]]]] = None,
+    cache_dir: str = '../data/search_cache',
+    n_folds: int = 5,
+    min_folds: int = 1,
+    eta: int = 3,
+    mode: str = 'expanding',
+    train_periods: Optional[int] = None,
+    gap: int = 1,
+    time_level: Union[int, str] = 0,
+    scoring: str = 'accuracy',
+    max_workers: int = 4,
+    dtype: str = 'float32'
+) -> pd.DataFrame:
+    """
+    Successive-halving search of every parameter grid over walk-forward folds.
+
+    All candidates of a model are scored on the most recent min_folds folds, the best
+    1/eta of them move on to eta times more folds, and so on until the survivors are
+    scored on every fold. The fits of a rung run in a process pool on the shared fold
+    matrices of prepare_fold_matrices. Each finished fit is appended to the trials file
+    right away, so an interrupted search, or one with a larger grid, only fits what is missing.
+
+    Parameters:
+    X (pd.DataFrame): Features indexed by (time, asset, ...), as built in running_strat.ipynb.
+    y (pd.Series): Target aligned on X.
+    search_spaces (Dict): Model name to (base estimator, parameter grid), default_search_spaces() if None.
+    cache_dir (str): Root directory of the fold matrices and the trials file.
+    n_folds (int): Number of walk-forward folds.
+    min_folds (int): Folds of the first rung.
+    eta (int): Halving rate, 1/eta of the candidates survive every rung.
+    mode (str): 'expanding' or 'rolling' training windows.
+    train_periods (int): Length of the rolling training window in distinct times.
+    gap (int): Distinct times dropped between train and test (1 for a next period target).
+    time_level (Union[int, str]): Index level holding the time.
+    scoring (str): sklearn scorer name.
+    max_workers (int): Number of worker processes.
+    dtype (str): dtype of the shared feature matrices.
+
+    Returns:
+    pd.DataFrame: One row per (model, params, rung) with the folds scored, mean and std
+    of the score, fit time, number of fits read from the cache and whether it survived.
+    """
+    from sklearn.model_selection import ParameterGrid
+
+    if eta < 2:
+        raise ValueError(f"eta must be at least 2, not {eta}")
+    search_spaces = search_spaces or default_search_spaces()
+    data_dir = prepare_fold_matrices(X, y, cache_dir, n_folds, mode, train_periods, gap, time_level, dtype)
+    trials = read_trials(cache_dir)
+    candidates = {name: list(ParameterGrid(grid)) for name, (_, grid) in search_spaces.items()}
+    rungs = rung_folds(n_folds, min_folds, eta)
+    rows = []
+
+    trials_path = os.path.join(cache_dir, TRIALS_FILE)
+    # A line cut by an interruption must not swallow the first new one
+    if os.path.exists(trials_path) and os.path.getsize(trials_path):
+        with open(trials_path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read() != b'\n':
+                with open(trials_path, 'a') as trials_file:
+                    trials_file.write('\n')
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor, open(trials_path, 'a') as trials_file:
+        for rung, folds in enumerate(rungs):
+            tasks = {}
+            for name, params_list in candidates.items():
+                estimator = search_spaces[name][0]
+                for params in params_list:
+                    for fold in folds:
+                        key = trial_key(data_dir, name, estimator, params, fold, scoring)
+                        if key not in trials and key not in tasks:
+                            tasks[key] = executor.submit(_score_trial, key, name, estimator, params, fold, data_dir, scoring)
+            cached = set(trials)
+            for future in as_completed(tasks.values()):
+                trial = future.result()
+                trials_file.write(json.dumps(trial) + '\n')
+                trials_file.flush()
+                trials[trial['key']] = trial
+                record(f"search.fit.{trial['model']}", trial['fit_seconds'], rows=trial['n_train'])
+            logging.info(f"Rung {rung}: {len(tasks)} fits on folds {folds[0]}-{folds[-1]}, {sum(map(len, candidates.values()))} candidates")
+
+            for name, params_list in candidates.items():
+                estimator = search_spaces[name][0]
+                model_rows = []
+                for params in params_list:
+                    keys = [trial_key(data_dir, name, estimator, params, fold, scoring) for fold in folds]
+                    scores = np.array([trials[key]['score'] for key in keys])
+                    model_rows.append({
+                        'model': name,
+                        'params': json.dumps(_json_params(params), sort_keys=True),
+                        'rung': rung,
+                        'n_folds': len(folds),
+                        'mean_score': scores.mean(),
+                        'std_score': scores.std(),
+                        'fit_seconds': sum(trials[key]['fit_seconds'] for key in keys),
+                        'cached_fits': sum(key in cached for key in keys),
+                    })
+                keep = max(1, math.ceil(len(params_list) / eta)) if rung < len(rungs) - 1 else len(params_list)
+                # Stable sort: ties keep the grid order
+                survivors = sorted(sorted(range(len(params_list)), key=lambda i: -model_rows[i]['mean_score'])[:keep])
+                for position, row in enumerate(model_rows):
+                    row['survived'] = position in survivors
+                rows.extend(model_rows)
+                candidates[name] = [params_list[i] for i in survivors]
+
+    return pd.DataFrame(rows)
+
+
+def best_params(results: pd.DataFrame) -> Dict[str, Dict]:
+    """
+    Parameters of the best candidate of every model at the last rung it reached.
+    """
+    best = {}
+    for name, model_results in results.groupby('model', sort=False):
+        last_rung = model_results[model_results['rung'] == model_results['rung'].max()]
+        best[name] = json.loads(last_rung.loc[last_rung['mean_score'].idxmax(), 'params'])
+    return best
+
+
+def best_classifiers(
+    results: pd.DataFrame,
+    search_spaces: Optional[Dict[str, Tuple[object, Dict[str, List]]]] = None
+) -> Dict[str, object]:
+    """
+    Unfitted best classifier of every model, ready for src.train_models.train_walk_forward.
+    """
+    from sklearn.base import clone
+
+    search_spaces = search_spaces or default_search_spaces()
+    return {
+        name: clone(search_spaces[name][0]).set_params(**_estimator_params(params))
+        for name, params in best_params(results).items()
+    }
+
+
+##########################################################################
+###########################    ENTRY POINT   #############################
+##########################################################################
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Successive-halving search of the classifiers over walk-forward folds.")
+    parser.add_argument('features', help="Parquet features with a 'target' column, e.g. the preprocess output of the pipeline cache")
+    parser.add_argument('--cache-dir', default='../data/search_cache')
+    parser.add_argument('--n-folds', type=int, default=5)
+    parser.add_argument('--min-folds', type=int, default=1)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--scoring', default='accuracy')
+    args = parser.parse_args(argv)
+
+    from src.main import training_rows
+
+    configure_logger()
+    rows = training_rows(pd.read_parquet(args.features))
+    results = search_walk_forward(
+        rows.drop(columns='target'), (rows['target'] > 0).astype(int), cache_dir=args.cache_dir,
+        n_folds=args.n_folds, min_folds=args.min_folds, eta=args.eta, scoring=args.scoring, max_workers=args.workers
+    )
+    print(results.sort_values(['model', 'rung', 'mean_score'], ascending=[True, True, False]).to_string(index=False))
+    print(json.dumps(best_params(results), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,558 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import time
+from typing import Callable, List, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from src.config import configure_logger
+from src.instrumentation import record
+
+##########################################################################
+########################    KLINE RING BUFFER   ##########################
+##########################################################################
+# Fields of a bar in the buffer and the key of each one in a websocket kline event
+KLINE_FIELDS = [
+    'open', 'high', 'low', 'close', 'volume',
+    'quoteAssetVolume', 'numberOfTrades', 'takerBuyBaseVol', 'takerBuyQuoteVol'
+]
+KLINE_EVENT_KEYS = ['o', 'h', 'l', 'c', 'v', 'q', 'n', 'V', 'Q']
+
+
+class KlineRingBuffer:
+    """
+    The last `capacity` closed bars of every symbol in preallocated NumPy arrays.
+
+    Appending a bar writes one row in place, nothing is allocated while streaming. Bars
+    are kept in ring order, the slot of the next bar of a symbol is count % capacity.
+
+    Parameters:
+    symbols (List[str]): Symbols held by the buffer.
+    capacity (int): Bars kept per symbol.
+    fields (List[str]): Bar fields, see KLINE_FIELDS.
+    """
+
+    def __init__(self, symbols: List[str], capacity: int = 1000, fields: List[str] = KLINE_FIELDS):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.capacity = capacity
+        self.fields = list(fields)
+        self.open_time = np.full((len(self.symbols), capacity), -1, dtype='int64')
+        self.values = np.full((len(self.symbols), capacity, len(self.fields)), np.nan)
+        self.count = np.zeros(len(self.symbols), dtype='int64')
+
+    def append(self, symbol: str, open_time: int, values: np.ndarray) -> bool:
+        """
+        Store a closed bar.
+
+        Parameters:
+        symbol (str): Symbol of the bar.
+        open_time (int): Open time of the bar in milliseconds since the epoch.
+        values (np.ndarray): One value per field.
+
+        Returns:
+        bool: True for a new bar, False for a repeated one (overwritten) or an older one (dropped).
+        """
+        i = self.index[symbol]
+        n = self.count[i]
+        if n:
+            last = (n - 1) % self.capacity
+            if open_time == self.open_time[i, last]:
+                self.values[i, last] = values
+                return False
+            if open_time < self.open_time[i, last]:
+                return False
+        slot = n % self.capacity
+        self.open_time[i, slot] = open_time
+        self.values[i, slot] = values
+        self.count[i] = n + 1
+        return True
+
+    def _order(self, i: int, n: Optional[int]) -> np.ndarray:
+        """
+        Slots of the last n bars of symbol i, oldest first.
+        """
+        held = int(min(self.count[i], self.capacity))
+        n = held if n is None else min(n, held)
+        return (self.count[i] - n + np.arange(n)) % self.capacity
+
+    def bars(self, symbol: str, n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Last n bars of a symbol (all held bars if None), indexed by their open time.
+        """
+        i = self.index[symbol]
+        order = self._order(i, n)
+        return pd.DataFrame(
+            self.values[i, order],
+            index=pd.DatetimeIndex(pd.to_datetime(self.open_time[i, order], unit='ms'), name='dateTime'),
+            columns=self.fields
+        )
+
+    def field_matrix(self, field: str = 'close', n: Optional[int] = None) -> pd.DataFrame:
+        """
+        (time x symbol) matrix of one field over the last n bars of every symbol.
+
+        Symbols without a bar at some time get NaN there, e.g. after a missed bar.
+        """
+        column = self.fields.index(field)
+        series = {}
+        for symbol, i in self.index.items():
+            order = self._order(i, n)
+            series[symbol] = pd.Series(
+                self.values[i, order, column], index=pd.to_datetime(self.open_time[i, order], unit='ms')
+            )
+        matrix = pd.DataFrame(series).sort_index()
+        matrix.index.name = 'dateTime'
+        return matrix
+
+
+##########################################################################
+#########################    KLINE EVENTS   ##############################
+##########################################################################
+BINANCE_FUTURES_STREAM_URL = 'wss://fstream.binance.com'
+# Binance accepts at most 200 streams per connection
+MAX_STREAMS_PER_CONNECTION = 200
+
+
+def kline_stream_urls(
+    symbols: List[str],
+    interval: str = '1m',
+    base_url: str = BINANCE_FUTURES_STREAM_URL,
+    streams_per_connection: int = MAX_STREAMS_PER_CONNECTION
+) -> List[str]:
+    """
+    Combined-stream URLs subscribing to the kline stream of every symbol.
+
+    Parameters:
+    symbols (List[str]): Trading pair symbols, e.g. the output of get_trading_pairs.
+    interval (str): Kline interval, e.g. '1m', '1h' or '1d'.
+    base_url (str): Websocket endpoint, a local replay server in benchmarks.
+    streams_per_connection (int): Streams per URL.
+
+    Returns:
+    List[str]: One URL per connection to open.
+    """
+    streams = [f"{symbol.lower()}@kline_{interval}" for symbol in symbols]
+    return [
+        f"{base_url}/stream?streams={'/'.join(streams[i:i + streams_per_connection])}"
+        for i in range(0, len(streams), streams_per_connection)
+    ]
+
+
+def parse_kline_event(message) -> Tuple[str, int, bool, int, np.ndarray]:
+    """
+    Decode a kline event, wrapped in a combined-stream envelope or not.
+
+    Returns:
+    Tuple[str, int, bool, int, np.ndarray]: Symbol, open time (ms), whether the bar is
+    closed, event time (ms) and the values of KLINE_FIELDS.
+    """
+    event = json.loads(message)
+    event = event.get('data', event)
+    kline = event['k']
+    values = np.array([float(kline[key]) for key in KLINE_EVENT_KEYS])
+    return kline['s'], kline['t'], kline['x'], event['E'], values
+
+
+##########################################################################
+#########################    STREAM CLIENT   #############################
+##########################################################################
+class StreamStats:
+    """
+    Event counters and end-to-end latencies of a stream.
+
+    The latency of an event is the time between its event time, stamped by the server,
+    and the end of its handling, closed-bar callbacks included. The mean and the maximum
+    cover every event; the percentiles cover the last `latency_capacity` events, kept in a
+    preallocated ring so that an unbounded stream uses constant memory.
+
+    Parameters:
+    latency_capacity (int): Latencies kept for the percentiles.
+    """
+
+    def __init__(self, latency_capacity: int = 100000):
+        self.events = 0
+        self.closed_bars = 0
+        self.repeated_bars = 0
+        self.reconnects = 0
+        self.latencies_ms = np.empty(latency_capacity)
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_max = -np.inf
+        self.start = None
+        self.end = None
+
+    def add_latency(self, latency_ms: float) -> None:
+        self.latencies_ms[self.latency_count % len(self.latencies_ms)] = latency_ms
+        self.latency_count += 1
+        self.latency_sum += latency_ms
+        self.latency_max = max(self.latency_max, latency_ms)
+
+    def summary(self) -> Dict:
+        seconds = (self.end or time.perf_counter()) - (self.start or time.perf_counter())
+        held = min(self.latency_count, len(self.latencies_ms))
+        latencies = self.latencies_ms[:held] if held else np.array([np.nan])
+        return {
+            'events': self.events,
+            'closed_bars': self.closed_bars,
+            'repeated_bars': self.repeated_bars,
+            'reconnects': self.reconnects,
+            'seconds': round(seconds, 3),
+            'events_per_second': round(self.events / seconds, 1) if seconds > 0 else np.nan,
+            'latency_mean_ms': round(self.latency_sum / self.latency_count, 3) if self.latency_count else np.nan,
+            'latency_p50_ms': round(float(np.percentile(latencies, 50)), 3),
+            'latency_p95_ms': round(float(np.percentile(latencies, 95)), 3),
+            'latency_p99_ms': round(float(np.percentile(latencies, 99)), 3),
+            'latency_max_ms': round(self.latency_max, 3) if self.latency_count else np.nan,
+        }
+
+
+class KlineStream:
+    """
+    Subscribe to the kline streams of a set of symbols and keep their closed bars.
+
+    In-progress updates only count as events, closed bars go to the ring buffer and then
+    to on_bar(symbol, open_time, values), which is where the feature and prediction stages
+    plug in (see CrossSectionBatcher). Connections dropped by the server are reopened with
+    exponential backoff; bars missed meanwhile are not backfilled.
+
+    Parameters:
+    symbols (List[str]): Trading pair symbols.
+    interval (str): Kline interval.
+    capacity (int): Bars kept per symbol by the ring buffer.
+    on_bar (Callable): Called with every new closed bar.
+    base_url (str): Websocket endpoint.
+    reconnect (bool): Reopen connections closed by the server, False for a finite replay.
+    max_reconnects (int): Reconnections allowed per connection before giving up.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        interval: str = '1m',
+        capacity: int = 1000,
+        on_bar: Optional[Callable] = None,
+        base_url: str = BINANCE_FUTURES_STREAM_URL,
+        reconnect: bool = True,
+        max_reconnects: int = 10
+    ):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.buffer = KlineRingBuffer(self.symbols, capacity)
+        self.on_bar = on_bar
+        self.urls = kline_stream_urls(self.symbols, interval, base_url)
+        self.reconnect = reconnect
+        self.max_reconnects = max_reconnects
+        self.stats = StreamStats()
+        self._stopped = None
+
+    def handle(self, message) -> None:
+        """
+        Process one websocket message.
+        """
+        symbol, open_time, closed, event_time, values = parse_kline_event(message)
+        self.stats.events += 1
+        if closed:
+            if self.buffer.append(symbol, open_time, values):
+                self.stats.closed_bars += 1
+                if self.on_bar is not None:
+                    self.on_bar(symbol, open_time, values)
+            else:
+                self.stats.repeated_bars += 1
+        self.stats.add_latency(time.time() * 1000 - event_time)
+
+    async def _consume(self, url: str) -> None:
+        import websockets
+
+        attempt = 0
+        while not self._stopped.is_set():
+            try:
+                async with websockets.connect(url, max_size=2**22) as websocket:
+                    attempt = 0
+                    async for message in websocket:
+                        self.handle(message)
+                        if self._stopped.is_set():
+                            return
+            except (OSError, websockets.ConnectionClosed) as error:
+                logging.warning(f"Kline stream connection lost: {error}")
+            if not self.reconnect or self._stopped.is_set():
+                return
+            if attempt >= self.max_reconnects:
+                raise ConnectionError(f"Kline stream {url[:80]} dropped {attempt} times in a row")
+            await asyncio.sleep(min(2 ** attempt, 60))
+            attempt += 1
+            self.stats.reconnects += 1
+
+    async def run(self, duration: Optional[float] = None) -> Dict:
+        """
+        Stream until stop() is called, the duration elapses or, without reconnect, every
+        connection is closed by the server.
+
+        Parameters:
+        duration (float): Seconds to stream, unbounded if None.
+
+        Returns:
+        Dict: StreamStats summary.
+        """
+        self._stopped = asyncio.Event()
+        self.stats.start = time.perf_counter()
+        consumers = asyncio.gather(*(self._consume(url) for url in self.urls))
+        try:
+            await asyncio.wait_for(consumers, duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._stopped.set()
+            self.stats.end = time.perf_counter()
+        summary = self.stats.summary()
+        record('streaming.kline_stream', self.stats.end - self.stats.start, rows=self.stats.closed_bars)
+        return summary
+
+    def stop(self) -> None:
+        if self._stopped is not None:
+            self._stopped.set()
+
+
+##########################################################################
+#####################    FEATURES AND PREDICTIONS   #######################
+##########################################################################
+class CrossSectionBatcher:
+    """
+    Group closed bars by open time and hand every complete cross-section downstream.
+
+    OnlineFeatureState and PredictionService work on one bar of all symbols at a time.
+    A cross-section is released as soon as every symbol closed its bar, or with NaN for
+    the missing symbols once max_pending newer open times are waiting; bars arriving
+    after their cross-section was released are dropped.
+
+    Parameters:
+    symbols (List[str]): Symbols of a complete cross-section.
+    on_cross_section (Callable): Called as on_cross_section(time, closes) with closes a
+        pd.Series of close prices indexed by symbol.
+    max_pending (int): Newer open times tolerated before releasing an incomplete cross-section.
+    """
+
+    def __init__(self, symbols: List[str], on_cross_section: Callable, max_pending: int = 2):
+        self.symbols = list(symbols)
+        self.on_cross_section = on_cross_section
+        self.max_pending = max_pending
+        self.close_column = KLINE_FIELDS.index('close')
+        self.pending = {}
+        self.last_released = None
+        self.late_bars = 0
+
+    def __call__(self, symbol: str, open_time: int, values: np.ndarray) -> None:
+        if self.last_released is not None and open_time <= self.last_released:
+            self.late_bars += 1
+            return
+        self.pending.setdefault(open_time, {})[symbol] = values[self.close_column]
+        for pending_time in sorted(self.pending):
+            complete = len(self.pending[pending_time]) == len(self.symbols)
+            if not complete and len(self.pending) <= self.max_pending:
+                break
+            self._release(pending_time)
+
+    def _release(self, open_time: int) -> None:
+        closes = pd.Series(self.pending.pop(open_time), dtype='float64').reindex(self.symbols)
+        self.last_released = open_time
+        self.on_cross_section(pd.to_datetime(open_time, unit='ms'), closes)
+
+
+class StreamingPredictor:
+    """
+    Update the online features with every cross-section and run the models on them.
+
+    Parameters:
+    state (OnlineFeatureState): Feature state, e.g. OnlineFeatureState.from_history on the
+        ring buffer or on the REST history.
+    service (PredictionService): Models to run, features only if None.
+    on_predictions (Callable): Called as on_predictions(bar_time, features, predictions).
+    """
+
+    def __init__(self, state, service=None, on_predictions: Optional[Callable] = None):
+        self.state = state
+        self.service = service
+        self.on_predictions = on_predictions
+        self.features = None
+        self.predictions = None
+
+    def __call__(self, bar_time: pd.Timestamp, closes: pd.Series) -> None:
+        self.features = self.state.update(bar_time, closes)
+        if self.service is not None:
+            # Rows are ready once the longest window is filled
+            ready = self.features.dropna()
+            self.predictions = self.service.predict(ready) if len(ready) else None
+        if self.on_predictions is not None:
+            self.on_predictions(bar_time, self.features, self.predictions)
+
+
+##########################################################################
+#########################    REPLAY SERVER   #############################
+##########################################################################
+def kline_event_templates(symbol: str, interval: str, klines: list, updates_per_bar: int = 0) -> List[Tuple[str, str]]:
+    """
+    Pre-encode the combined-stream kline events of recorded REST klines.
+
+    Every bar yields updates_per_bar in-progress events followed by its closed event. The
+    event time is filled in at send time, so templates are (prefix, suffix) pairs around it.
+
+    Parameters:
+    symbol (str): Symbol of the klines.
+    interval (str): Kline interval.
+    klines (list): Raw klines as returned by futures_historical_klines.
+    updates_per_bar (int): In-progress events sent before every closed bar.
+
+    Returns:
+    List[Tuple[str, str]]: Event templates in sending order.
+    """
+    stream = f"{symbol.lower()}@kline_{interval}"
+    templates = []
+    for kline in klines:
+        for closed in [False] * updates_per_bar + [True]:
+            body = json.dumps({
+                't': int(kline[0]), 'T': int(kline[6]), 's': symbol, 'i': interval, 'f': -1, 'L': -1,
+                'o': kline[1], 'c': kline[4], 'h': kline[2], 'l': kline[3], 'v': kline[5], 'n': int(kline[8]),
+                'x': closed, 'q': kline[7], 'V': kline[9], 'Q': kline[10], 'B': '0'
+            }, separators=(',', ':'))
+            templates.append((
+                f'{{"stream":"{stream}","data":{{"e":"kline","E":',
+                f',"s":"{symbol}","k":{body}}}}}'
+            ))
+    return templates
+
+
+async def serve_replay(
+    recording: Dict[str, list],
+    interval: str = '1m',
+    host: str = '127.0.0.1',
+    port: int = 0,
+    updates_per_bar: int = 0,
+    events_per_second: Optional[float] = None,
+    ready: Optional[Callable] = None
+) -> None:
+    """
+    Websocket server replaying recorded klines on the Binance combined-stream path.
+
+    Every connection receives the bars of the symbols in its 'streams' query, bar by bar
+    across symbols, then is closed. Event times are stamped when each event is sent.
+
+    Parameters:
+    recording (Dict[str, list]): Symbol to raw REST klines, see record_klines.
+    interval (str): Interval of the recorded klines.
+    host (str): Interface to bind.
+    port (int): Port to bind, 0 picks a free one.
+    updates_per_bar (int): In-progress events sent before every closed bar.
+    events_per_second (float): Pace of every connection, as fast as possible if None.
+    ready (Callable): Called with the bound port once the server listens.
+    """
+    import websockets
+
+    templates = {
+        f"{symbol.lower()}@kline_{interval}": kline_event_templates(symbol, interval, klines, updates_per_bar)
+        for symbol, klines in recording.items()
+    }
+
+    async def replay(websocket, *_) -> None:
+        # websockets 12 exposes the request path as .path, later versions as .request.path
+        path = getattr(websocket, 'path', None) or websocket.request.path
+        streams = parse_qs(urlparse(path).query).get('streams', [''])[0].split('/')
+        # Interleave symbols bar by bar, like a live stream
+        events = [event for group in zip(*(templates[stream] for stream in streams if stream in templates)) for event in group]
+        start = time.perf_counter()
+        for n, (prefix, suffix) in enumerate(events):
+            if events_per_second is not None:
+                delay = start + n / events_per_second - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await websocket.send(f"{prefix}{int(time.time() * 1000)}{suffix}")
+        await websocket.close()
+
+    async with websockets.serve(replay, host, port, max_size=2**22) as server:
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        await asyncio.Future()
+
+
+def _run_replay_server(recording: Dict[str, list], interval: str, updates_per_bar: int, events_per_second, queue) -> None:
+    asyncio.run(serve_replay(recording, interval, updates_per_bar=updates_per_bar,
+                             events_per_second=events_per_second, ready=queue.put))
+
+
+class ReplayServer:
+    """
+    Context manager running serve_replay in a child process, so that the server does not
+    compete with the measured client for the interpreter.
+
+    Yields the base URL to pass to KlineStream.
+    """
+
+    def __init__(self, recording: Dict[str, list], interval: str = '1m', updates_per_bar: int = 0,
+                 events_per_second: Optional[float] = None):
+        self.args = (recording, interval, updates_per_bar, events_per_second)
+        self.process = None
+
+    def __enter__(self) -> str:
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        self.process = context.Process(target=_run_replay_server, args=self.args + (queue,), daemon=True)
+        self.process.start()
+        port = queue.get(timeout=60)
+        return f"ws://127.0.0.1:{port}"
+
+    def __exit__(self, *exc) -> None:
+        self.process.terminate()
+        self.process.join()
+
+
+def record_klines(client, symbols: List[str], interval: str, start_str: str, end_str: Optional[str] = None) -> Dict[str, list]:
+    """
+    Download raw REST klines to replay, with the Binance client or a FakeBinanceClient.
+    """
+    return {symbol: client.futures_historical_klines(symbol, interval, start_str, end_str) for symbol in symbols}
+
+
+##########################################################################
+###########################    ENTRY POINT   #############################
+##########################################################################
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream Binance klines into the online features and models.")
+    parser.add_argument('--pairs', nargs='+', default=None, help="Symbols to follow (default is get_trading_pairs)")
+    parser.add_argument('--interval', default='1m')
+    parser.add_argument('--capacity', type=int, default=1000, help="Bars kept per symbol")
+    parser.add_argument('--model', action='append', default=[], help="name=path of a model, repeatable")
+    parser.add_argument('--url', default=BINANCE_FUTURES_STREAM_URL, help="Websocket endpoint")
+    parser.add_argument('--duration', type=float, default=None, help="Seconds to stream")
+    args = parser.parse_args(argv)
+
+    from binance.client import Client
+
+    from src.get_data import get_trading_pairs, read_api_keys
+    from src.preprocesing import OnlineFeatureState
+
+    configure_logger()
+    pairs = args.pairs
+    if pairs is None:
+        pairs = get_trading_pairs(Client(*read_api_keys()).get_exchange_info())
+    service = None
+    if args.model:
+        from src.prediction_service import PredictionService
+        service = PredictionService(dict(model.split('=', 1) for model in args.model))
+        service.warm_up()
+
+    def log_predictions(bar_time, features, predictions) -> None:
+        n_predictions = 0 if predictions is None else len(predictions)
+        logging.info(f"Bar {bar_time}: {features['returns'].notna().sum()} returns, {n_predictions} predictions")
+
+    predictor = StreamingPredictor(OnlineFeatureState(pairs), service, log_predictions)
+    stream = KlineStream(pairs, args.interval, args.capacity, CrossSectionBatcher(pairs, predictor), args.url)
+    logging.info(f"Streaming {len(pairs)} pairs over {len(stream.urls)} connections")
+    logging.info(asyncio.run(stream.run(args.duration)))
+
+
+if __name__ == '__main__':
+    main()
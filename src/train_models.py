@@ -1,22 +1,34 @@
+import os
 import pickle
-from sklearn.ensemble import AdaBoostClassifier
-from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split
+import time
+from typing import List, Dict, Optional, Tuple, Union
 
-def train_and_export_models(X, y, model_names, classifiers, pickle_paths):
+import numpy as np
+import pandas as pd
+
+# sklearn and joblib are imported by the functions using them: loading them costs
+# seconds, which short jobs importing this module for walk_forward_folds should not pay.
+from src.instrumentation import record, track
+from src.model_store import export_model
+
+def train_and_export_models(X, y, model_names, classifiers, pickle_paths, export_format='pickle'):
     """
-    Train machine learning models and export them as pickle files.
+    Train machine learning models and export them.
 
     Parameters:
     X (pd.DataFrame): Features for training.
     y (pd.Series): Target variable for training.
     model_names (List[str]): List of model names.
     classifiers (List[object]): List of classifier objects.
-    pickle_paths (List[str]): List of file paths for saving pickle files.
+    pickle_paths (List[str]): List of export paths, model directories for the 'joblib' format.
+    export_format (str): 'pickle' for a raw pickle file (default), 'joblib' for the
+        memory-mappable format of src.model_store, which train_walk_forward always uses.
 
     Returns:
     List[object]: List of trained classifiers.
     """
+    from sklearn.model_selection import train_test_split
+
     trained_classifiers = []
 
     # Split the data into training and testing sets
@@ -24,12 +36,202 @@ def train_and_export_models(X, y, model_names, classifiers, pickle_paths):
 
     for name, clf, pickle_path in zip(model_names, classifiers, pickle_paths):
         # Train the classifier
-        clf.fit(X_train, Y_train)
+        with track(f"train_models.fit.{name}") as measurement:
+            clf.fit(X_train, Y_train)
+            measurement.rows = len(X_train)
         trained_classifiers.append(clf)
 
-        # Export the trained model as a pickle file
-        with open(pickle_path, 'wb') as file:
-            pickle.dump(clf, file)
+        # Export the trained model
+        if export_format == 'joblib':
+            export_model(clf, pickle_path)
+        else:
+            with open(pickle_path, 'wb') as file:
+                pickle.dump(clf, file)
         
     return trained_classifiers
 
+
+
+##########################################################################
+######################    WALK-FORWARD TRAINING   ########################
+##########################################################################
+def walk_forward_folds(
+    times: pd.Index,
+    n_folds: int = 20,
+    mode: str = 'expanding',
+    train_periods: Optional[int] = None,
+    gap: int = 0
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Time-ordered train/test folds over a (time, asset) indexed dataset.
+
+    The distinct times are split into an initial training block followed by n_folds
+    test blocks of equal length. Each fold tests on one block and trains on every
+    earlier time ('expanding') or on the train_periods times before it ('rolling'),
+    so that no fold ever trains on the future.
+
+    Parameters:
+    times (pd.Index): Time of every row, e.g. all_data.index.get_level_values('time').
+    n_folds (int): Number of test blocks.
+    mode (str): 'expanding' or 'rolling'.
+    train_periods (int): Number of distinct times in a rolling training window
+        (default is the length of the initial training block).
+    gap (int): Number of distinct times dropped between train and test, e.g. 1 when the
+        target is the next period return.
+
+    Returns:
+    List[Tuple[np.ndarray, np.ndarray]]: (train row positions, test row positions) of every fold.
+
+    Raises:
+    ValueError: If mode is unknown or there are not enough distinct times.
+    """
+    if mode not in ('expanding', 'rolling'):
+        raise ValueError(f"Unknown walk-forward mode '{mode}'")
+    unique_times, time_codes = np.unique(np.asarray(times), return_inverse=True)
+    n_times = len(unique_times)
+    test_periods = n_times // (n_folds + 1)
+    if test_periods == 0:
+        raise ValueError(f"{n_times} distinct times cannot make {n_folds} folds")
+    initial_train = n_times - n_folds * test_periods
+    train_periods = train_periods or initial_train
+
+    # Rows sorted by time, so every fold is a contiguous slice of `order`
+    order = np.argsort(time_codes, kind='stable')
+    bounds = np.searchsorted(time_codes[order], np.arange(n_times + 1))
+
+    folds = []
+    for fold in range(n_folds):
+        test_start = initial_train + fold * test_periods
+        train_end = test_start - gap
+        train_start = 0 if mode == 'expanding' else max(0, train_end - train_periods)
+        train = order[bounds[train_start]:bounds[train_end]]
+        test = order[bounds[test_start]:bounds[test_start + test_periods]]
+        folds.append((train, test))
+    return folds
+
+
+def fit_scaler_statistics(X: np.ndarray, train: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and scale of a StandardScaler fitted on the training rows of one fold.
+
+    Parameters:
+    X (np.ndarray): Feature matrix.
+    train (np.ndarray): Training row positions.
+
+    Returns:
+    Tuple[np.ndarray, np.ndarray]: Mean and scale of every feature, in the dtype of X.
+    """
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler().fit(X[train])
+    return scaler.mean_.astype(X.dtype), scaler.scale_.astype(X.dtype)
+
+
+def _fit_fold(
+    name: str,
+    classifier,
+    fold: int,
+    X: np.ndarray,
+    y: np.ndarray,
+    train: np.ndarray,
+    test: np.ndarray,
+    mean: np.ndarray,
+    scale: np.ndarray,
+    artifact_path: Optional[str]
+) -> Dict:
+    """
+    Fit one (model, fold) job. X is memory-mapped by joblib and scaled locally.
+    """
+    from sklearn.base import clone
+
+    clf = clone(classifier)
+    start = time.perf_counter()
+    clf.fit((X[train] - mean) / scale, y[train])
+    fit_seconds = time.perf_counter() - start
+    accuracy = clf.score((X[test] - mean) / scale, y[test])
+
+    if artifact_path is not None:
+        export_model(clf, artifact_path, mean, scale)
+
+    return {
+        'model': name,
+        'fold': fold,
+        'n_train': len(train),
+        'n_test': len(test),
+        'accuracy': accuracy,
+        'fit_seconds': fit_seconds,
+        'artifact_path': artifact_path
+    }
+
+
+def train_walk_forward(
+    X: pd.DataFrame,
+    y: pd.Series,
+    model_names: List[str],
+    classifiers: List[object],
+    n_folds: int = 20,
+    mode: str = 'expanding',
+    train_periods: Optional[int] = None,
+    gap: int = 1,
+    time_level: Union[int, str] = 0,
+    n_jobs: int = -1,
+    artifacts_dir: Optional[str] = None,
+    scaler_cache_dir: Optional[str] = None,
+    dtype: str = 'float64'
+) -> pd.DataFrame:
+    """
+    Fit every (model x fold) of a walk-forward split in parallel and export one artifact per fold.
+
+    Scaler statistics are computed once per fold and shared by all models (and cached
+    on disk across runs when scaler_cache_dir is set). The feature matrix is sent to the
+    loky workers once, memory-mapped, and every job only receives its row positions.
+
+    Parameters:
+    X (pd.DataFrame): Features indexed by (time, asset, ...), as built in running_strat.ipynb.
+    y (pd.Series): Target aligned on X.
+    model_names (List[str]): List of model names.
+    classifiers (List[object]): Unfitted classifiers, cloned for every fold.
+    n_folds (int): Number of walk-forward folds.
+    mode (str): 'expanding' or 'rolling' training windows.
+    train_periods (int): Length of the rolling training window in distinct times.
+    gap (int): Distinct times dropped between train and test (1 for a next period target).
+    time_level (Union[int, str]): Index level holding the time.
+    n_jobs (int): Number of parallel jobs (-1 uses all cores).
+    artifacts_dir (str): Directory receiving one {model}_fold{fold} model directory per job
+        (see src.model_store), no export if None.
+    scaler_cache_dir (str): joblib.Memory directory caching the per-fold scaler statistics.
+    dtype (str): dtype of the shared feature matrix, 'float32' halves its memory (see src.schema).
+
+    Returns:
+    pd.DataFrame: One row per (model, fold) with sizes, test accuracy, fit time and artifact path.
+    """
+    from joblib import Memory, Parallel, delayed
+
+    folds = walk_forward_folds(X.index.get_level_values(time_level), n_folds, mode, train_periods, gap)
+    X_values = np.ascontiguousarray(X.to_numpy(dtype=dtype, na_value=np.nan))
+    y_values = np.asarray(y)
+
+    fit_statistics = fit_scaler_statistics
+    if scaler_cache_dir is not None:
+        fit_statistics = Memory(scaler_cache_dir, verbose=0).cache(fit_scaler_statistics)
+    scalers = [fit_statistics(X_values, train) for train, _ in folds]
+
+    if artifacts_dir is not None:
+        os.makedirs(artifacts_dir, exist_ok=True)
+
+    def artifact_path(name: str, fold: int) -> Optional[str]:
+        if artifacts_dir is None:
+            return None
+        return os.path.join(artifacts_dir, f"{name.replace(' ', '_').lower()}_fold{fold:02d}")
+
+    results = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(_fit_fold)(
+            name, clf, fold, X_values, y_values, train, test, mean, scale, artifact_path(name, fold)
+        )
+        for name, clf in zip(model_names, classifiers)
+        for fold, ((train, test), (mean, scale)) in enumerate(zip(folds, scalers))
+    )
+    # Fits ran in worker processes, record their timings in this one
+    for result in results:
+        record(f"train_models.fit.{result['model']}", result['fit_seconds'], rows=result['n_train'])
+    return pd.DataFrame(results)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from src.backtest import run_backtest, sweep_thresholds, threshold_signals, to_matrix
+
+
+def loop_backtest(signals, forward_returns, fee_rate, max_position=None, max_gross=None) -> dict:
+    """
+    Reference backtest of one (T, N) signal matrix, one period and one ticker at a time.
+    """
+    n_times, n_tickers = forward_returns.shape
+    held = [0.0] * n_tickers
+    equity, peak = 1.0, 1.0
+    pnls, equities, drawdowns, turnovers = [], [], [], []
+    for t in range(n_times):
+        positions = []
+        for n in range(n_tickers):
+            position = signals[t][n]
+            if np.isnan(forward_returns[t][n]) or np.isnan(position):
+                position = 0.0
+            if max_position is not None:
+                position = min(max(position, -max_position), max_position)
+            positions.append(position)
+        gross = sum(abs(position) for position in positions)
+        if max_gross is not None and gross > max_gross:
+            positions = [position * max_gross / gross for position in positions]
+
+        gross_pnl = sum(position * forward_returns[t][n] for n, position in enumerate(positions) if position != 0)
+        turnover = sum(abs(position - previous) for position, previous in zip(positions, held))
+        pnl = gross_pnl - fee_rate * turnover
+        equity *= 1 + pnl
+        peak = max(peak, equity)
+        held = positions
+        pnls.append(pnl)
+        equities.append(equity)
+        drawdowns.append(equity / peak - 1)
+        turnovers.append(turnover)
+    return {'pnl': pnls, 'equity': equities, 'drawdown': drawdowns, 'turnover': turnovers}
+
+
+def make_market(n_times: int = 50, n_tickers: int = 4, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    scores = rng.uniform(-1, 1, (n_times, n_tickers))
+    forward_returns = rng.normal(0, 0.02, (n_times, n_tickers))
+    # A ticker listed late and a missing return
+    forward_returns[:10, 0] = np.nan
+    forward_returns[20, 2] = np.nan
+    scores[5, 1] = np.nan
+    return scores, forward_returns
+
+
+def test_batched_backtest_matches_the_loop():
+    scores, forward_returns = make_market()
+    thresholds = [0.0, 0.3, 0.6]
+    signals = threshold_signals(scores, thresholds)
+    result = run_backtest(signals, forward_returns, fee_rate=0.001, max_position=0.8, max_gross=2.0)
+
+    assert result['positions'].shape == (3, 50, 4)
+    for k, threshold in enumerate(thresholds):
+        variant = np.where(np.abs(scores) >= threshold, scores, 0.0)
+        expected = loop_backtest(variant, forward_returns, fee_rate=0.001, max_position=0.8, max_gross=2.0)
+        for key, values in expected.items():
+            np.testing.assert_allclose(result[key][k], values, atol=1e-12)
+        assert result['total_return'][k] == expected['equity'][-1] - 1
+        assert result['max_drawdown'][k] == min(expected['drawdown'])
+
+
+def test_sweep_summarizes_one_row_per_threshold():
+    scores, forward_returns = make_market()
+    times = pd.date_range('2024-01-01', periods=50)
+    tickers = ['AUSDT', 'BUSDT', 'CUSDT', 'DUSDT']
+    summary = sweep_thresholds(pd.DataFrame(scores, times, tickers), pd.DataFrame(forward_returns, times, tickers),
+                               thresholds=[0.0, 0.5], fee_rate=0.0)
+
+    assert summary.index.tolist() == [0.0, 0.5]
+    expected = loop_backtest(np.where(np.abs(scores) >= 0.5, scores, 0.0), forward_returns, fee_rate=0.0)
+    assert summary.loc[0.5, 'total_return'] == expected['equity'][-1] - 1
+    assert summary['total_fees'].tolist() == [0.0, 0.0]
+
+
+def test_to_matrix_pivots_time_by_ticker():
+    index = pd.MultiIndex.from_tuples(
+        [('2024-01-02', 'B'), ('2024-01-01', 'A'), ('2024-01-01', 'B')], names=['time', 'ticker']
+    )
+    matrix = to_matrix(pd.Series([3.0, 1.0, 2.0], index=index), tickers=['B', 'A', 'C'])
+
+    assert matrix.index.tolist() == ['2024-01-01', '2024-01-02']
+    assert matrix.columns.tolist() == ['B', 'A', 'C']
+    np.testing.assert_array_equal(matrix.to_numpy(), [[2.0, 1.0, np.nan], [3.0, np.nan, np.nan]])
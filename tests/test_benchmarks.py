@@ -0,0 +1,37 @@
+import multiprocessing
+import sys
+
+import pytest
+
+from src.benchmarks import IMPORT_GUARDS, _get_result, benchmark_accumulation, benchmark_pipeline_suite, import_times
+
+
+def test_crashed_child_raises_instead_of_hanging():
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=sys.exit, args=(3,))
+    process.start()
+    with pytest.raises(RuntimeError, match='exited with code 3'):
+        _get_result(queue, process, poll_seconds=0.1)
+    process.join()
+
+
+def test_accumulation_variants_agree():
+    results = benchmark_accumulation(n_symbols=3, days_back=30)
+    assert results['rows'].nunique() == 1
+
+
+def test_failed_suite_scale_raises(tmp_path):
+    with pytest.raises(RuntimeError, match='failed with exit code 1|exited with code 1'):
+        benchmark_pipeline_suite([2], days=30, file_path_metrics=str(tmp_path / 'missing.txt'))
+
+
+@pytest.mark.parametrize('module', sorted(IMPORT_GUARDS))
+def test_entry_points_do_not_import_heavy_modules(module):
+    # Fresh interpreter per module, python -X importtime lists everything the import loaded
+    loaded = import_times(module)
+    assert module in loaded
+    assert not [
+        name for name in loaded for heavy in IMPORT_GUARDS[module]['forbidden']
+        if name == heavy or name.startswith(f"{heavy}.")
+    ]
@@ -0,0 +1,114 @@
+import pandas as pd
+
+from src.config import read_metric_metadata
+from src.data_quality_checks import check_data_quality, check_data_quality_streaming, iter_coinmetrics_batches
+from src.fakes import FakeCoinMetricsClient
+
+METRICS_FILE = 'data/static/metrics.txt'
+METADATA_FILE = 'data/static/metric_metadata.csv'
+METRICS = ['AdrActCnt', 'AssetEODCompletionTime', 'CapMrktCurUSD']
+
+
+def write_metrics(tmp_path) -> tuple:
+    """
+    CSV export of three assets, the first one without any CapMrktCurUSD value and with
+    a repeated day, plus a metrics file listing the exported metrics.
+    """
+    client = FakeCoinMetricsClient(n_assets=3, latency=0, metric_kinds=read_metric_metadata(METRICS_FILE, METADATA_FILE))
+    data = client.get_asset_metrics(client.assets(), METRICS, start_time='2024-01-01', end_time='2024-03-01').to_dataframe()
+    data.loc[data['asset'] == 'sym0000', 'CapMrktCurUSD'] = pd.NA
+    data = pd.concat([data.iloc[:30], data.iloc[29:30], data.iloc[30:]], ignore_index=True)
+    source = tmp_path / 'metrics.csv'
+    data.to_csv(source, index=False)
+    metrics_file = tmp_path / 'metrics.txt'
+    metrics_file.write_text('\n'.join(METRICS) + '\n')
+    return str(source), str(metrics_file)
+
+
+def test_csv_batches_get_the_api_dtypes(tmp_path):
+    source, metrics_file = write_metrics(tmp_path)
+    metric_kinds = read_metric_metadata(metrics_file, METADATA_FILE)
+    for batch in iter_coinmetrics_batches(source, batch_size=25, metric_kinds=metric_kinds):
+        assert str(batch['AdrActCnt'].dtype) == 'Int64'
+        assert str(batch['CapMrktCurUSD'].dtype) == 'Float64'
+        assert str(batch['AssetEODCompletionTime'].dtype) == 'datetime64[ns, UTC]'
+
+
+def test_streaming_report_matches_in_memory_report(tmp_path):
+    source, metrics_file = write_metrics(tmp_path)
+    streamed = check_data_quality_streaming(source, metrics_file, batch_size=30, file_path_metadata=METADATA_FILE)
+    data = pd.concat(iter_coinmetrics_batches(source, 10**6, read_metric_metadata(metrics_file, METADATA_FILE)), ignore_index=True)
+    in_memory = check_data_quality(data, metrics_file, file_path_metadata=METADATA_FILE)
+    pd.testing.assert_frame_equal(streamed, in_memory)
+
+    duplicates = streamed[streamed['check'] == 'no_duplicates'].set_index('asset')
+    # The repeated row is the first row of the second batch
+    assert duplicates['detail'].to_dict() == {'sym0000': '1 duplicated rows', 'sym0001': '', 'sym0002': ''}
+
+
+def test_streaming_counts_repeated_keys_across_batches(tmp_path):
+    source, metrics_file = write_metrics(tmp_path)
+    data = pd.read_csv(source)
+    # Repeat a day of sym0001 far from its first occurrence, one inside a batch and one
+    # several batches later, neither on a batch boundary
+    data = pd.concat([data.iloc[:75], data.iloc[[65]], data.iloc[75:], data.iloc[[70]]], ignore_index=True)
+    data.to_csv(source, index=False)
+
+    streamed = check_data_quality_streaming(source, metrics_file, batch_size=20, file_path_metadata=METADATA_FILE)
+    full = pd.concat(iter_coinmetrics_batches(source, 10**6, read_metric_metadata(metrics_file, METADATA_FILE)), ignore_index=True)
+    in_memory = check_data_quality(full, metrics_file, file_path_metadata=METADATA_FILE)
+    pd.testing.assert_frame_equal(streamed, in_memory)
+
+    duplicates = streamed[streamed['check'] == 'no_duplicates'].set_index('asset')
+    assert duplicates.loc['sym0001', 'detail'] == '2 duplicated rows'
+
+
+def test_float64_is_only_allowed_for_level_metrics(tmp_path):
+    metrics_file = tmp_path / 'metrics.txt'
+    metrics_file.write_text('CapRealUSD\nCapMVRVCur\n')
+    data = pd.DataFrame({
+        'asset': ['btc'] * 3,
+        'time': pd.date_range('2024-01-01', periods=3, tz='UTC'),
+        'CapRealUSD': [1.0, 2.0, None],
+        'CapMVRVCur': [1.0, 2.0, None],
+    })
+    data_types = lambda report: report.loc[report['check'] == 'data_types', ['passed', 'detail']].iloc[0].tolist()
+
+    assert data_types(check_data_quality(data, str(metrics_file), file_path_metadata=METADATA_FILE)) == [
+        False, 'CapMVRVCur is of type float64'
+    ]
+    data['CapMVRVCur'] = data['CapMVRVCur'].astype('float32')
+    assert data_types(check_data_quality(data, str(metrics_file), file_path_metadata=METADATA_FILE)) == [True, '']
+
+
+def test_compact_fallback_dtypes_pass_the_type_check(tmp_path):
+    from src.schema import apply_dtype_policy
+
+    metrics_file = tmp_path / 'metrics.txt'
+    metrics_file.write_text('AdrActCnt\nCapMVRVCur\n')
+    data = pd.DataFrame({
+        'asset': ['btc'] * 3,
+        'time': pd.date_range('2024-01-01', periods=3, tz='UTC'),
+        # A fractional counter and a float beyond the float32 range
+        'AdrActCnt': [1.5, 2.0, None],
+        'CapMVRVCur': [1e39, 2.0, None],
+    })
+    compact = apply_dtype_policy(data, read_metric_metadata(str(metrics_file), METADATA_FILE))
+    assert compact[['AdrActCnt', 'CapMVRVCur']].dtypes.astype(str).tolist() == ['Float64', 'Float64']
+    assert compact['CapMVRVCur'].iloc[0] == 1e39
+
+    report = check_data_quality(compact, str(metrics_file), file_path_metadata=METADATA_FILE).set_index('check')
+    assert report.loc['data_types', ['passed', 'detail']].tolist() == [True, '']
+
+
+def test_repeated_time_is_a_duplicate_anywhere(tmp_path):
+    metrics_file = tmp_path / 'metrics.txt'
+    metrics_file.write_text('CapMVRVCur\n')
+    data = pd.DataFrame({
+        'asset': ['btc'] * 4,
+        'time': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-01', '2024-01-03'], utc=True),
+        'CapMVRVCur': pd.array([1.0, 2.0, 1.0, None], dtype='Float64'),
+    })
+    report = check_data_quality(data, str(metrics_file), file_path_metadata=METADATA_FILE).set_index('check')
+    assert report.loc['no_duplicates', 'detail'] == '1 duplicated rows'
+    assert report.loc['dates_sorted', 'detail'] == '1 dates out of order'
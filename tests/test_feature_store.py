@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.feature_store import append_features, read_features
+
+
+def make_features(start: str, days: int, volume_dtype: str = 'int64') -> pd.DataFrame:
+    times = pd.date_range(start, periods=days)
+    features = pd.DataFrame({
+        'dateTime': np.repeat(times, 2),
+        'asset': np.tile(['btc', 'eth'], days),
+        'ticker': np.tile(['BTCUSDT', 'ETHUSDT'], days),
+        'close': np.arange(2 * days, dtype='float64'),
+    })
+    features['volume'] = np.arange(2 * days).astype(volume_dtype)
+    return features
+
+
+def test_current_day_is_held_back_until_complete(tmp_path):
+    root = str(tmp_path)
+    partial = make_features('2024-01-01', 5)
+    partial.loc[partial['dateTime'] == '2024-01-05', 'close'] = np.nan
+    assert append_features(root, partial, complete_before='2024-01-05') == 8
+
+    # The next day's run fetches the finished day again
+    complete = make_features('2024-01-03', 4)
+    assert append_features(root, complete, complete_before='2024-01-06') == 2
+    stored = read_features(root)
+    assert len(stored) == 10
+    assert stored['close'].notna().all()
+    assert stored.loc['2024-01-05', 'close'].tolist() == [4.0, 5.0]
+
+
+def test_stored_types_are_kept(tmp_path):
+    root = str(tmp_path)
+    append_features(root, make_features('2024-01-01', 3), complete_before='2024-02-01')
+    append_features(root, make_features('2024-01-04', 3, volume_dtype='float64'), complete_before='2024-02-01')
+    stored = read_features(root)
+    assert stored['volume'].dtype == 'int64'
+    assert len(stored) == 12
+
+    changed = make_features('2024-01-07', 3)
+    changed['volume'] = 'high'
+    with pytest.raises(ValueError, match="Feature 'volume' is stored as int64"):
+        append_features(root, changed, complete_before='2024-02-01')
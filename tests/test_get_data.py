@@ -0,0 +1,134 @@
+import os
+
+import pandas as pd
+import pytest
+
+from src.fakes import FakeCoinMetricsClient
+from src.get_data import read_asset_metrics_dataset, write_asset_metrics_dataset
+
+
+def test_read_keeps_metrics_missing_from_the_first_window(tmp_path):
+    for asset in ['btc', 'eth']:
+        directory = tmp_path / 'metric_group=000' / f'asset={asset}'
+        os.makedirs(directory)
+        days = pd.date_range('2024-01-01', periods=3, tz='UTC')
+        pd.DataFrame({'time': days, 'A': [1.0, 2.0, 3.0]}).to_parquet(directory / '2024-01-01.parquet', index=False)
+        days = pd.date_range('2025-01-01', periods=3, tz='UTC')
+        pd.DataFrame({'time': days, 'A': [4.0, 5.0, 6.0], 'B': [7.0, 8.0, None]}).to_parquet(directory / '2025-01-01.parquet', index=False)
+
+    data = read_asset_metrics_dataset(str(tmp_path))
+    assert list(data.columns) == ['asset', 'time', 'A', 'B']
+    assert data['B'].notna().sum() == 4
+
+    eth = read_asset_metrics_dataset(str(tmp_path), assets=['eth'], metrics=['B'])
+    assert list(eth.columns) == ['asset', 'time', 'B']
+    assert eth['B'].tolist()[3:5] == [7.0, 8.0]
+
+
+def test_rewrite_with_other_groups_drops_stale_files(tmp_path):
+    client = FakeCoinMetricsClient(n_assets=2, latency=0)
+    assets = client.assets()
+    write_asset_metrics_dataset(client, assets, ['a', 'b', 'c'], '2024-01-01', '2024-03-01', str(tmp_path),
+                                metrics_per_group=1, window_days=30)
+    write_asset_metrics_dataset(client, assets, ['c', 'a'], '2024-01-01', '2024-03-01', str(tmp_path),
+                                metrics_per_group=2, window_days=30)
+
+    data = read_asset_metrics_dataset(str(tmp_path))
+    expected = client.get_asset_metrics(assets, ['c', 'a'], start_time='2024-01-01', end_time='2024-03-01',
+                                        end_inclusive=False).to_dataframe()
+    assert sorted(os.listdir(tmp_path)) == ['metric_group=000']
+    assert list(data.columns) == ['asset', 'time', 'c', 'a']
+    pd.testing.assert_frame_equal(data[['a', 'c']].astype('float64'), expected[['a', 'c']].astype('float64'))
+
+
+def test_dumped_assets_are_fetched_from_their_own_last_day(tmp_path, monkeypatch):
+    import src.convert_dumps
+    import src.get_data
+
+    client = FakeCoinMetricsClient(n_assets=4, latency=0)
+    requests = []
+    fetch = client.get_asset_metrics
+
+    def get_asset_metrics(assets, metrics, frequency='1d', start_time=None, **kwargs):
+        requests.append((start_time, sorted(assets)))
+        return fetch(assets, metrics, frequency, start_time, **kwargs)
+
+    client.get_asset_metrics = get_asset_metrics
+    manifest = {'sym0000': {'last_day': '2099-01-01'}, 'sym0001': {'last_day': '2099-01-01'}, 'sym0002': {'last_day': '2000-01-01'}}
+    reads = []
+    monkeypatch.setattr(src.get_data, 'initialize_coin_metrics_client', lambda: client)
+    monkeypatch.setattr(src.convert_dumps, 'read_dump_manifest', lambda root: manifest)
+    monkeypatch.setattr(src.convert_dumps, 'read_coinmetrics_history',
+                        lambda root, assets, metrics, start, end: reads.append((sorted(assets), end)) or pd.DataFrame())
+    (tmp_path / 'metrics.txt').write_text('a\n')
+    (tmp_path / 'assets.txt').write_text('\n'.join(client.assets()) + '\n')
+
+    data = src.get_data.get_coinmetrics_data(5, str(tmp_path / 'metrics.txt'), str(tmp_path / 'assets.txt'),
+                                             history_dir=str(tmp_path))
+    start = requests[0][0]
+    # sym0002's dump ends before the window, it is fetched with the asset without a dump
+    assert requests == [(start, ['sym0002', 'sym0003']), ('2099-01-01', ['sym0000', 'sym0001'])]
+    assert reads == [(['sym0000', 'sym0001'], '2099-01-01')]
+    assert sorted(data['asset'].unique()) == ['sym0002', 'sym0003']
+
+
+def test_candlestick_fetch_records_the_received_bytes():
+    from src.fakes import FakeBinanceClient
+    from src.get_data import fetch_candlestick_data
+    from src.instrumentation import METRICS
+
+    client = FakeBinanceClient(n_symbols=1, latency=0)
+    METRICS.reset()
+    fetch_candlestick_data(client, client.symbols()[0], '1d', days_back=2000)
+    fetch_candlestick_data(client, client.symbols()[0], '1d', days_back=2000)
+
+    summary = {operation['name']: operation for operation in METRICS.summaries()}['get_data.fetch_candlestick_data']
+    # Two pages of 1500 candles per call, the hook is installed once
+    assert len(client.session.hooks['response']) == 1
+    assert summary['bytes'] > summary['rows'] * 100
+
+
+def test_empty_history_and_api_give_an_empty_frame(tmp_path, monkeypatch):
+    import src.convert_dumps
+    import src.get_data
+
+    client = FakeCoinMetricsClient(n_assets=1, latency=0)
+    monkeypatch.setattr(src.get_data, 'initialize_coin_metrics_client', lambda: client)
+    monkeypatch.setattr(src.get_data, 'fetch_asset_metrics', lambda *args: pd.DataFrame())
+    monkeypatch.setattr(src.convert_dumps, 'read_dump_manifest', lambda root: {'sym0000': {'last_day': '2099-01-01'}})
+    monkeypatch.setattr(src.convert_dumps, 'read_coinmetrics_history', lambda *args: pd.DataFrame())
+    (tmp_path / 'metrics.txt').write_text('a\nb\n')
+    (tmp_path / 'assets.txt').write_text('sym0000\n')
+
+    data = src.get_data.get_coinmetrics_data(5, str(tmp_path / 'metrics.txt'), str(tmp_path / 'assets.txt'),
+                                             history_dir=str(tmp_path))
+    assert data.empty
+    assert list(data.columns) == ['asset', 'time', 'a', 'b']
+
+
+def test_rate_limited_fetch_retries_after_the_server_delay():
+    from src.fakes import FakeBinanceClient
+    from src.get_data import KLINE_COLUMNS, binance_rate_limiter, fetch_candlestick_data_with_retry
+
+    client = FakeBinanceClient(n_symbols=1, latency=0, error_rate=0.5, retry_after=0.01, seed=3)
+    symbol = client.symbols()[0]
+    data = fetch_candlestick_data_with_retry(client, symbol, '1d', days_back=100, rate_limiter=binance_rate_limiter(),
+                                             max_retries=20, backoff_base=10)
+
+    # Every failed page was retried after Retry-After instead of the 10s backoff
+    assert client.n_errors > 0
+    assert client.n_requests == client.n_errors + 1
+    assert list(data.columns) == KLINE_COLUMNS
+    assert len(data) == 100
+    expected = FakeBinanceClient(n_symbols=1, latency=0)
+    pd.testing.assert_frame_equal(data, fetch_candlestick_data_with_retry(expected, symbol, '1d', days_back=100))
+
+
+def test_fetch_gives_up_after_max_retries():
+    from src.fakes import FakeAPIException, FakeBinanceClient
+    from src.get_data import fetch_candlestick_data_with_retry
+
+    client = FakeBinanceClient(n_symbols=1, latency=0, error_rate=1.0, retry_after=0.01)
+    with pytest.raises(FakeAPIException):
+        fetch_candlestick_data_with_retry(client, client.symbols()[0], '1d', days_back=10, max_retries=3)
+    assert client.n_requests == 4
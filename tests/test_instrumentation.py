@@ -0,0 +1,16 @@
+from src.instrumentation import OperationMetrics
+
+
+def test_operation_metrics_keep_a_bounded_sample():
+    metrics = OperationMetrics('op', sample_capacity=100)
+    for milliseconds in range(1000):
+        metrics.add(milliseconds / 1000)
+    summary = metrics.summary()
+    assert len(metrics.latencies_ms) == 100
+    assert summary['calls'] == 1000
+    assert summary['total_s'] == 499.5
+    assert summary['mean_ms'] == 499.5
+    assert summary['max_ms'] == 999.0
+    # Percentiles of the last 100 calls
+    assert summary['p50_ms'] == 949.5
+    assert sum(summary['histogram'].values()) == 1000
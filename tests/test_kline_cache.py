@@ -0,0 +1,36 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.kline_cache import append_klines, read_cached_klines, read_manifest, symbol_cache_dir, update_cached_klines
+
+
+def daily_klines(start: str, days: int) -> pd.DataFrame:
+    times = pd.date_range(start, periods=days, freq='D')
+    return pd.DataFrame({'dateTime': times, 'ticker': 'BTCUSDT', 'close': np.arange(days, dtype='float64')})
+
+
+def test_refreshes_are_compacted_past_max_parts(tmp_path):
+    cache_dir = str(tmp_path)
+    klines = daily_klines('2024-01-01', 40)
+    for day in range(1, 41):
+        # One refresh per day, the candle of the current day is still open
+        now = datetime(2024, 1, 1) + pd.Timedelta(days=day)
+        append_klines(cache_dir, 'BTCUSDT', '1d', klines.iloc[max(0, day - 3):day + 1], now=now, max_parts=10)
+
+    manifest = read_manifest(cache_dir, 'BTCUSDT', '1d')
+    assert len(manifest['parts']) <= 10
+    files = sorted(os.listdir(symbol_cache_dir(cache_dir, 'BTCUSDT', '1d')))
+    assert files == sorted(manifest['parts'] + ['_manifest.json'])
+    cached = read_cached_klines(cache_dir, 'BTCUSDT', '1d')
+    pd.testing.assert_frame_equal(cached.sort_values('dateTime').reset_index(drop=True), klines)
+
+
+def test_open_candle_is_returned_but_not_cached(tmp_path):
+    cache_dir = str(tmp_path)
+    klines = daily_klines('2024-01-01', 5)
+    history = update_cached_klines(cache_dir, 'BTCUSDT', '1d', klines, now=datetime(2024, 1, 5, 12))
+    assert len(history) == 5
+    assert len(read_cached_klines(cache_dir, 'BTCUSDT', '1d')) == 4
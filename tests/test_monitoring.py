@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.monitoring import DriftMonitor, EOD_COMPLETION_COLUMN, monitored_metrics, update_monitor
+
+REFERENCE_END = '2025-09-01'
+
+
+def make_data(n_assets: int = 20, n_days: int = 700, seed: int = 0) -> pd.DataFrame:
+    """
+    Stationary daily metrics in the get_coinmetrics_data layout.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.date_range('2024-01-01', periods=n_days, tz='UTC')
+    assets = [f"a{i:03d}" for i in range(n_assets)]
+    data = pd.DataFrame({'asset': np.repeat(assets, n_days), 'time': np.tile(days, n_assets)})
+    data['x'] = rng.normal(size=len(data))
+    data['y'] = rng.lognormal(size=len(data))
+    data[EOD_COMPLETION_COLUMN] = data['time'] + pd.Timedelta(days=1)
+    return data
+
+
+def is_live(data: pd.DataFrame) -> np.ndarray:
+    return (data['time'] >= pd.Timestamp(REFERENCE_END, tz='UTC')).to_numpy()
+
+
+def live_days(data: pd.DataFrame) -> pd.DatetimeIndex:
+    return pd.DatetimeIndex(np.unique(data.loc[is_live(data), 'time']))
+
+
+@pytest.mark.parametrize('halflife_days', [30.0, None])
+def test_daily_updates_match_one_bulk_update(halflife_days):
+    data = make_data()
+    metrics = monitored_metrics(data)
+    bulk = DriftMonitor(metrics, halflife_days=halflife_days).fit_reference(data, end=REFERENCE_END)
+    daily = DriftMonitor(metrics, halflife_days=halflife_days).fit_reference(data, end=REFERENCE_END)
+    bulk.update(data)
+    for day in live_days(data):
+        # Every daily fetch returns the whole history, as in the pipeline
+        daily.update(data[(data['time'] <= day).to_numpy()])
+
+    for field in ('live_weight', 'live_weight2', 'live_mean', 'live_m2', 'live_hist', 'live_hist_sum'):
+        np.testing.assert_allclose(daily.arrays[field], bulk.arrays[field], rtol=1e-9, err_msg=field)
+    np.testing.assert_array_equal(daily.arrays['last_updated'], bulk.arrays['last_updated'])
+
+
+def test_undecayed_moments_match_pandas():
+    data = make_data()
+    monitor = DriftMonitor(['x', 'y'], halflife_days=None).fit_reference(data, end=REFERENCE_END)
+    monitor.update(data)
+    live = data[is_live(data)].groupby('asset')[['x', 'y']]
+    moments = monitor.moments('live')
+    rows = moments['weight']
+    pd.testing.assert_frame_equal(moments['mean'], live.mean(), check_names=False)
+    # The monitor keeps the population variance
+    pd.testing.assert_frame_equal(moments['variance'] * rows / (rows - 1), live.var(), check_names=False)
+
+
+def test_interpolated_median_is_close():
+    data = make_data()
+    monitor = DriftMonitor(['x', 'y'], halflife_days=None).fit_reference(data, end=REFERENCE_END)
+    monitor.update(data)
+    median = monitor.quantiles((0.5,))[0.5]
+    expected = data[is_live(data)].groupby('asset')[['x', 'y']].median()
+    # Interpolating within a reference decile bin is off by a fraction of its width
+    assert (median['x'] - expected['x']).abs().max() < 0.15
+    assert ((median['y'] - expected['y']).abs() / expected['y']).max() < 0.1
+
+
+def test_outer_quantiles_forget_old_extremes():
+    data = make_data(n_assets=1)
+    first_live = data.index[is_live(data)][0]
+    data.loc[first_live, 'x'] = -100.0
+    monitor = DriftMonitor(['x'], halflife_days=10).fit_reference(data, end=REFERENCE_END)
+    monitor.update(data)
+    # 300 days and 30 half-lives later the outlier has no weight left
+    assert monitor.quantiles((0.01,))[0.01].iloc[0, 0] > -5
+
+
+def test_report_flags_injected_problems():
+    data = make_data(n_assets=200)
+    live = is_live(data)
+    last_days = data['time'].max() - pd.Timedelta(days=6)
+    data.loc[live & (data['asset'] == 'a003'), 'x'] += 1.0
+    data.loc[live & (data['asset'] == 'a004'), 'y'] *= 2
+    data.loc[(data['asset'] == 'a005') & (data['time'] > last_days), 'y'] = np.nan
+    data.loc[(data['asset'] == 'a006') & (data['time'] > last_days + pd.Timedelta(days=2)), EOD_COMPLETION_COLUMN] = pd.NaT
+
+    monitor = DriftMonitor(['x', 'y']).fit_reference(data, end=REFERENCE_END)
+    monitor.update(data)
+    report = monitor.report(as_of=str(data['time'].max().date()))
+    failed = report[~report['passed']]
+    flagged = set(zip(failed['asset'], failed['check']))
+
+    assert {('a003', 'no_distribution_shift'), ('a003', 'no_mean_shift')} <= flagged
+    assert ('a004', 'no_distribution_shift') in flagged
+    assert ('a005', 'metrics_fresh') in flagged
+    assert ('a006', 'eod_completion_fresh') in flagged
+    # Stable metrics are rarely flagged once the PSI sampling noise is accounted for
+    stable = failed[~failed['asset'].isin(['a003', 'a004', 'a005', 'a006'])]
+    assert len(stable) <= 0.02 * 2 * 196
+    assert list(report.columns) == ['asset', 'check', 'passed', 'detail']
+
+
+def test_compact_completion_time_is_not_a_metric(tmp_path):
+    data = make_data(n_assets=3)
+    # Compact data stores the completion time as Int64 nanoseconds
+    data[EOD_COMPLETION_COLUMN] = pd.array(data[EOD_COMPLETION_COLUMN].astype('int64'), dtype='Int64')
+    data.loc[data['time'] == data['time'].max(), EOD_COMPLETION_COLUMN] = pd.NA
+    assert EOD_COMPLETION_COLUMN not in monitored_metrics(data)
+
+    state_path = str(tmp_path / 'monitor.npz')
+    update_monitor(state_path, data[~is_live(data)])
+    report = update_monitor(state_path, data, as_of=str(data['time'].max().date()))
+    assert report['passed'].all(), report[~report['passed']]
+    assert not report['detail'].str.contains(EOD_COMPLETION_COLUMN).any()
+
+
+def test_save_and_load_keep_the_report(tmp_path):
+    data = make_data(n_assets=5)
+    monitor = DriftMonitor(['x', 'y']).fit_reference(data, end=REFERENCE_END)
+    monitor.update(data)
+    path = str(tmp_path / 'monitor.npz')
+    monitor.save(path)
+    as_of = str(data['time'].max().date())
+    pd.testing.assert_frame_equal(DriftMonitor.load(path).report(as_of=as_of), monitor.report(as_of=as_of))
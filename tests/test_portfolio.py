@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from src.portfolio import apply_exposure_caps, build_portfolio, inverse_vol_weights, limit_turnover, portfolio_weights
+
+
+def loop_portfolio(scores, volatility, target_vol, vol_floor, max_position, max_gross, max_net, max_turnover) -> np.ndarray:
+    """
+    Reference portfolio, one period and one ticker at a time.
+    """
+    n_times, n_tickers = scores.shape
+    held = [0.0] * n_tickers
+    result = np.zeros((n_times, n_tickers))
+    for t in range(n_times):
+        weights = []
+        for n in range(n_tickers):
+            weight = scores[t][n] * target_vol / max(volatility[t][n], vol_floor)
+            weight = 0.0 if np.isnan(weight) else min(max(weight, -max_position), max_position)
+            weights.append(weight)
+        longs = sum(weight for weight in weights if weight > 0)
+        shorts = -sum(weight for weight in weights if weight < 0)
+        # Shrink the side in excess of the net cap, then everything to the gross cap
+        long_scale = (shorts + max_net) / longs if longs - shorts > max_net else 1.0
+        short_scale = (longs + max_net) / shorts if shorts - longs > max_net else 1.0
+        gross = longs * long_scale + shorts * short_scale
+        gross_scale = max_gross / gross if gross > max_gross else 1.0
+        weights = [weight * (long_scale if weight > 0 else short_scale) * gross_scale for weight in weights]
+
+        trades = [weight - previous for weight, previous in zip(weights, held)]
+        turnover = sum(abs(trade) for trade in trades)
+        trade_scale = max_turnover / turnover if turnover > max_turnover else 1.0
+        held = [previous + trade * trade_scale for previous, trade in zip(held, trades)]
+        result[t] = held
+    return result
+
+
+def make_inputs(n_times: int = 40, n_tickers: int = 5, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    # Mostly long scores, so that the net cap binds
+    scores = rng.uniform(-0.5, 1, (n_times, n_tickers))
+    volatility = rng.uniform(0.001, 0.08, (n_times, n_tickers))
+    scores[3, 1] = np.nan
+    volatility[7, 2] = np.nan
+    return scores, volatility
+
+
+def test_portfolio_matches_the_loop_and_respects_the_limits():
+    scores, volatility = make_inputs()
+    limits = {'target_vol': 0.02, 'vol_floor': 0.005, 'max_position': 0.5, 'max_gross': 1.5, 'max_net': 0.3,
+              'max_turnover': 0.4}
+    weights = build_portfolio(scores, volatility, **limits)
+
+    np.testing.assert_allclose(weights, loop_portfolio(scores, volatility, **limits), atol=1e-12)
+    previous = np.vstack([np.zeros((1, 5)), weights[:-1]])
+    assert (np.abs(weights) <= 0.5 + 1e-12).all()
+    assert (np.abs(weights).sum(axis=1) <= 1.5 + 1e-12).all()
+    assert (np.abs(weights.sum(axis=1)) <= 0.3 + 1e-12).all()
+    assert (np.abs(weights - previous).sum(axis=1) <= 0.4 + 1e-12).all()
+
+
+def test_inverse_vol_weights_floor_the_volatility():
+    weights = inverse_vol_weights(np.array([[1.0, -0.5, 1.0, np.nan]]), np.array([[0.04, 0.01, 0.001, 0.02]]))
+    np.testing.assert_allclose(weights, [[0.5, -1.0, 4.0, 0.0]])
+
+
+def test_caps_and_turnover_broadcast_over_variants():
+    scores, volatility = make_inputs()
+    variants = np.stack([scores, -scores, scores / 2])
+    weights = inverse_vol_weights(variants, volatility)
+    capped = apply_exposure_caps(weights, max_position=0.5, max_gross=1.5, max_net=0.3)
+    limited = limit_turnover(capped, max_turnover=0.4)
+
+    for k in range(3):
+        np.testing.assert_allclose(capped[k], apply_exposure_caps(weights[k], 0.5, 1.5, 0.3))
+        np.testing.assert_allclose(limited[k], limit_turnover(capped[k], 0.4))
+
+
+def test_portfolio_weights_align_on_the_predictions():
+    index = pd.MultiIndex.from_product([pd.date_range('2024-01-01', periods=3), ['A', 'B']], names=['time', 'ticker'])
+    up_probability = pd.Series([0.9, 0.2, 0.5, 0.6, 0.75, 0.25], index=index)
+    features = pd.DataFrame({'vol_20D': [0.02, 0.04, 0.02, 0.01, 0.01, 0.02]}, index=index)
+
+    weights = portfolio_weights(up_probability, features, max_gross=None)
+
+    assert weights.columns.tolist() == ['A', 'B']
+    np.testing.assert_allclose(weights.to_numpy(), [[0.8, -0.3], [0.0, 0.4], [1.0, -0.5]])
@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.model_store import MANIFEST_FILE, export_model
+from src.prediction_service import ModelRegistry, PredictionService
+
+
+def export_logistic(path, seed: int = 0) -> tuple:
+    """
+    Fit a small logistic regression on scaled features and store it with its scaler.
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(5, 2, (100, 3))
+    y = (X[:, 0] + rng.normal(0, 1, 100) > 5).astype(int)
+    mean, scale = X.mean(axis=0), X.std(axis=0)
+    model = LogisticRegression().fit((X - mean) / scale, y)
+    export_model(model, str(path), mean, scale)
+    return model, mean, scale
+
+
+def test_registry_evicts_the_least_recently_used_model(tmp_path):
+    paths = [str(tmp_path / name) for name in 'abc']
+    for seed, path in enumerate(paths):
+        export_logistic(path, seed)
+    registry = ModelRegistry(max_models=2)
+
+    first = registry.get(paths[0])
+    registry.get(paths[1])
+    assert registry.get(paths[0]) is first
+    registry.get(paths[2])
+    # b was used less recently than a
+    assert registry.loaded_paths() == [paths[0], paths[2]]
+    assert registry.loads == 3
+    registry.get(paths[1])
+    assert registry.loaded_paths() == [paths[2], paths[1]]
+    assert registry.loads == 4
+
+
+def test_registry_reloads_changed_models(tmp_path):
+    path = tmp_path / 'model'
+    export_logistic(path, seed=0)
+    manifest = path / MANIFEST_FILE
+    by_mtime, by_hash = ModelRegistry(validation='mtime'), ModelRegistry(validation='hash')
+    for registry in (by_mtime, by_hash):
+        registry.get(str(path))
+
+    # A touched but unchanged model is only reloaded by the mtime validation
+    stat = os.stat(manifest)
+    os.utime(manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    for registry in (by_mtime, by_hash):
+        registry.get(str(path))
+    assert (by_mtime.loads, by_hash.loads) == (2, 1)
+
+    model, _, _ = export_logistic(path, seed=1)
+    stat = os.stat(manifest)
+    os.utime(manifest, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    for registry in (by_mtime, by_hash):
+        np.testing.assert_array_equal(registry.get(str(path)).model.coef_, model.coef_)
+    assert (by_mtime.loads, by_hash.loads) == (3, 2)
+
+
+def test_registry_rejects_unknown_validation():
+    with pytest.raises(ValueError):
+        ModelRegistry(validation='size')
+
+
+class RecordingModel:
+    """
+    Classifier stand-in recording the arrays it predicts on.
+    """
+
+    def __init__(self):
+        self.inputs = []
+
+    def predict(self, X):
+        self.inputs.append(X)
+        return X[:, 0]
+
+
+def test_service_scales_once_per_scaler(tmp_path):
+    mean, scale = np.array([1.0, 2.0]), np.array([2.0, 4.0])
+    other_mean, other_scale = np.array([0.0, 1.0]), np.array([1.0, 1.0])
+    models = {
+        # Two models of the same fold loaded separately hold equal statistics in distinct arrays
+        'first': (RecordingModel(), mean.copy(), scale.copy()),
+        'second': (RecordingModel(), mean.copy(), scale.copy()),
+        'other': (RecordingModel(), other_mean, other_scale),
+        'raw': (RecordingModel(), None, None),
+    }
+    registry = ModelRegistry(loader=lambda path: models[os.path.basename(path)])
+    for name in models:
+        (tmp_path / name).write_bytes(b'')
+    service = PredictionService({name: str(tmp_path / name) for name in models}, registry=registry)
+    frame = pd.DataFrame({'x': [1.0, 3.0, 5.0], 'z': [2.0, 6.0, 10.0]}, index=[10, 11, 12])
+
+    predictions = service.predict(frame)
+
+    inputs = {name: model.inputs[0] for name, (model, _, _) in models.items()}
+    assert inputs['first'] is inputs['second']
+    assert inputs['other'] is not inputs['first']
+    np.testing.assert_allclose(inputs['first'], (frame.to_numpy() - mean) / scale)
+    np.testing.assert_allclose(inputs['other'], frame.to_numpy() - other_mean)
+    np.testing.assert_allclose(inputs['raw'], frame.to_numpy())
+    assert list(predictions.columns) == list(models)
+    assert predictions.index.tolist() == [10, 11, 12]
+
+
+def test_service_predicts_like_the_exported_model(tmp_path):
+    model, mean, scale = export_logistic(tmp_path / 'model')
+    service = PredictionService({'logit': str(tmp_path / 'model')})
+    frame = pd.DataFrame(np.random.default_rng(3).normal(5, 2, (20, 3)), columns=['a', 'b', 'c'])
+
+    predictions = service.predict(frame)
+
+    X = (frame.to_numpy() - mean) / scale
+    np.testing.assert_array_equal(predictions['logit'], model.predict(X))
+    np.testing.assert_allclose(predictions['logit_proba'], model.predict_proba(X)[:, -1])
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocesing import FeatureEngine, OnlineFeatureState
+
+WINDOWS = (10, 20, 60)
+
+
+@pytest.fixture
+def close() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    index = pd.date_range('2023-01-01', periods=200, freq='D', name='dateTime')
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(index), 4)), axis=0))
+    close = pd.DataFrame(prices, index=index, columns=['AAAUSDT', 'BBBUSDT', 'CCCUSDT', 'DDDUSDT'])
+    # A missing bar, and a ticker listed after the warm-up
+    close.iloc[120, 1] = np.nan
+    close.iloc[:150, 3] = np.nan
+    return close
+
+
+def test_incremental_updates_match_full_recompute(close, tmp_path):
+    warmup = 100
+    features = [{'kind': 'returns'}]
+    features += [{'kind': kind, 'window': window} for window in WINDOWS for kind in ('volatility', 'zscore')]
+    full = FeatureEngine(close).compute_wide(features)
+
+    # The state goes through save / load, like between two daily runs
+    state_path = str(tmp_path / 'online_state.npz')
+    OnlineFeatureState.from_history(close.iloc[:warmup], WINDOWS).save(state_path)
+    state = OnlineFeatureState.load(state_path)
+
+    for row in range(warmup, len(close)):
+        bar = state.update(close.index[row], close.iloc[row])
+        for name, values in full.items():
+            np.testing.assert_allclose(
+                bar[name].to_numpy(), values[row], rtol=0, atol=1e-9,
+                err_msg=f"{name} at {close.index[row]}"
+            )
+
+
+def test_update_rejects_bars_out_of_order(close):
+    state = OnlineFeatureState.from_history(close.iloc[:50], WINDOWS)
+    with pytest.raises(ValueError):
+        state.update(close.index[49], close.iloc[49])
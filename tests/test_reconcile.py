@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.reconcile import reconcile_metrics
+
+METRICS = ['AdrActCnt', 'AssetEODCompletionTime', 'CapMrktCurUSD']
+
+
+@pytest.fixture
+def files(tmp_path):
+    """
+    A single-asset dump and an API export of two assets, with a few differences.
+    """
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2020-01-01', periods=400, tz='UTC')
+    api = pd.concat([
+        pd.DataFrame({
+            'asset': asset,
+            'time': days,
+            'AdrActCnt': rng.integers(1000, 2000, len(days)).astype('float64'),
+            'AssetEODCompletionTime': (days + pd.Timedelta(days=1)).astype(str),
+            'CapMrktCurUSD': rng.lognormal(20, 1, len(days)),
+        })
+        for asset in ['btc', 'eth']
+    ], ignore_index=True)
+    dump = api[api['asset'] == 'eth'].drop(columns='asset')
+    dump['time'] = dump['time'].dt.strftime('%Y-%m-%d')
+    dump.loc[dump.index[10], 'CapMrktCurUSD'] *= 1.01
+    dump.loc[dump.index[200], 'AssetEODCompletionTime'] = 'late'
+    dump = dump.drop(index=dump.index[300]).iloc[:-5]
+
+    paths = {name: str(tmp_path / f"{name}.csv") for name in ('dump', 'api')}
+    paths['metrics'] = str(tmp_path / 'metrics.txt')
+    dump.to_csv(paths['dump'], index=False)
+    api.to_csv(paths['api'], index=False)
+    (tmp_path / 'metrics.txt').write_text('\n'.join(METRICS) + '\n')
+    return paths
+
+
+def test_streamed_windows_match_one_window(files):
+    whole = reconcile_metrics(files['dump'], files['api'], files['metrics'], asset='eth', block_size=1 << 26)
+    streamed = reconcile_metrics(files['dump'], files['api'], files['metrics'], asset='eth', block_size=2048)
+    pd.testing.assert_frame_equal(streamed[0], whole[0])
+    pd.testing.assert_frame_equal(streamed[1], whole[1])
+
+    per_metric = streamed[0].set_index('metric')
+    assert per_metric['mismatches'].to_dict() == {'AdrActCnt': 0, 'AssetEODCompletionTime': 1, 'CapMrktCurUSD': 1}
+    assert per_metric.loc['CapMrktCurUSD', 'first_mismatch'] == pd.Timestamp('2020-01-11', tz='UTC')
+    per_date = streamed[1]
+    assert len(per_date) == 800
+    assert int((per_date['in_api'] & ~per_date['in_dump']).sum()) == 406
+    assert per_date['asset'].is_monotonic_increasing
+
+
+def test_unsorted_file_is_rejected(files):
+    api = pd.read_csv(files['api'])
+    api.iloc[::-1].to_csv(files['api'], index=False)
+    with pytest.raises(ValueError, match='sorted'):
+        reconcile_metrics(files['dump'], files['api'], files['metrics'], asset='eth', block_size=2048)
@@ -0,0 +1,43 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.search import TRIALS_FILE, best_params, rung_folds, search_walk_forward
+
+
+def make_panel(n_times: int = 40, n_assets: int = 3, seed: int = 0) -> tuple:
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product([pd.date_range('2024-01-01', periods=n_times), range(n_assets)],
+                                       names=['time', 'asset'])
+    X = pd.DataFrame(rng.normal(0, 1, (len(index), 2)), index=index, columns=['a', 'b'])
+    y = pd.Series((X['a'] + rng.normal(0, 0.5, len(index)) > 0).astype(int), index=index)
+    return X, y
+
+
+def test_rungs_extend_the_most_recent_folds():
+    assert rung_folds(9, min_folds=1, eta=3) == [[8], [6, 7, 8], list(range(9))]
+    assert rung_folds(4, min_folds=1, eta=3) == [[3], [1, 2, 3], [0, 1, 2, 3]]
+
+
+def test_second_search_only_reads_cached_trials(tmp_path):
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = make_panel()
+    spaces = {'Logistic': (LogisticRegression(), {'C': [0.01, 1.0, 100.0]})}
+    search = lambda: search_walk_forward(X, y, spaces, cache_dir=str(tmp_path), n_folds=3, eta=3, max_workers=1)
+
+    first = search()
+    trials_file = tmp_path / TRIALS_FILE
+    trials = [json.loads(line) for line in trials_file.read_text().splitlines()]
+    # 3 candidates on the last fold, then the survivor on the 2 other folds
+    assert len(trials) == 5
+    # The survivor's last fold was fitted at the first rung
+    assert first['cached_fits'].tolist() == [0, 0, 0, 1]
+
+    second = search()
+    assert len(trials_file.read_text().splitlines()) == 5
+    assert (second['cached_fits'] == second['n_folds']).all()
+    columns = ['model', 'params', 'rung', 'n_folds', 'mean_score', 'survived']
+    pd.testing.assert_frame_equal(first[columns], second[columns])
+    assert best_params(second) == best_params(first)
@@ -0,0 +1,58 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+from src.streaming import CrossSectionBatcher, KlineStream, ReplayServer, StreamStats
+
+MINUTE_MS = 60000
+
+
+def kline(minute: int, close: float) -> list:
+    """
+    Raw REST kline opening `minute` minutes after the epoch.
+    """
+    open_time = minute * MINUTE_MS
+    return [open_time, '1.0', '2.0', '0.5', str(close), '10.0', open_time + MINUTE_MS - 1, '15.0', 7, '4.0', '6.0', '0']
+
+
+def test_replay_fills_buffer_and_releases_cross_sections():
+    # The server interleaves the symbols bar by bar: A0 B0 A1 B0 A2 B0 A3 B1 A4 B2.
+    # B repeats its first bar twice, so its next bars arrive after their cross-sections
+    # were released incomplete (max_pending=2).
+    recording = {
+        'AUSDT': [kline(minute, 100.0 + minute) for minute in range(5)],
+        'BUSDT': [kline(0, 200.0), kline(0, 201.0), kline(0, 202.0), kline(1, 210.0), kline(2, 220.0)],
+    }
+    released = []
+    batcher = CrossSectionBatcher(list(recording), lambda time, closes: released.append((time, closes)))
+    with ReplayServer(recording, updates_per_bar=1) as url:
+        stream = KlineStream(list(recording), capacity=4, on_bar=batcher, base_url=url, reconnect=False)
+        summary = asyncio.run(stream.run(duration=30))
+
+    assert summary['events'] == 20
+    assert summary['closed_bars'] == 8
+    assert summary['repeated_bars'] == 2
+
+    # A keeps its last 4 bars in order; B keeps the last value of its repeated bar
+    bars = stream.buffer.bars('AUSDT')
+    assert list(bars.index) == list(pd.to_datetime([MINUTE_MS * m for m in range(1, 5)], unit='ms'))
+    np.testing.assert_array_equal(bars['close'], [101.0, 102.0, 103.0, 104.0])
+    np.testing.assert_array_equal(stream.buffer.bars('BUSDT')['close'], [202.0, 210.0, 220.0])
+
+    assert [time for time, _ in released] == list(pd.to_datetime([0, MINUTE_MS, 2 * MINUTE_MS], unit='ms'))
+    assert released[0][1].to_dict() == {'AUSDT': 100.0, 'BUSDT': 200.0}
+    assert released[1][1]['AUSDT'] == 101.0 and np.isnan(released[1][1]['BUSDT'])
+    assert released[2][1]['AUSDT'] == 102.0 and np.isnan(released[2][1]['BUSDT'])
+    assert batcher.late_bars == 2
+
+
+def test_stream_stats_keep_a_bounded_window_of_latencies():
+    stats = StreamStats(latency_capacity=10)
+    for latency in range(100):
+        stats.add_latency(float(latency))
+    summary = stats.summary()
+    assert len(stats.latencies_ms) == 10
+    assert summary['latency_mean_ms'] == 49.5
+    assert summary['latency_max_ms'] == 99.0
+    assert summary['latency_p50_ms'] == 94.5
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.model_store import load_any_model
+from src.train_models import walk_forward_folds, train_walk_forward
+
+
+def make_panel(n_times: int = 30, n_assets: int = 3, seed: int = 0) -> tuple:
+    """
+    Features and a learnable binary target indexed by (time, asset), rows shuffled.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product([pd.date_range('2024-01-01', periods=n_times), range(n_assets)],
+                                       names=['time', 'asset'])
+    X = pd.DataFrame(rng.normal(10, 4, (len(index), 2)), index=index, columns=['a', 'b'])
+    y = pd.Series((X['a'] > 10).astype(int), index=index)
+    order = rng.permutation(len(index))
+    return X.iloc[order], y.iloc[order]
+
+
+def test_expanding_folds_cover_consecutive_blocks_after_the_gap():
+    X, _ = make_panel(n_times=32)
+    times = X.index.get_level_values('time')
+    unique_times = np.sort(times.unique())
+    folds = walk_forward_folds(times, n_folds=5, gap=2)
+
+    # 32 times: 5 test blocks of 32 // 6 = 5 times after an initial block of 7
+    assert len(folds) == 5
+    for fold, (train, test) in enumerate(folds):
+        train_times, test_times = np.unique(times[train]), np.unique(times[test])
+        assert list(test_times) == list(unique_times[7 + 5 * fold:12 + 5 * fold])
+        # Everything before the test block except the gap, each time with all its rows
+        assert list(train_times) == list(unique_times[:5 + 5 * fold])
+        assert len(train) == 3 * len(train_times) and len(test) == 3 * len(test_times)
+        assert not set(train) & set(test)
+
+
+def test_rolling_folds_keep_train_periods_times():
+    X, _ = make_panel(n_times=32)
+    times = X.index.get_level_values('time')
+    unique_times = np.sort(times.unique())
+    for fold, (train, test) in enumerate(walk_forward_folds(times, n_folds=5, mode='rolling', train_periods=4, gap=1)):
+        test_start = 7 + 5 * fold
+        assert list(np.unique(times[train])) == list(unique_times[test_start - 5:test_start - 1])
+        assert np.unique(times[train]).max() < np.unique(times[test]).min()
+
+
+def test_folds_reject_bad_arguments():
+    times = pd.date_range('2024-01-01', periods=5)
+    with pytest.raises(ValueError):
+        walk_forward_folds(times, n_folds=2, mode='sliding')
+    with pytest.raises(ValueError):
+        walk_forward_folds(times, n_folds=5)
+
+
+def test_walk_forward_exports_models_with_their_fold_scaler(tmp_path):
+    from sklearn.linear_model import LogisticRegression
+
+    X, y = make_panel(n_times=40)
+    results = train_walk_forward(X, y, ['Logistic Regression'], [LogisticRegression()], n_folds=3, gap=1,
+                                 n_jobs=1, artifacts_dir=str(tmp_path))
+
+    assert results['fold'].tolist() == [0, 1, 2]
+    assert (results['accuracy'] > 0.8).all()
+    folds = walk_forward_folds(X.index.get_level_values('time'), 3, gap=1)
+    for (train, test), row in zip(folds, results.itertuples()):
+        assert (row.n_train, row.n_test) == (len(train), len(test))
+        assert row.artifact_path == str(tmp_path / f"logistic_regression_fold{row.fold:02d}")
+
+        model, mean, scale = load_any_model(row.artifact_path)
+        np.testing.assert_allclose(mean, X.to_numpy()[train].mean(axis=0))
+        np.testing.assert_allclose(scale, X.to_numpy()[train].std(axis=0))
+        X_test = (X.to_numpy()[test] - mean) / scale
+        assert model.score(X_test, y.to_numpy()[test]) == pytest.approx(row.accuracy)